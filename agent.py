@@ -1,56 +1,289 @@
 """
 LangChain Agent for Titanic Dataset Analysis
 """
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-import io
 import base64
-from typing import Dict, Any, Tuple, Optional, Callable
-import re
+import threading
+import numpy as np
+from typing import Dict, Any, Tuple, Optional, Callable, Union
 
-from data_loader import load_titanic_data
+from data_loader import (
+    COMPACT, OUT_OF_CORE, get_data_mtime, get_dataset_info, get_dataset_version,
+    load_titanic_aggregates, load_titanic_data,
+)
+from stats_index import TitanicStatsIndex
+from passenger_table import CompactStatsIndex, PassengerTable
+from intent_router import IntentRouter, RouteResult, default_router
+from query_engine import AggregateQueryEngine, QueryEngine, QuerySpec, format_result, parse_query
+from metrics import CHARTS, QUERIES, timed
+from render_options import RenderOptions, resolve_options
+from response_cache import ResponseCache
+import render_cache
+
+# Charts the analyzer can draw
+CHART_KINDS = ("age_histogram", "gender_pie", "embarkation_bar", "fare_histogram", "survival_by_class")
+
+# Output formats charts can be rendered in -> MIME type
+CHART_FORMATS = {
+    "png": "image/png",
+    "webp": "image/webp",
+    "svg": "image/svg+xml",
+}
+
+
+def load_charts():
+    """
+    Import the plotting stack on first use.
+    
+    Text-only queries never pay for importing matplotlib.
+    """
+    import charts
+    return charts
+
+
+def warm_up_rendering():
+    """Load matplotlib and render a throwaway figure ahead of the first chart request"""
+    load_charts().warm_up()
+
+
+def make_visualization_id(kind: str, data_version: str) -> str:
+    """Stable ID of a chart rendered from a given dataset version"""
+    return f"{data_version}-{kind}"
+
+
+def parse_visualization_id(viz_id: str) -> Tuple[str, str]:
+    """
+    Split a visualization ID into (data_version, kind).
+    
+    Raises:
+        ValueError: If the ID is malformed or names an unknown chart
+    """
+    data_version, _, kind = viz_id.partition("-")
+    if not data_version or kind not in CHART_KINDS:
+        raise ValueError(f"Unknown visualization: {viz_id}")
+    return data_version, kind
+
+
+PORT_NAMES = {'S': 'Southampton', 'C': 'Cherbourg', 'Q': 'Queenstown'}
 
-# Set visualization style
-plt.style.use('seaborn-v0_8-whitegrid')
-sns.set_palette("husl")
 
 class TitanicAnalyzer:
     """Analyzer class for Titanic dataset"""
     
-    def __init__(self):
-        self.df = load_titanic_data()
-        self.fig = None
+    def __init__(self, cache: Optional[render_cache.RenderCache] = None, out_of_core: Optional[bool] = None,
+                 activate: bool = True, compact: Optional[bool] = None,
+                 previous: Optional[TitanicStatsIndex] = None):
+        """
+        Args:
+            cache: Rendered-chart cache (the shared default if omitted)
+            out_of_core: Answer from streamed aggregates without keeping the
+                data in memory (`df` is None); defaults to TITANIC_OUT_OF_CORE
+            activate: Make this the dataset version the render cache keeps;
+                pass False when building a replacement in the background
+            compact: Keep a PassengerTable instead of the DataFrame (`df` is
+                None); defaults to TITANIC_COMPACT
+            previous: Stats index of the version being replaced; only the
+                sections whose columns changed are recomputed
+        """
+        self.out_of_core = OUT_OF_CORE if out_of_core is None else out_of_core
+        self.compact = COMPACT if compact is None else compact
+        self.table: Optional[PassengerTable] = None
+        if self.out_of_core:
+            self.df = None
+            self.stats = load_titanic_aggregates()
+            self.columns = list(self.stats.columns)
+            self.data_version = self.stats.version
+        elif self.compact:
+            df = load_titanic_data()
+            self.columns = list(df.columns)
+            self.data_version = get_dataset_version(df)
+            self.table = PassengerTable.from_frame(df, load_frame=load_titanic_data)
+            self.df = None
+            self.stats = CompactStatsIndex(self.table)
+        else:
+            self.df = load_titanic_data()
+            self.stats = previous.updated(self.df) if previous is not None else TitanicStatsIndex(self.df)
+            self.columns = list(self.df.columns)
+            self.data_version = get_dataset_version(self.df)
+        self.data_mtime = get_data_mtime()
+        self.render_cache = cache if cache is not None else render_cache.default_cache
+        if activate:
+            self.activate()
+        self._results: Dict[Any, Dict[str, Any]] = {}
+        self._engine: Optional[Union[QueryEngine, AggregateQueryEngine]] = None
+        self._engine_lock = threading.Lock()
+    
+    def activate(self):
+        """Evict cached charts of other dataset versions and stop caching them"""
+        self.render_cache.retain_version(self.data_version)
+    
+    # Structured results - the prose answers and charts are rendered from these
+    def summary_data(self) -> Dict[str, Any]:
+        """Dataset size, columns and overall survival rate"""
+        return self._cached_result("summary", lambda: {
+            "total": self.stats.total,
+            "columns": list(self.columns),
+            "survival_rate_pct": self.stats.survival_rate * 100,
+        })
+    
+    def gender_data(self) -> Dict[str, Any]:
+        """Passenger counts and percentages per sex"""
+        def compute():
+            total = self.stats.total
+            counts = dict(self.stats.sex_counts)
+            return {
+                "total": total,
+                "counts": counts,
+                "percentages": {sex: count / total * 100 for sex, count in counts.items()},
+            }
+        return self._cached_result("gender", compute)
+    
+    def age_data(self) -> Dict[str, Any]:
+        """Count, moments and quantiles of passenger ages"""
+        return self._cached_result("age", lambda: dict(self.stats.age, column="Age"))
+    
+    def fare_data(self) -> Dict[str, Any]:
+        """Count, moments and quantiles of ticket fares"""
+        return self._cached_result("fare", lambda: dict(self.stats.fare, column="Fare"))
+    
+    def embarkation_data(self) -> Dict[str, Any]:
+        """Passengers per embarkation port, most frequent first"""
+        def compute():
+            total = self.stats.embarked_total
+            return {
+                "total": total,
+                "ports": [
+                    {"code": port, "name": PORT_NAMES.get(port, port),
+                     "count": count, "percentage": count / total * 100}
+                    for port, count in self.stats.embarked_counts.items()
+                ],
+            }
+        return self._cached_result("embarkation", compute)
     
+    def survival_data(self) -> Dict[str, Any]:
+        """Overall survival and survival per sex and per class"""
+        def groups(table):
+            return [
+                {"group": key, "count": g["count"], "survived": g["survived"], "rate_pct": g["rate"] * 100}
+                for key, g in table.items()
+            ]
+        return self._cached_result("survival", lambda: {
+            "total": self.stats.total,
+            "survived": self.stats.survived,
+            "overall_rate_pct": self.stats.survival_rate * 100,
+            "by_sex": groups(self.stats.by_sex),
+            "by_class": groups(self.stats.by_pclass),
+        })
+    
+    def histogram_data(self, column: str, bins: int = 30) -> Dict[str, Any]:
+        """Bin edges and counts of a numeric column (missing values skipped)"""
+        def compute():
+            if self.out_of_core:
+                summary = self.stats.age if column == 'Age' else self.stats.fare
+                edges, counts = self.stats.histograms[column].histogram(bins, summary['min'], summary['max'])
+                return {"column": column, "bins": bins, "edges": edges, "counts": counts}
+            if self.compact:
+                values = self.table.values(column)
+            else:
+                values = self.df[column].dropna().to_numpy()
+            counts, edges = np.histogram(values, bins=bins)
+            return {"column": column, "bins": bins, "edges": edges.tolist(), "counts": counts.tolist()}
+        return self._cached_result(("histogram", column, bins), compute)
+    
+    def dataset_info(self) -> Dict[str, Any]:
+        """The /info payload for this dataset version"""
+        if self.out_of_core:
+            return self._cached_result("info", self.stats.dataset_info)
+        if self.compact:
+            # The column stats need every column, which the table does not keep
+            return self._cached_result("info", lambda: get_dataset_info(self.table.frame(), self.data_version))
+        return get_dataset_info(self.df, self.data_version)
+    
+    def query_data(self, spec: QuerySpec) -> Dict[str, Any]:
+        """Result of an ad-hoc filtered / grouped query (compiled filters are cached by the engine)"""
+        return self.engine.execute(spec)
+    
+    def warm(self, charts: bool = False):
+        """
+        Compute every memoized result and the query index now, instead of on
+        the first request; with `charts`, also render each chart into the cache.
+        """
+        self.dataset_info()
+        self.get_headline_stats()
+        self.summary_data()
+        self.age_data()
+        self.fare_data()
+        self.embarkation_data()
+        self.survival_data()
+        self.histogram_data('Age')
+        self.histogram_data('Fare')
+        if not self.out_of_core:
+            self.engine  # builds the bitmap index
+        if charts:
+            for kind in CHART_KINDS:
+                self.render_chart(kind)
+    
+    @property
+    def engine(self) -> Union[QueryEngine, AggregateQueryEngine]:
+        """
+        Query engine over this dataset version; its bitmap index is built on
+        first use. Out of core it is an AggregateQueryEngine over the group tables.
+        """
+        if self._engine is None:
+            with self._engine_lock:
+                if self._engine is None:
+                    if self.out_of_core:
+                        self._engine = AggregateQueryEngine(self.stats)
+                    else:
+                        self._engine = QueryEngine(self.table.analysis_frame() if self.compact else self.df)
+        return self._engine
+    
+    def _cached_result(self, key, compute: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        # Results depend only on the dataset, so they live as long as this version
+        result = self._results.get(key)
+        if result is None:
+            result = self._results[key] = compute()
+        return result
+    
+    # Prose answers
     def get_data_summary(self) -> str:
         """Get summary statistics of the dataset"""
+        data = self.summary_data()
         summary = f"""
 Titanic Dataset Summary:
-- Total Passengers: {len(self.df)}
-- Columns: {', '.join(self.df.columns)}
-- Survival Rate: {self.df['Survived'].mean()*100:.2f}%
+- Total Passengers: {data['total']}
+- Columns: {', '.join(data['columns'])}
+- Survival Rate: {data['survival_rate_pct']:.2f}%
 """
         return summary
     
+    def get_headline_stats(self) -> Dict[str, Any]:
+        """Headline metrics as numbers (percentages rounded to 2 decimals)"""
+        gender = self.gender_data()
+        return {
+            "total_passengers": gender["total"],
+            "male_percentage": round(gender["percentages"].get('male', 0.0), 2),
+            "female_percentage": round(gender["percentages"].get('female', 0.0), 2),
+            "survival_rate": round(self.survival_data()["overall_rate_pct"], 2),
+            "features": len(self.columns),
+            "data_version": self.data_version,
+        }
+    
     def analyze_gender(self) -> str:
         """Analyze gender distribution"""
-        total = len(self.df)
-        male_count = len(self.df[self.df['Sex'] == 'male'])
-        female_count = len(self.df[self.df['Sex'] == 'female'])
-        male_pct = (male_count / total) * 100
-        female_pct = (female_count / total) * 100
+        data = self.gender_data()
+        counts, pcts = data["counts"], data["percentages"]
         
         return f"""Gender Distribution:
-- Male: {male_count} ({male_pct:.2f}%)
-- Female: {female_count} ({female_pct:.2f}%)
+- Male: {counts.get('male', 0)} ({pcts.get('male', 0.0):.2f}%)
+- Female: {counts.get('female', 0)} ({pcts.get('female', 0.0):.2f}%)
 """
     
     def analyze_age(self) -> Tuple[str, Optional[str]]:
         """Analyze age statistics"""
-        age_stats = self.df['Age'].describe()
+        age_stats = self.age_data()
         result = f"""Age Statistics:
 - Mean Age: {age_stats['mean']:.2f} years
-- Median Age: {self.df['Age'].median():.2f} years
+- Median Age: {age_stats['median']:.2f} years
 - Min Age: {age_stats['min']:.2f} years
 - Max Age: {age_stats['max']:.2f} years
 - Std Dev: {age_stats['std']:.2f}
@@ -59,10 +292,10 @@ Titanic Dataset Summary:
     
     def analyze_fare(self) -> str:
         """Analyze ticket fare statistics"""
-        fare_stats = self.df['Fare'].describe()
+        fare_stats = self.fare_data()
         return f"""Ticket Fare Statistics:
 - Mean Fare: ${fare_stats['mean']:.2f}
-- Median Fare: ${self.df['Fare'].median():.2f}
+- Median Fare: ${fare_stats['median']:.2f}
 - Min Fare: ${fare_stats['min']:.2f}
 - Max Fare: ${fare_stats['max']:.2f}
 - Std Dev: ${fare_stats['std']:.2f}
@@ -70,188 +303,261 @@ Titanic Dataset Summary:
     
     def analyze_embarkation(self) -> str:
         """Analyze embarkation ports"""
-        embark_counts = self.df['Embarked'].value_counts()
-        total = len(self.df.dropna(subset=['Embarked']))
-        
         result = "Embarkation Port Distribution:\n"
-        for port, count in embark_counts.items():
-            pct = (count / total) * 100
-            port_name = {'S': 'Southampton', 'C': 'Cherbourg', 'Q': 'Queenstown'}.get(port, port)
-            result += f"- {port_name} ({port}): {count} passengers ({pct:.2f}%)\n"
+        for port in self.embarkation_data()["ports"]:
+            result += (f"- {port['name']} ({port['code']}): {port['count']} passengers "
+                       f"({port['percentage']:.2f}%)\n")
         
         return result
     
+    def analyze_query(self, spec: QuerySpec) -> str:
+        """Answer an ad-hoc filtered / grouped query"""
+        return format_result(self.query_data(spec))
+    
     def analyze_survival(self) -> str:
         """Analyze survival rates"""
-        survival_by_sex = self.df.groupby('Sex')['Survived'].mean() * 100
-        survival_by_class = self.df.groupby('Pclass')['Survived'].mean() * 100
-        
+        data = self.survival_data()
         result = "Survival Analysis:\n"
-        result += f"- Overall Survival Rate: {self.df['Survived'].mean()*100:.2f}%\n\n"
+        result += f"- Overall Survival Rate: {data['overall_rate_pct']:.2f}%\n\n"
         result += "By Sex:\n"
-        for sex, rate in survival_by_sex.items():
-            result += f"  - {sex.capitalize()}: {rate:.2f}%\n"
+        for group in data["by_sex"]:
+            result += f"  - {group['group'].capitalize()}: {group['rate_pct']:.2f}%\n"
         
         result += "\nBy Class:\n"
-        for pclass, rate in survival_by_class.items():
-            result += f"  - Class {pclass}: {rate:.2f}%\n"
+        for group in data["by_class"]:
+            result += f"  - Class {group['group']}: {group['rate_pct']:.2f}%\n"
         
         return result
     
     # Visualization methods
+    def render_chart(self, kind: str, format: str = "png", options: Optional[RenderOptions] = None) -> bytes:
+        """
+        Render a chart, serving it from the render cache when possible.
+        
+        Args:
+            kind: One of CHART_KINDS
+            format: One of CHART_FORMATS
+            options: Size, DPI, compression and layout (the default profile if omitted)
+            
+        Returns:
+            bytes: The encoded image
+        """
+        if kind not in CHART_KINDS:
+            raise ValueError(f"Unknown chart kind: {kind}")
+        if format not in CHART_FORMATS:
+            raise ValueError(f"Unsupported chart format: {format}")
+        options = options or resolve_options()
+        key = render_cache.make_key(kind, {"format": format, **options.params()}, self.data_version)
+        rendered = []
+        
+        def render():
+            rendered.append(True)
+            return self._render_figure(kind, format, options)
+        
+        image = self.render_cache.get_or_render(key, self.data_version, render)
+        CHARTS.inc(kind=kind, format=format, cache="miss" if rendered else "hit")
+        return image
+    
+    def _render_figure(self, kind: str, format: str, options: RenderOptions) -> bytes:
+        # Each render builds its own Figure, so threads can render in parallel
+        charts = load_charts()
+        with timed("draw"):
+            fig = getattr(self, f"_draw_{kind}")(charts, options)
+        with timed("savefig"):
+            return charts.figure_to_bytes(fig, format, options)
+    
     def plot_age_histogram(self) -> str:
-        """Create age histogram"""
-        self.fig, ax = plt.subplots(figsize=(10, 6))
-        self.df['Age'].dropna().hist(bins=30, ax=ax, edgecolor='black', alpha=0.7)
-        ax.set_xlabel('Age', fontsize=12)
-        ax.set_ylabel('Frequency', fontsize=12)
-        ax.set_title('Distribution of Passenger Ages', fontsize=14, fontweight='bold')
-        plt.tight_layout()
-        return self._fig_to_base64()
+        """Create age histogram (base64 encoded PNG)"""
+        return base64.b64encode(self.render_chart("age_histogram")).decode('utf-8')
+    
+    def _draw_age_histogram(self, charts, options):
+        data = self.histogram_data('Age')
+        return charts.age_histogram(data['edges'], data['counts'], options)
     
     def plot_gender_pie(self) -> str:
-        """Create gender pie chart"""
-        self.fig, ax = plt.subplots(figsize=(8, 8))
-        gender_counts = self.df['Sex'].value_counts()
-        colors = ['#FF6B6B', '#4ECDC4']
-        ax.pie(gender_counts.values, labels=gender_counts.index, autopct='%1.1f%%', 
-               colors=colors, explode=(0.05, 0), startangle=90)
-        ax.set_title('Gender Distribution', fontsize=14, fontweight='bold')
-        plt.tight_layout()
-        return self._fig_to_base64()
+        """Create gender pie chart (base64 encoded PNG)"""
+        return base64.b64encode(self.render_chart("gender_pie")).decode('utf-8')
+    
+    def _draw_gender_pie(self, charts, options):
+        return charts.gender_pie(self.gender_data()['counts'], options)
     
     def plot_embarkation_bar(self) -> str:
-        """Create embarkation bar chart"""
-        self.fig, ax = plt.subplots(figsize=(10, 6))
-        embark_counts = self.df['Embarked'].value_counts()
-        port_names = {'S': 'Southampton', 'C': 'Cherbourg', 'Q': 'Queenstown'}
-        labels = [port_names.get(p, p) for p in embark_counts.index]
-        colors = ['#3498db', '#e74c3c', '#2ecc71']
-        bars = ax.bar(labels, embark_counts.values, color=colors, edgecolor='black')
-        ax.set_xlabel('Port', fontsize=12)
-        ax.set_ylabel('Number of Passengers', fontsize=12)
-        ax.set_title('Passengers by Embarkation Port', fontsize=14, fontweight='bold')
-        
-        # Add value labels on bars
-        for bar in bars:
-            height = bar.get_height()
-            ax.text(bar.get_x() + bar.get_width()/2., height,
-                   f'{int(height)}', ha='center', va='bottom', fontsize=11)
-        
-        plt.tight_layout()
-        return self._fig_to_base64()
+        """Create embarkation bar chart (base64 encoded PNG)"""
+        return base64.b64encode(self.render_chart("embarkation_bar")).decode('utf-8')
+    
+    def _draw_embarkation_bar(self, charts, options):
+        return charts.embarkation_bar(
+            {port['name']: port['count'] for port in self.embarkation_data()['ports']}, options
+        )
     
     def plot_fare_histogram(self) -> str:
-        """Create fare histogram"""
-        self.fig, ax = plt.subplots(figsize=(10, 6))
-        self.df['Fare'].hist(bins=30, ax=ax, edgecolor='black', alpha=0.7, color='#9b59b6')
-        ax.set_xlabel('Fare ($)', fontsize=12)
-        ax.set_ylabel('Frequency', fontsize=12)
-        ax.set_title('Distribution of Ticket Fares', fontsize=14, fontweight='bold')
-        plt.tight_layout()
-        return self._fig_to_base64()
+        """Create fare histogram (base64 encoded PNG)"""
+        return base64.b64encode(self.render_chart("fare_histogram")).decode('utf-8')
+    
+    def _draw_fare_histogram(self, charts, options):
+        data = self.histogram_data('Fare')
+        return charts.fare_histogram(data['edges'], data['counts'], options)
     
     def plot_survival_by_class(self) -> str:
-        """Create survival by class bar chart"""
-        self.fig, ax = plt.subplots(figsize=(10, 6))
-        survival_by_class = self.df.groupby('Pclass')['Survived'].mean() * 100
-        colors = ['#e74c3c', '#f39c12', '#27ae60']
-        bars = ax.bar([f'Class {c}' for c in survival_by_class.index], 
-                     survival_by_class.values, color=colors, edgecolor='black')
-        ax.set_xlabel('Passenger Class', fontsize=12)
-        ax.set_ylabel('Survival Rate (%)', fontsize=12)
-        ax.set_title('Survival Rate by Passenger Class', fontsize=14, fontweight='bold')
-        
-        # Add value labels
-        for bar in bars:
-            height = bar.get_height()
-            ax.text(bar.get_x() + bar.get_width()/2., height,
-                   f'{height:.1f}%', ha='center', va='bottom', fontsize=11)
-        
-        plt.tight_layout()
-        return self._fig_to_base64()
-    
-    def _fig_to_base64(self) -> str:
-        """Convert matplotlib figure to base64 string"""
-        buffer = io.BytesIO()
-        self.fig.savefig(buffer, format='png', dpi=100, bbox_inches='tight')
-        buffer.seek(0)
-        image_base64 = base64.b64encode(buffer.read()).decode('utf-8')
-        plt.close(self.fig)
-        return image_base64
+        """Create survival by class bar chart (base64 encoded PNG)"""
+        return base64.b64encode(self.render_chart("survival_by_class")).decode('utf-8')
+    
+    def _draw_survival_by_class(self, charts, options):
+        return charts.survival_by_class(
+            {group['group']: group['rate_pct'] for group in self.survival_data()['by_class']}, options
+        )
 
 
 class TitanicAgent:
     """Main agent for handling Titanic dataset queries"""
     
-    def __init__(self):
+    def __init__(self, router: Optional[IntentRouter] = None, response_cache: Optional[ResponseCache] = None):
         self.analyzer = TitanicAnalyzer()
+        self.router = router if router is not None else default_router()
+        self.response_cache = response_cache if response_cache is not None else ResponseCache()
+        self.handlers: Dict[str, Callable[[RouteResult, TitanicAnalyzer], Dict[str, Any]]] = {
+            "gender": self._answer_gender,
+            "age": self._answer_age,
+            "fare": self._answer_fare,
+            "embarkation": self._answer_embarkation,
+            "survival": self._answer_survival,
+            "summary": self._answer_summary,
+            "query": self._answer_query,
+            "query_unavailable": self._answer_query_unavailable,
+        }
     
-    def process_query(self, query: str) -> Dict[str, Any]:
+    def process_query(self, query: str, inline_images: bool = True,
+                      analyzer: Optional[TitanicAnalyzer] = None) -> Dict[str, Any]:
         """
         Process a natural language query and return response with optional visualization.
         
         Args:
             query: User's natural language question
+            inline_images: Render the chart now and include it base64 encoded;
+                otherwise only its 'visualization_id' is returned
+            analyzer: Dataset version to answer from (the current one if omitted)
             
         Returns:
-            Dict containing 'answer' and optional 'visualization' (base64 encoded)
+            Dict containing 'answer', 'visualization_id' (or None) and
+            'visualization' (base64 encoded PNG, or None)
         """
-        query_lower = query.lower()
-        response = {"answer": "", "visualization": None}
-        
-        # Determine which analysis to perform based on keywords
-        if any(word in query_lower for word in ['male', 'male percentage', 'male passengers', 'gender', 'sex']):
-            if 'percentage' in query_lower or 'what' in query_lower:
-                response["answer"] = self.analyzer.analyze_gender()
-            
-            if 'show' in query_lower or 'pie' in query_lower or 'chart' in query_lower or 'visual' in query_lower:
-                response["visualization"] = self.analyzer.plot_gender_pie()
-        
-        elif any(word in query_lower for word in ['age', 'ages', 'old']):
-            if 'average' in query_lower or 'mean' in query_lower or 'median' in query_lower:
-                response["answer"] = self.analyzer.analyze_age()[0]
-            elif 'histogram' in query_lower or 'show' in query_lower or 'distribution' in query_lower:
-                response["answer"] = "Here is the histogram of passenger ages:"
-                response["visualization"] = self.analyzer.plot_age_histogram()
-            else:
-                response["answer"] = self.analyzer.analyze_age()[0]
-        
-        elif any(word in query_lower for word in ['fare', 'ticket', 'price', 'cost']):
-            if 'average' in query_lower or 'mean' in query_lower or 'what' in query_lower:
-                response["answer"] = self.analyzer.analyze_fare()
-            elif 'histogram' in query_lower or 'show' in query_lower or 'distribution' in query_lower:
-                response["answer"] = "Here is the histogram of ticket fares:"
-                response["visualization"] = self.analyzer.plot_fare_histogram()
-            else:
-                response["answer"] = self.analyzer.analyze_fare()
-        
-        elif any(word in query_lower for word in ['embark', 'port', 'board', 'from']):
-            if 'how many' in query_lower or 'count' in query_lower or 'each' in query_lower:
-                response["answer"] = self.analyzer.analyze_embarkation()
-            
-            if 'show' in query_lower or 'bar' in query_lower or 'chart' in query_lower or 'visual' in query_lower:
-                response["visualization"] = self.analyzer.plot_embarkation_bar()
-        
-        elif any(word in query_lower for word in ['surviv', 'died', 'dead']):
-            response["answer"] = self.analyzer.analyze_survival()
-            
-            if 'show' in query_lower or 'chart' in query_lower or 'class' in query_lower:
-                response["visualization"] = self.analyzer.plot_survival_by_class()
-        
-        elif 'summary' in query_lower or 'overview' in query_lower or 'info' in query_lower:
-            response["answer"] = self.analyzer.get_data_summary()
+        analyzer = analyzer or self.analyzer
+        route = self.response_cache.route(query, lambda q: self.route(q, analyzer))
+        QUERIES.inc(intent=route.intent if route.intent in self.handlers else "help")
+        return self.response_cache.get_or_compute(
+            (route.key(), inline_images), analyzer.data_version,
+            lambda: self.answer(route, inline_images, analyzer)
+        )
+    
+    def route(self, query: str, analyzer: Optional[TitanicAnalyzer] = None) -> RouteResult:
+        """
+        Route a query; questions with filters the fixed intents can't answer
+        ("survival rate of women over 30 in class 2") go to the query engine.
+
+        Args:
+            query: User's natural language question
+            analyzer: Dataset version that will answer (the current one if omitted)
+        """
+        analyzer = analyzer or self.analyzer
+        with timed("route"):
+            route = self.router.route(query)
+            spec = parse_query(query)
+            if spec.ad_hoc:
+                # Out of core only the group tables are kept: say so rather than drop the filters
+                if analyzer.out_of_core and not AggregateQueryEngine.answerable(spec):
+                    route.intent, route.spec = "query_unavailable", spec
+                else:
+                    route.intent, route.spec = "query", spec
+        return route
+    
+    def answer(self, route: RouteResult, inline_images: bool = True,
+               analyzer: Optional[TitanicAnalyzer] = None) -> Dict[str, Any]:
+        """
+        Produce the response for an already routed query.
         
+        The whole response comes from one analyzer, read once, so a dataset
+        reload mid-request cannot mix versions.
+        """
+        analyzer = analyzer or self.analyzer
+        handler = self.handlers.get(route.intent, self._answer_help)
+        with timed("aggregate"):
+            response = handler(route, analyzer)
+        chart = response.pop("chart", None)
+        response.setdefault("data", None)
+        response["visualization_id"] = None
+        response["visualization"] = None
+        if chart:
+            response["visualization_id"] = make_visualization_id(chart, analyzer.data_version)
+            if inline_images:
+                image = analyzer.render_chart(chart)
+                with timed("base64"):
+                    response["visualization"] = base64.b64encode(image).decode('utf-8')
+        return response
+    
+    def _answer_gender(self, route: RouteResult, analyzer: TitanicAnalyzer) -> Dict[str, Any]:
+        response = {"answer": "", "chart": None, "data": analyzer.gender_data()}
+        if route.chart:
+            response["chart"] = "gender_pie"
+        if route.wants_stats or not route.chart:
+            response["answer"] = analyzer.analyze_gender()
         else:
-            # Default to summary if query not recognized
-            response["answer"] = f"I can help you analyze the Titanic dataset! Try asking about:\n"
-            response["answer"] += "- Gender distribution (e.g., 'What percentage were male?')\n"
-            response["answer"] += "- Age analysis (e.g., 'Show me a histogram of ages')\n"
-            response["answer"] += "- Ticket fares (e.g., 'What was the average fare?')\n"
-            response["answer"] += "- Embarkation ports (e.g., 'How many from each port?')\n"
-            response["answer"] += f"\nCurrent dataset has {len(self.analyzer.df)} passengers."
-        
+            response["answer"] = "Here is the gender distribution of passengers:"
         return response
+    
+    def _answer_age(self, route: RouteResult, analyzer: TitanicAnalyzer) -> Dict[str, Any]:
+        if route.chart and not route.wants_stats:
+            return {"answer": "Here is the histogram of passenger ages:", "chart": "age_histogram",
+                    "data": analyzer.histogram_data('Age')}
+        return {"answer": analyzer.analyze_age()[0], "data": analyzer.age_data()}
+    
+    def _answer_fare(self, route: RouteResult, analyzer: TitanicAnalyzer) -> Dict[str, Any]:
+        if route.chart and not route.wants_stats:
+            return {"answer": "Here is the histogram of ticket fares:", "chart": "fare_histogram",
+                    "data": analyzer.histogram_data('Fare')}
+        return {"answer": analyzer.analyze_fare(), "data": analyzer.fare_data()}
+    
+    def _answer_embarkation(self, route: RouteResult, analyzer: TitanicAnalyzer) -> Dict[str, Any]:
+        response = {"answer": "", "chart": None, "data": analyzer.embarkation_data()}
+        if route.chart:
+            response["chart"] = "embarkation_bar"
+        if route.wants_stats or not route.chart:
+            response["answer"] = analyzer.analyze_embarkation()
+        else:
+            response["answer"] = "Here is the number of passengers by embarkation port:"
+        return response
+    
+    def _answer_survival(self, route: RouteResult, analyzer: TitanicAnalyzer) -> Dict[str, Any]:
+        response = {"answer": analyzer.analyze_survival(), "chart": None,
+                    "data": analyzer.survival_data()}
+        if route.chart or route.group_by == "Pclass":
+            response["chart"] = "survival_by_class"
+        return response
+    
+    def _answer_query(self, route: RouteResult, analyzer: TitanicAnalyzer) -> Dict[str, Any]:
+        data = analyzer.query_data(route.spec)
+        return {"answer": format_result(data), "data": data}
+    
+    def _answer_query_unavailable(self, route: RouteResult, analyzer: TitanicAnalyzer) -> Dict[str, Any]:
+        spec = route.spec
+        asked = [f.describe() for f in spec.filters]
+        if spec.group_by:
+            asked.append(f"by {spec.group_by}")
+        answer = (f"This question ({spec.metric}: {', '.join(asked)}) needs the passenger rows, which "
+                  f"are not kept in out-of-core mode. Counts and survival rates filtered or grouped "
+                  f"by sex, class and port are available; age and fare only for all passengers.")
+        return {"answer": answer}
+    
+    def _answer_summary(self, route: RouteResult, analyzer: TitanicAnalyzer) -> Dict[str, Any]:
+        return {"answer": analyzer.get_data_summary(), "data": analyzer.summary_data()}
+    
+    def _answer_help(self, route: RouteResult, analyzer: TitanicAnalyzer) -> Dict[str, Any]:
+        answer = "I can help you analyze the Titanic dataset! Try asking about:\n"
+        answer += "- Gender distribution (e.g., 'What percentage were male?')\n"
+        answer += "- Age analysis (e.g., 'Show me a histogram of ages')\n"
+        answer += "- Ticket fares (e.g., 'What was the average fare?')\n"
+        answer += "- Embarkation ports (e.g., 'How many from each port?')\n"
+        answer += f"\nCurrent dataset has {analyzer.stats.total} passengers."
+        return {"answer": answer}
 
 
 # Test the agent
@@ -0,0 +1,217 @@
+"""
+HTTP client for the backend API, used by the Streamlit frontend
+"""
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Client configuration - overridable through the environment
+API_URL = os.environ.get("TITANIC_API_URL", "http://localhost:8000")
+API_RETRIES = int(os.environ.get("TITANIC_API_RETRIES", "2"))  # Extra attempts after a failed connection or 502/503/504
+API_BACKOFF = float(os.environ.get("TITANIC_API_BACKOFF", "0.2"))  # Base delay in seconds, doubled per retry, jittered
+API_COOLDOWN = float(os.environ.get("TITANIC_API_COOLDOWN", "10"))  # Seconds to use fallbacks after the API was unreachable
+API_CACHE_TTL = float(os.environ.get("TITANIC_API_CACHE_TTL", "300"))  # Seconds a GET is reused before revalidating
+POOL_SIZE = 8
+
+# Responses that mean "try again shortly" (restarting worker, warm-up, proxy)
+RETRY_STATUSES = frozenset({502, 503, 504})
+
+# Shown when neither the API nor the local dataset can answer
+PLACEHOLDER_STATS = {"total_passengers": 891, "male_percentage": 64.76, "survival_rate": 38.38, "features": 12}
+
+
+class ApiUnavailable(Exception):
+    """The backend could not be reached (or failed recently and is cooling down)"""
+
+
+@lru_cache(maxsize=1)
+def _local_frame():
+    from data_loader import load_titanic_data
+    return load_titanic_data()
+
+
+@lru_cache(maxsize=1)
+def local_stats() -> Dict[str, Any]:
+    """The /stats payload computed from the local dataset, or placeholders without one"""
+    try:
+        df = _local_frame()
+    except Exception:
+        return dict(PLACEHOLDER_STATS)
+    return {
+        "total_passengers": len(df),
+        "male_percentage": round(float((df["Sex"] == "male").mean() * 100), 2),
+        "survival_rate": round(float(df["Survived"].mean() * 100), 2),
+        "features": len(df.columns),
+    }
+
+
+@lru_cache(maxsize=1)
+def local_info() -> Dict[str, Any]:
+    """The /info payload computed from the local dataset"""
+    from data_loader import get_dataset_info
+    return get_dataset_info(_local_frame())
+
+
+# Path -> local computation used when the API cannot answer it
+FALLBACKS: Dict[str, Callable[[], Dict[str, Any]]] = {
+    "/stats": local_stats,
+    "/info": local_info,
+}
+
+
+class ApiClient:
+    """
+    Pooled keep-alive session with retries, concurrent GETs and fallbacks.
+
+    Failed connections and 502/503/504 responses are retried with
+    exponential backoff and full jitter. Once the API has been unreachable,
+    calls fail immediately for `cooldown` seconds, so a page does not wait
+    on connection attempts and retries every rerun while the API is down.
+    GET responses are kept for `cache_ttl` seconds and then revalidated
+    with their ETag.
+    """
+
+    def __init__(self, base_url: str = API_URL, retries: int = API_RETRIES, backoff: float = API_BACKOFF,
+                 cooldown: float = API_COOLDOWN, cache_ttl: float = API_CACHE_TTL, pool_size: int = POOL_SIZE,
+                 fallbacks: Optional[Dict[str, Callable[[], Dict[str, Any]]]] = None,
+                 clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep):
+        self.base_url = base_url.rstrip("/")
+        self.retries = retries
+        self.backoff = backoff
+        self.cooldown = cooldown
+        self.cache_ttl = cache_ttl
+        self.fallbacks = FALLBACKS if fallbacks is None else fallbacks
+        self.clock = clock
+        self.sleep = sleep
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="api-client")
+        self._cache: Dict[str, Tuple[float, Optional[str], Dict[str, Any]]] = {}  # path -> (fetched, ETag, body)
+        self._lock = threading.Lock()
+        self._down_until = 0.0
+        self.retried = 0
+        self.fallbacks_used = 0
+
+    @property
+    def available(self) -> bool:
+        """False while cooling down after the API was unreachable"""
+        return self.clock() >= self._down_until
+
+    def request(self, method: str, path: str, timeout: float = 5, **kwargs) -> requests.Response:
+        """
+        Send a request, retrying failed connections and 502/503/504.
+
+        Raises:
+            ApiUnavailable: If the API could not be reached (now or recently)
+            requests.HTTPError: If the API answered with an error status
+        """
+        if not self.available:
+            raise ApiUnavailable(f"{self.base_url} is unreachable; retrying after the cool-down")
+        for attempt in range(self.retries + 1):
+            try:
+                response = self.session.request(method, f"{self.base_url}{path}", timeout=timeout, **kwargs)
+            except requests.ConnectionError as e:
+                if attempt == self.retries:
+                    self._down_until = self.clock() + self.cooldown
+                    raise ApiUnavailable(str(e)) from e
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt == self.retries:
+                    response.raise_for_status()
+                    return response
+                response.close()
+            self.retried += 1
+            self.sleep(random.uniform(0, self.backoff * 2 ** attempt))
+        raise AssertionError("unreachable")
+
+    def get_json(self, path: str, timeout: float = 5) -> Dict[str, Any]:
+        """
+        GET a JSON resource, reusing the cached copy within the TTL and
+        revalidating it after (the stale copy is returned if that fails).
+        """
+        with self._lock:
+            cached = self._cache.get(path)
+        if cached is not None and self.clock() - cached[0] < self.cache_ttl:
+            return cached[2]
+        headers = {"If-None-Match": cached[1]} if cached is not None and cached[1] else {}
+        try:
+            response = self.request("GET", path, timeout=timeout, headers=headers)
+        except (ApiUnavailable, requests.RequestException):
+            if cached is None:
+                raise
+            return cached[2]  # stale beats nothing while the API is down
+        body = cached[2] if response.status_code == 304 else response.json()
+        with self._lock:
+            self._cache[path] = (self.clock(), response.headers.get("ETag"), body)
+        return body
+
+    def get_many(self, paths: Dict[str, str], timeout: float = 5) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        GET several JSON resources concurrently.
+
+        Args:
+            paths: Name -> path
+            timeout: Per-request timeout in seconds
+
+        Returns:
+            Name -> body; a resource the API could not serve comes from its
+            local fallback, or is None if it has none
+        """
+        futures = {name: self._executor.submit(self.get_json, path, timeout) for name, path in paths.items()}
+        results = {}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except (ApiUnavailable, requests.RequestException, ValueError):
+                results[name] = self.fallback(paths[name])
+        return results
+
+    def fallback(self, path: str) -> Optional[Dict[str, Any]]:
+        """The local answer for `path`, or None if there is none"""
+        compute = self.fallbacks.get(path)
+        if compute is None:
+            return None
+        try:
+            result = compute()
+        except Exception:
+            return None
+        self.fallbacks_used += 1
+        return result
+
+    def chat(self, query: str, timeout: float = 30) -> Dict[str, Any]:
+        """POST /chat"""
+        return self.request("POST", "/chat", timeout=timeout, json={"query": query}).json()
+
+    def stream(self, query: str, image_format: str = "png", timeout: float = 30) -> Iterator[Dict[str, Any]]:
+        """
+        POST /chat/stream and yield its events; the chart is pre-rendered in `image_format`.
+
+        Only opening the stream is retried: events already shown can't be taken back.
+        """
+        body = {"query": query, "image_format": image_format}
+        with self.request("POST", "/chat/stream", timeout=timeout, json=body, stream=True) as response:
+            for line in response.iter_lines():
+                if line:
+                    yield json.loads(line)
+
+    def get_bytes(self, path: str, timeout: float = 30, **kwargs) -> bytes:
+        """GET a binary resource (a chart)"""
+        return self.request("GET", path, timeout=timeout, **kwargs).content
+
+    def clear_cache(self):
+        """Forget cached GET responses"""
+        with self._lock:
+            self._cache.clear()
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        self.session.close()
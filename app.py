@@ -2,10 +2,8 @@
 Streamlit Frontend for Titanic Chatbot
 """
 import streamlit as st
-import requests
-import base64
-from io import BytesIO
-from PIL import Image
+
+from api_client import ApiClient, ApiUnavailable, PLACEHOLDER_STATS
 
 # Page configuration
 st.set_page_config(
@@ -15,37 +13,51 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# API endpoint - configurable
-API_URL = "http://localhost:8000"
+# Chart format the stream pre-renders and the app then fetches (one render per chart)
+CHART_FORMAT = "webp"
+
+UNREACHABLE = "Error: Could not connect to backend. Make sure the API is running on port 8000."
+
+
+@st.cache_resource
+def get_client() -> ApiClient:
+    """
+    One API client shared by every rerun: pooled keep-alive connections,
+    retries, cached GETs and local fallbacks (see api_client.py)
+    """
+    return ApiClient()
+
 
+def fetch_page_data() -> dict:
+    """Quick Stats and dataset info, fetched concurrently (cached between reruns)"""
+    return get_client().get_many({"stats": "/stats", "info": "/info"})
 
-def call_api(query: str) -> dict:
-    """Call the FastAPI backend"""
+
+def stream_api(query: str):
+    """Call the streaming chat endpoint; yields events as the backend sends them"""
     try:
-        response = requests.post(
-            f"{API_URL}/chat",
-            json={"query": query},
-            timeout=30
-        )
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.ConnectionError:
-        return {"answer": "Error: Could not connect to backend. Make sure the API is running on port 8000.", "visualization": None}
+        yield from get_client().stream(query, image_format=CHART_FORMAT)
+    except ApiUnavailable:
+        yield {"event": "answer", "answer": UNREACHABLE}
     except Exception as e:
-        return {"answer": f"Error: {str(e)}", "visualization": None}
+        yield {"event": "answer", "answer": f"Error: {str(e)}"}
 
 
-def display_image(base64_str: str):
-    """Display base64 encoded image"""
-    if base64_str:
-        image_data = base64.b64decode(base64_str)
-        image = Image.open(BytesIO(image_data))
-        st.image(image, use_container_width=True)
+def display_visualization(url: str):
+    """Fetch a chart from the API's /viz endpoint (the URL names the pre-rendered format) and display the raw bytes"""
+    try:
+        content = get_client().get_bytes(url)
+        st.image(content, use_container_width=True)
+    except Exception as e:
+        st.error(f"Could not load visualization: {str(e)}")
 
 
 def main():
     """Main Streamlit application"""
     
+    # Every GET the page needs, concurrently, before anything is drawn
+    page_data = fetch_page_data()
+    
     # Header
     st.title("🚢 Titanic Dataset Chatbot")
     st.markdown("""
@@ -76,19 +88,15 @@ def main():
     # Dataset info in sidebar
     st.sidebar.title("📊 Dataset Info")
     if st.sidebar.button("Load Dataset Info"):
-        try:
-            info_response = requests.get(f"{API_URL}/info", timeout=10)
-            if info_response.status_code == 200:
-                info = info_response.json()
-                st.sidebar.markdown(f"**Total Passengers:** {info['shape'][0]}")
-                st.sidebar.markdown(f"**Columns:** {len(info['columns'])}")
-                st.sidebar.markdown("**Features:**")
-                for col in info['columns']:
-                    st.sidebar.markdown(f"  - {col}")
-            else:
-                st.sidebar.error("Could not load dataset info")
-        except:
+        info = page_data["info"]
+        if info is None:
             st.sidebar.error("API not available")
+        else:
+            st.sidebar.markdown(f"**Total Passengers:** {info['shape'][0]}")
+            st.sidebar.markdown(f"**Columns:** {len(info['columns'])}")
+            st.sidebar.markdown("**Features:**")
+            for col in info['columns']:
+                st.sidebar.markdown(f"  - {col}")
     
     # Main chat interface
     st.markdown("### 💬 Ask Your Question")
@@ -112,17 +120,19 @@ def main():
     
     # Submit button
     if st.button("Ask", type="primary", disabled=not query):
+        # The answer text arrives first; the chart follows when it is rendered
+        answer_shown = False
         with st.spinner("Analyzing..."):
-            result = call_api(query)
-            
-            # Display answer
-            st.markdown("### 📝 Answer")
-            st.markdown(result.get("answer", "No answer received"))
-            
-            # Display visualization if available
-            if result.get("visualization"):
-                st.markdown("### 📈 Visualization")
-                display_image(result["visualization"])
+            for event in stream_api(query):
+                if event["event"] == "answer" and not answer_shown:
+                    st.markdown("### 📝 Answer")
+                    st.markdown(event.get("answer") or "No answer received")
+                    answer_shown = True
+                elif event["event"] == "visualization":
+                    st.markdown("### 📈 Visualization")
+                    display_visualization(event["visualization_url"])
+                elif event["event"] == "error":
+                    st.error(f"Could not load visualization: {event.get('detail')}")
     
     # Quick stats section
     st.markdown("---")
@@ -130,40 +140,12 @@ def main():
     
     col1, col2, col3, col4 = st.columns(4)
     
-    try:
-        info_response = requests.get(f"{API_URL}/info", timeout=5)
-        if info_response.status_code == 200:
-            info = info_response.json()
-            total = info['shape'][0]
-            
-            # Get gender info
-            gender_result = call_api("What percentage were male?")
-            if gender_result.get("answer"):
-                # Extract male percentage
-                import re
-                match = re.search(r'Male:.*?\(([\d.]+)%\)', gender_result["answer"])
-                male_pct = match.group(1) if match else "N/A"
-            else:
-                male_pct = "N/A"
-            
-            # Get survival rate
-            survival_result = call_api("What was the survival rate?")
-            if survival_result.get("answer"):
-                match = re.search(r'Overall Survival Rate: ([\d.]+)%', survival_result["answer"])
-                survival_pct = match.group(1) if match else "N/A"
-            else:
-                survival_pct = "N/A"
-            
-            col1.metric("Total Passengers", f"{total}")
-            col2.metric("Male Percentage", f"{male_pct}%")
-            col3.metric("Survival Rate", f"{survival_pct}%")
-            col4.metric("Features", f"{len(info['columns'])}")
-    except:
-        # Show placeholder metrics when API not available
-        col1.metric("Total Passengers", "891")
-        col2.metric("Male Percentage", "64.76%")
-        col3.metric("Survival Rate", "38.38%")
-        col4.metric("Features", "12")
+    # Computed locally (or placeholders) when the API is not available
+    stats = page_data["stats"] or PLACEHOLDER_STATS
+    col1.metric("Total Passengers", f"{stats['total_passengers']}")
+    col2.metric("Male Percentage", f"{stats['male_percentage']:.2f}%")
+    col3.metric("Survival Rate", f"{stats['survival_rate']:.2f}%")
+    col4.metric("Features", f"{stats['features']}")
     
     # Footer
     st.markdown("---")
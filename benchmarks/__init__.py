@@ -0,0 +1,4 @@
+"""
+Benchmarks for the Titanic chatbot. Run from the repo root with
+`python -m benchmarks.<name>`.
+"""
@@ -0,0 +1,106 @@
+"""
+Per-query latency of analyze_* methods: DataFrame rescans vs TitanicStatsIndex.
+
+Usage:
+    python -m benchmarks.analyze_latency [--repeat 2000] [--scale 1]
+"""
+import argparse
+import timeit
+
+import pandas as pd
+
+from agent import TitanicAnalyzer
+from stats_index import TitanicStatsIndex
+
+PORT_NAMES = {'S': 'Southampton', 'C': 'Cherbourg', 'Q': 'Queenstown'}
+
+
+# Reference implementations that rescan the DataFrame on every call
+def scan_gender(df):
+    total = len(df)
+    male_count = len(df[df['Sex'] == 'male'])
+    female_count = len(df[df['Sex'] == 'female'])
+    return f"""Gender Distribution:
+- Male: {male_count} ({male_count / total * 100:.2f}%)
+- Female: {female_count} ({female_count / total * 100:.2f}%)
+"""
+
+
+def scan_age(df):
+    age_stats = df['Age'].describe()
+    return f"""Age Statistics:
+- Mean Age: {age_stats['mean']:.2f} years
+- Median Age: {df['Age'].median():.2f} years
+- Min Age: {age_stats['min']:.2f} years
+- Max Age: {age_stats['max']:.2f} years
+- Std Dev: {age_stats['std']:.2f}
+"""
+
+
+def scan_fare(df):
+    fare_stats = df['Fare'].describe()
+    return f"""Ticket Fare Statistics:
+- Mean Fare: ${fare_stats['mean']:.2f}
+- Median Fare: ${df['Fare'].median():.2f}
+- Min Fare: ${fare_stats['min']:.2f}
+- Max Fare: ${fare_stats['max']:.2f}
+- Std Dev: ${fare_stats['std']:.2f}
+"""
+
+
+def scan_embarkation(df):
+    embark_counts = df['Embarked'].value_counts()
+    total = len(df.dropna(subset=['Embarked']))
+    result = "Embarkation Port Distribution:\n"
+    for port, count in embark_counts.items():
+        result += f"- {PORT_NAMES.get(port, port)} ({port}): {count} passengers ({count / total * 100:.2f}%)\n"
+    return result
+
+
+def scan_survival(df):
+    survival_by_sex = df.groupby('Sex')['Survived'].mean() * 100
+    survival_by_class = df.groupby('Pclass')['Survived'].mean() * 100
+    result = "Survival Analysis:\n"
+    result += f"- Overall Survival Rate: {df['Survived'].mean()*100:.2f}%\n\n"
+    result += "By Sex:\n"
+    for sex, rate in survival_by_sex.items():
+        result += f"  - {sex.capitalize()}: {rate:.2f}%\n"
+    result += "\nBy Class:\n"
+    for pclass, rate in survival_by_class.items():
+        result += f"  - Class {pclass}: {rate:.2f}%\n"
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=2000)
+    parser.add_argument("--scale", type=int, default=1, help="Replicate the dataset this many times")
+    args = parser.parse_args()
+
+    analyzer = TitanicAnalyzer()
+    if args.scale > 1:
+        analyzer.df = pd.concat([analyzer.df] * args.scale, ignore_index=True)
+    df = analyzer.df
+
+    build = timeit.timeit(lambda: TitanicStatsIndex(df), number=5) / 5
+    analyzer.stats = TitanicStatsIndex(df)
+    print(f"rows={len(df)}  index build: {build * 1000:.2f} ms")
+    print(f"{'method':<22}{'scan (us)':>12}{'index (us)':>12}{'speedup':>10}")
+
+    cases = [
+        ("analyze_gender", scan_gender, analyzer.analyze_gender),
+        ("analyze_age", scan_age, lambda: analyzer.analyze_age()[0]),
+        ("analyze_fare", scan_fare, analyzer.analyze_fare),
+        ("analyze_embarkation", scan_embarkation, analyzer.analyze_embarkation),
+        ("analyze_survival", scan_survival, analyzer.analyze_survival),
+    ]
+    for name, scan, indexed in cases:
+        if scan(df) != indexed():
+            raise SystemExit(f"{name}: indexed answer differs from the DataFrame scan")
+        before = timeit.timeit(lambda: scan(df), number=args.repeat) / args.repeat
+        after = timeit.timeit(indexed, number=args.repeat) / args.repeat
+        print(f"{name:<22}{before * 1e6:>12.1f}{after * 1e6:>12.1f}{before / after:>9.0f}x")
+
+
+if __name__ == "__main__":
+    main()
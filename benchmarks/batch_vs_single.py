@@ -0,0 +1,62 @@
+"""
+N single /chat calls vs one /chat/batch call carrying the same N queries.
+
+Usage:
+    python -m benchmarks.batch_vs_single [--n 48]
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+
+import main
+
+DASHBOARD_QUERIES = [
+    "What percentage of passengers were male on the Titanic?",
+    "Show me a histogram of passenger ages",
+    "What was the average ticket fare?",
+    "How many passengers embarked from each port?",
+    "Show me survival rates by class",
+    "What's the overall survival rate?",
+    "Show me a gender pie chart",
+    "Show me a histogram of fares",
+    "What was the average age?",
+    "Show me a bar chart of embarkation ports",
+    "Give me a summary of the dataset",
+    "What percentage were male?",
+]
+
+
+async def single_calls(client, queries):
+    responses = await asyncio.gather(
+        *(client.post("/chat", json={"query": q, "include_base64": True}) for q in queries)
+    )
+    return [r.json() for r in responses]
+
+
+async def batch_call(client, queries):
+    response = await client.post("/chat/batch", json={"queries": queries, "include_base64": True})
+    return response.json()["results"]
+
+
+async def run(n: int):
+    queries = [DASHBOARD_QUERIES[i % len(DASHBOARD_QUERIES)] for i in range(n)]
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        for name, call in (("single", single_calls), ("batch", batch_call)):
+            # Start every mode cold so both have to render their charts
+            main.agent.analyzer.render_cache.clear()
+            start = time.perf_counter()
+            results = await call(client, queries)
+            elapsed = time.perf_counter() - start
+            answered = sum(1 for r in results if r.get("answer"))
+            print(f"{name:>6}: {n} queries in {elapsed * 1000:8.1f} ms "
+                  f"({answered} answered, {n / elapsed:,.0f} queries/s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--n", type=int, default=48)
+    args = parser.parse_args()
+    asyncio.run(run(args.n))
@@ -0,0 +1,61 @@
+"""
+Encode time and payload size per chart type, format and render profile.
+
+Every render bypasses the render cache. Time is split into draw (building
+the figure) and save (layout, rasterizing and encoding).
+
+Usage:
+    python -m benchmarks.chart_encoding [--repeat 5] [--formats png,webp,svg] [--profiles default,fast,...]
+"""
+import argparse
+import statistics
+import time
+
+from agent import CHART_KINDS, TitanicAnalyzer, load_charts
+from render_options import PROFILES
+
+
+def measure(analyzer, charts, kind, format, options, repeat):
+    draw = getattr(analyzer, f"_draw_{kind}")
+    draw_times, save_times = [], []
+    for i in range(repeat + 1):
+        t0 = time.perf_counter()
+        fig = draw(charts, options)
+        t1 = time.perf_counter()
+        data = charts.figure_to_bytes(fig, format, options)
+        t2 = time.perf_counter()
+        if i:  # the first round only warms up
+            draw_times.append(t1 - t0)
+            save_times.append(t2 - t1)
+    return statistics.median(draw_times) * 1000, statistics.median(save_times) * 1000, len(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--formats", default="png,webp,svg")
+    parser.add_argument("--profiles", default=",".join(PROFILES))
+    args = parser.parse_args()
+
+    analyzer = TitanicAnalyzer()
+    charts = load_charts()
+    charts.warm_up()
+    formats = args.formats.split(",")
+    profiles = args.profiles.split(",")
+
+    print(f"{'chart':<20}{'format':<7}{'profile':<11}{'draw ms':>9}{'save ms':>9}{'total ms':>10}{'KB':>9}{'vs default':>12}")
+    for kind in CHART_KINDS:
+        for format in formats:
+            baseline = None
+            for profile in profiles:
+                draw, save, size = measure(analyzer, charts, kind, format, PROFILES[profile], args.repeat)
+                total = draw + save
+                if baseline is None:
+                    baseline = total
+                print(f"{kind:<20}{format:<7}{profile:<11}{draw:>9.1f}{save:>9.1f}{total:>10.1f}"
+                      f"{size / 1024:>9.1f}{baseline / total:>11.2f}x")
+        print()
+
+
+if __name__ == "__main__":
+    main()
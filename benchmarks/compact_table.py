@@ -0,0 +1,151 @@
+"""
+Memory and speed of the compact passenger table (passenger_table.py).
+
+For each scale, compares the bytes held by the analysed columns as parsed
+from the CSV (object strings, int64, float64), as loaded from the columnar
+snapshot and as a PassengerTable, then the time to build the stats index
+and the query engine from each and to answer a few ad-hoc queries. The
+compact answers are checked against the DataFrame ones: counts must be
+equal and float statistics within float32 precision. Exits non-zero if
+any check fails.
+
+Usage:
+    python -m benchmarks.compact_table [--scales 1,100,1000] [--repeat 5]
+"""
+import argparse
+import math
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from benchmarks.synthetic import write_scaled_csv
+from passenger_table import CODED_COLUMNS, MEASURE_COLUMNS, CompactStatsIndex, PassengerTable
+from query_engine import QueryEngine, parse_query
+from snapshot import load_snapshot
+from stats_index import TitanicStatsIndex
+
+ANALYSED_COLUMNS = list(CODED_COLUMNS) + ["Survived"] + list(MEASURE_COLUMNS)
+
+QUERIES = [
+    "survival rate of women in class 3 by port",
+    "average fare of survivors over 60",
+    "how many children under 10 survived by class",
+    "average age of men in first class who paid more than 50",
+]
+
+# float32 keeps ~7 significant digits; sums are accumulated in float64
+TOLERANCE = 1e-5
+
+
+def best_of(repeat, fn):
+    best = math.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def frame_bytes(df):
+    return int(df[ANALYSED_COLUMNS].memory_usage(index=False, deep=True).sum())
+
+
+def close(a, b):
+    if isinstance(a, float) or isinstance(b, float):
+        if a is None or b is None:
+            return a is b
+        if math.isnan(a) and math.isnan(b):
+            return True
+        return abs(a - b) <= TOLERANCE * max(abs(a), abs(b), 1.0)
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(close(a[k], b[k]) for k in a)
+    if isinstance(a, (list, tuple)) and isinstance(b, (list, tuple)):
+        return len(a) == len(b) and all(close(x, y) for x, y in zip(a, b))
+    return a == b
+
+
+def check_stats(expected, compact, label):
+    failures = 0
+    for name in ("total", "survived", "survival_rate", "sex_counts", "pclass_counts", "embarked_counts",
+                 "embarked_total", "by_sex", "by_pclass", "by_embarked", "by_sex_pclass", "by_sex_embarked",
+                 "by_pclass_embarked", "age", "fare"):
+        if not close(getattr(expected, name), getattr(compact, name)):
+            failures += 1
+            print(f"FAIL {label}: {name} differs")
+    return failures
+
+
+def check_queries(expected, compact, label):
+    failures = 0
+    for query in QUERIES:
+        spec = parse_query(query)
+        if not close(expected.execute(spec), compact.execute(spec)):
+            failures += 1
+            print(f"FAIL {label}: {query!r} differs")
+    return failures
+
+
+def measure(scale, repeat):
+    path = write_scaled_csv(scale, os.path.join(tempfile.gettempdir(), f"titanic_x{scale}.csv"))
+    parsed = pd.read_csv(path)
+    snapshot = load_snapshot(path, os.path.join(tempfile.gettempdir(), f"titanic_x{scale}.snapshot"))
+    table = PassengerTable.from_frame(snapshot)
+
+    stats = TitanicStatsIndex(snapshot)
+    compact_stats = CompactStatsIndex(table)
+    engine = QueryEngine(snapshot)
+    compact_engine = QueryEngine(table.analysis_frame())
+    failures = check_stats(stats, compact_stats, f"x{scale}")
+    failures += check_queries(engine, compact_engine, f"x{scale}")
+
+    specs = [parse_query(query) for query in QUERIES]
+
+    def run_queries(target):
+        for spec in specs:
+            target.index._masks.clear()  # time compiling the filters, not the mask cache
+            target.execute(spec)
+
+    return {
+        "rows": table.rows,
+        "bytes": {"csv": frame_bytes(parsed), "snapshot": frame_bytes(snapshot), "compact": table.nbytes},
+        "stats": (best_of(repeat, lambda: TitanicStatsIndex(snapshot)),
+                  best_of(repeat, lambda: CompactStatsIndex(table))),
+        "engine": (best_of(repeat, lambda: QueryEngine(snapshot)),
+                   best_of(repeat, lambda: QueryEngine(table.analysis_frame()))),
+        "queries": (best_of(repeat, lambda: run_queries(engine)),
+                    best_of(repeat, lambda: run_queries(compact_engine))),
+        "failures": failures,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scales", default="1,100,1000")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    failures = 0
+    print(f"{'scale':>6}{'rows':>10}{'CSV MB':>9}{'snap MB':>9}{'compact MB':>12}{'vs CSV':>8}{'vs snap':>9}")
+    results = {}
+    for scale in (int(s) for s in args.scales.split(",")):
+        result = results[scale] = measure(scale, args.repeat)
+        failures += result["failures"]
+        sizes = result["bytes"]
+        print(f"{scale:>6}{result['rows']:>10}{sizes['csv'] / 1e6:>9.2f}{sizes['snapshot'] / 1e6:>9.2f}"
+              f"{sizes['compact'] / 1e6:>12.2f}{sizes['csv'] / sizes['compact']:>7.1f}x"
+              f"{sizes['snapshot'] / sizes['compact']:>8.1f}x")
+
+    print(f"\n{'scale':>6}{'step':>10}{'DataFrame ms':>14}{'compact ms':>12}{'speedup':>9}")
+    for scale, result in results.items():
+        for step in ("stats", "engine", "queries"):
+            frame, compact = result[step]
+            print(f"{scale:>6}{step:>10}{frame * 1000:>14.2f}{compact * 1000:>12.2f}{frame / compact:>8.1f}x")
+    print(f"{failures} failed checks")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
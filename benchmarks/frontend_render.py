@@ -0,0 +1,156 @@
+"""
+Backend time of one Streamlit page render, through api_client.ApiClient.
+
+A stand-in backend (canned /stats and /info with ETags, a fixed delay per
+request and an optional share of 503s) runs on a local port. One page
+render fetches /stats and /info, which is compared:
+  sequential, fresh connection per call   (requests.get, as app.py once did)
+  sequential, pooled session
+  ApiClient, concurrent, cold cache
+  ApiClient, revalidating (TTL 0, answered by 304)
+  ApiClient, cached
+Then the backend fails a share of requests (retries vs none) and is
+stopped (first render pays the retries, later ones use the local fallback
+during the cool-down). Exits non-zero if a check fails.
+
+Usage:
+    python -m benchmarks.frontend_render [--renders 50] [--latency-ms 20] [--fail-rate 0.3]
+"""
+import argparse
+import asyncio
+import random
+import socket
+import sys
+import threading
+import time
+
+import requests
+import uvicorn
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
+
+from api_client import ApiClient, local_info, local_stats
+
+PAGE = {"stats": "/stats", "info": "/info"}
+
+
+class StandIn:
+    """Backend double whose latency and failure rate can change between runs"""
+
+    def __init__(self):
+        self.latency = 0.0
+        self.fail_rate = 0.0
+        self.app = FastAPI()
+        bodies = {"/stats": local_stats(), "/info": local_info()}
+
+        @self.app.get("/stats")
+        @self.app.get("/info")
+        async def resource(request: Request):
+            await asyncio.sleep(self.latency)
+            if random.random() < self.fail_rate:
+                return Response(status_code=503)
+            etag = f'"{request.url.path}-v1"'
+            if request.headers.get("if-none-match") == etag:
+                return Response(status_code=304, headers={"ETag": etag})
+            return JSONResponse(bodies[request.url.path], headers={"ETag": etag})
+
+    def start(self) -> str:
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        self.server = uvicorn.Server(uvicorn.Config(self.app, host="127.0.0.1", port=port, log_level="warning"))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.05)
+        return f"http://127.0.0.1:{port}"
+
+    def stop(self):
+        self.server.should_exit = True
+        self.thread.join()
+
+
+def measure(name, render, renders):
+    timings = []
+    for _ in range(renders):
+        start = time.perf_counter()
+        render()
+        timings.append((time.perf_counter() - start) * 1000)
+    ordered = sorted(timings)
+    median = ordered[len(ordered) // 2]
+    print(f"{name:<40} first {timings[0]:8.2f} ms   median {median:8.2f} ms   max {ordered[-1]:8.2f} ms")
+    return median
+
+
+def sequential_fresh(url):
+    return {name: requests.get(f"{url}{path}", timeout=5).json() for name, path in PAGE.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--renders", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--fail-rate", type=float, default=0.3)
+    args = parser.parse_args()
+
+    backend = StandIn()
+    url = backend.start()
+    backend.latency = args.latency_ms / 1000
+    failures = 0
+    print(f"stand-in backend with {args.latency_ms:.0f} ms per request; a page render GETs {', '.join(PAGE.values())}")
+
+    session = requests.Session()
+    client = ApiClient(url)
+    sequential = measure("sequential, fresh connections", lambda: sequential_fresh(url), args.renders)
+    measure("sequential, pooled session",
+            lambda: {name: session.get(f"{url}{path}", timeout=5).json() for name, path in PAGE.items()},
+            args.renders)
+
+    def cold():
+        client.clear_cache()
+        return client.get_many(PAGE)
+    concurrent = measure("ApiClient concurrent, cold cache", cold, args.renders)
+    revalidating = ApiClient(url, cache_ttl=0)
+    measure("ApiClient concurrent, revalidating (304)", lambda: revalidating.get_many(PAGE), args.renders)
+    measure("ApiClient, cached", lambda: client.get_many(PAGE), args.renders)
+    if concurrent > sequential * 0.75:
+        failures += 1
+        print("FAIL concurrent render is not faster than sequential calls")
+    if cold() != sequential_fresh(url):
+        failures += 1
+        print("FAIL the client returned different data")
+
+    print(f"\nbackend answers {args.fail_rate:.0%} of requests with 503")
+    backend.fail_rate = args.fail_rate
+    for retries in (0, 2):
+        flaky = ApiClient(url, retries=retries, backoff=0.01, cooldown=0)
+
+        def render():
+            flaky.clear_cache()  # no stale copy to fall back on
+            return flaky.get_many(PAGE)
+        measure(f"ApiClient, {retries} retries", render, args.renders)
+        served = 1 - flaky.fallbacks_used / (args.renders * len(PAGE))
+        print(f"{'':<40} {served:.0%} from the API, {flaky.retried} retries, {flaky.fallbacks_used} fallbacks")
+    backend.fail_rate = 0.0
+
+    print("\nbackend stopped")
+    backend.stop()
+    down = ApiClient(url)
+    results = []
+    measure("ApiClient, fallback", lambda: results.append(down.get_many(PAGE)), args.renders)
+    expected = {"stats": local_stats(), "info": local_info()}
+    if any(result != expected for result in results):
+        failures += 1
+        print("FAIL a render while the API was down got no local answer")
+    start = time.perf_counter()
+    down.get_many(PAGE)
+    if time.perf_counter() - start > 0.05:
+        failures += 1
+        print("FAIL renders during the cool-down still wait on the API")
+
+    print(f"{failures} failed checks")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
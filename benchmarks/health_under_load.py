@@ -0,0 +1,88 @@
+"""
+Measure /health latency while /chat is busy rendering charts.
+
+Usage:
+    python -m benchmarks.health_under_load [--executor inline|thread|process] [--seconds 5]
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+
+import main
+import render_cache
+from render_pool import RenderExecutor
+
+CHART_QUERIES = [
+    "Show me a histogram of passenger ages",
+    "Show me survival rates by class",
+    "Show me a gender pie chart",
+    "Show me a bar chart of embarkation ports",
+]
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+async def chat_load(client, stop_at, counts):
+    """Keep sending chart queries until the deadline"""
+    i = 0
+    while time.perf_counter() < stop_at:
+        response = await client.post(
+            "/chat", json={"query": CHART_QUERIES[i % len(CHART_QUERIES)], "include_base64": True}
+        )
+        counts[response.status_code] = counts.get(response.status_code, 0) + 1
+        i += 1
+
+
+async def health_probe(client, stop_at, latencies):
+    """Poll /health and record latency in milliseconds"""
+    while time.perf_counter() < stop_at:
+        start = time.perf_counter()
+        await client.get("/health")
+        latencies.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(0.01)
+
+
+async def run(kind: str, seconds: float, concurrency: int):
+    # Measure real rendering work, not render cache hits (workers inherit this)
+    render_cache.default_cache.clear()
+    render_cache.default_cache.max_bytes = 0
+    executor = RenderExecutor(main.agent, kind=kind)
+    main.render_executor = executor
+    transport = httpx.ASGITransport(app=main.app)
+    latencies, counts = [], {}
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            stop_at = time.perf_counter() + seconds
+            await asyncio.gather(
+                health_probe(client, stop_at, latencies),
+                *(chat_load(client, stop_at, counts) for _ in range(concurrency)),
+            )
+    finally:
+        executor.shutdown()
+
+    print(f"executor={kind} concurrency={concurrency} seconds={seconds}")
+    print(f"  /chat responses: {dict(sorted(counts.items()))}")
+    print(f"  /health samples: {len(latencies)}")
+    print(f"  /health p50: {percentile(latencies, 50):.2f} ms")
+    print(f"  /health p99: {percentile(latencies, 99):.2f} ms")
+    print(f"  /health max: {max(latencies):.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--executor", choices=["inline", "thread", "process"], default=None,
+                        help="Executor kind to test (default: all)")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    kinds = [args.executor] if args.executor else ["inline", "thread", "process"]
+    for kind in kinds:
+        asyncio.run(run(kind, args.seconds, args.concurrency))
@@ -0,0 +1,99 @@
+"""
+Intent accuracy and routing throughput over a labelled query corpus.
+
+Compares the IntentRouter with the substring if-chain it replaced.
+
+Usage:
+    python -m benchmarks.intent_accuracy [--repeat 200]
+"""
+import argparse
+import time
+
+from intent_router import default_router
+
+# (query, expected intent); None means the help message
+LABELLED_QUERIES = [
+    ("What percentage of passengers were male on the Titanic?", "gender"),
+    ("What percentage were male?", "gender"),
+    ("How many female passengers were there?", "gender"),
+    ("Show me a pie chart of gender", "gender"),
+    ("How many women were on board?", "gender"),
+    ("What was the ratio of men to women?", "gender"),
+    ("Show me a histogram of passenger ages", "age"),
+    ("What was the average age?", "age"),
+    ("How old was the median passenger?", "age"),
+    ("Show me the age distribution", "age"),
+    ("How many children were aboard?", "age"),
+    ("What was the average ticket fare?", "fare"),
+    ("Show me a histogram of fares", "fare"),
+    ("How much did passengers pay for tickets?", "fare"),
+    ("What was the most expensive price?", "fare"),
+    ("What did a ticket cost on average?", "fare"),
+    ("How many passengers embarked from each port?", "embarkation"),
+    ("Show me a bar chart of embarkation ports", "embarkation"),
+    ("How many people boarded at Cherbourg?", "embarkation"),
+    ("Which port did most passengers board from?", "embarkation"),
+    ("How many came from Southampton?", "embarkation"),
+    ("Show me survival rates by class", "survival"),
+    ("What's the overall survival rate?", "survival"),
+    ("What was the survival rate?", "survival"),
+    ("How many people died?", "survival"),
+    ("Did more women than men survive?", "survival"),
+    ("How many female passengers survived?", "survival"),
+    ("Survival rate of passengers from Cherbourg", "survival"),
+    ("How many survivors were there?", "survival"),
+    ("Give me a summary of the dataset", "summary"),
+    ("Can I get an overview?", "summary"),
+    ("Dataset info please", "summary"),
+    ("Hello there", None),
+    ("What can you do?", None),
+    ("Tell me something interesting", None),
+    ("Who was the captain?", None),
+]
+
+
+def legacy_route(query: str):
+    """Intent chosen by the original substring if-chain in process_query"""
+    q = query.lower()
+    if any(word in q for word in ['male', 'male percentage', 'male passengers', 'gender', 'sex']):
+        return "gender"
+    if any(word in q for word in ['age', 'ages', 'old']):
+        return "age"
+    if any(word in q for word in ['fare', 'ticket', 'price', 'cost']):
+        return "fare"
+    if any(word in q for word in ['embark', 'port', 'board', 'from']):
+        return "embarkation"
+    if any(word in q for word in ['surviv', 'died', 'dead']):
+        return "survival"
+    if 'summary' in q or 'overview' in q or 'info' in q:
+        return "summary"
+    return None
+
+
+def evaluate(name, route, repeat):
+    misses = [(q, expected, route(q)) for q, expected in LABELLED_QUERIES if route(q) != expected]
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for q, _ in LABELLED_QUERIES:
+            route(q)
+    elapsed = time.perf_counter() - start
+    total = len(LABELLED_QUERIES)
+    print(f"{name}: accuracy {total - len(misses)}/{total} "
+          f"({(total - len(misses)) / total * 100:.1f}%), "
+          f"{repeat * total / elapsed:,.0f} queries/s")
+    for q, expected, got in misses:
+        print(f"    {q!r}: expected {expected}, got {got}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    router = default_router()
+    evaluate("legacy if-chain", legacy_route, args.repeat)
+    evaluate("intent router", lambda q: router.route(q).intent, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Peak memory and accuracy: in-memory stats index vs out-of-core aggregates.
+
+Writes a scaled CSV, then in fresh processes builds the TitanicStatsIndex
+from a full DataFrame and the StreamingStatsIndex from chunks, reporting
+wall time, peak RSS and the relative error of the streamed summaries.
+
+Usage:
+    python -m benchmarks.out_of_core [--scale 2000] [--chunk-rows 20000] [--sketch-k 1000]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.synthetic import write_scaled_csv
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCRIPT = """
+import json, resource, sys, time
+import pandas as pd
+mode, path, chunk_rows, sketch_k = sys.argv[1], sys.argv[2], int(sys.argv[3]), int(sys.argv[4])
+start = time.perf_counter()
+if mode == "memory":
+    from stats_index import TitanicStatsIndex
+    stats = TitanicStatsIndex(pd.read_csv(path))
+else:
+    from streaming_stats import StreamingStatsIndex
+    stats = StreamingStatsIndex.from_csv(path, chunk_rows, sketch_k)
+elapsed = time.perf_counter() - start
+summary = {col: {k: v for k, v in getattr(stats, col).items() if k != "quantiles"} for col in ("age", "fare")}
+for col in ("age", "fare"):
+    summary[col].update({f"q{q}": v for q, v in getattr(stats, col)["quantiles"].items()})
+print(json.dumps({
+    "seconds": elapsed,
+    "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "survival_rate": stats.survival_rate,
+    "by_pclass": {str(k): v["rate"] for k, v in stats.by_pclass.items()},
+    "summary": summary,
+}))
+"""
+
+
+def run(mode, path, chunk_rows, sketch_k):
+    output = subprocess.run([sys.executable, "-c", SCRIPT, mode, path, str(chunk_rows), str(sketch_k)],
+                            cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    return json.loads(output)
+
+
+def relative_error(a, b):
+    return abs(a - b) / max(abs(b), 1e-12)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scale", type=int, default=2000)
+    parser.add_argument("--chunk-rows", type=int, default=20_000)
+    parser.add_argument("--sketch-k", type=int, default=1000)
+    args = parser.parse_args()
+
+    path = write_scaled_csv(args.scale, os.path.join(tempfile.gettempdir(), f"titanic_x{args.scale}.csv"))
+    print(f"{path}: {os.path.getsize(path) / 1e6:.0f} MB")
+
+    memory = run("memory", path, args.chunk_rows, args.sketch_k)
+    streamed = run("stream", path, args.chunk_rows, args.sketch_k)
+    print(f"{'mode':<12}{'seconds':>10}{'peak RSS MB':>14}")
+    for name, result in (("in-memory", memory), ("out-of-core", streamed)):
+        print(f"{name:<12}{result['seconds']:>10.2f}{result['peak_rss_mb']:>14.0f}")
+
+    print(f"\n{'statistic':<24}{'exact':>14}{'streamed':>14}{'rel. error':>12}")
+    rows = [("survival_rate", memory["survival_rate"], streamed["survival_rate"])]
+    rows += [(f"class {k} rate", v, streamed["by_pclass"][k]) for k, v in memory["by_pclass"].items()]
+    for col in ("age", "fare"):
+        for stat, exact in memory["summary"][col].items():
+            rows.append((f"{col} {stat}", exact, streamed["summary"][col][stat]))
+    for name, exact, approx in rows:
+        print(f"{name:<24}{exact:>14.4f}{approx:>14.4f}{relative_error(approx, exact):>12.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Throughput scaling and memory of the pre-fork server (server.py).
+
+For each worker count the server is started on a free port, /chat is
+loaded from separate client processes for a fixed time, and the memory of
+every worker is read from /proc: RSS, PSS (shared pages split between the
+processes sharing them) and USS (pages private to the worker). The largest
+worker count is also run with --no-preload, where every worker loads the
+app itself, to show what sharing saves.
+
+Linux only. Clients run on the same machine, so they compete with the
+workers for cores.
+
+Usage:
+    python -m benchmarks.prefork_scaling [--workers 1,2,4] [--seconds 5] [--clients-per-worker 2]
+"""
+import argparse
+import multiprocessing
+import os
+import re
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+QUERIES = [
+    "What percentage were male?",
+    "What was the average ticket fare?",
+    "Show me a histogram of passenger ages",
+    "How many passengers embarked from each port?",
+    "Show me survival rates by class",
+    "survival rate of women in class 3 by port",
+]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start(workers: int, preload: bool):
+    port = free_port()
+    command = [sys.executable, "server.py", "--workers", str(workers), "--host", "127.0.0.1",
+               "--port", str(port), "--log-level", "warning"]
+    if not preload:
+        command.append("--no-preload")
+    env = dict(os.environ, TITANIC_RELOAD_INTERVAL="0")
+    process = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 120
+    while len(children(process.pid)) < workers or not all_ready(url, workers):
+        if time.monotonic() > deadline or process.poll() is not None:
+            process.kill()
+            raise SystemExit(f"server with {workers} workers did not start")
+        time.sleep(0.2)
+    return process, url
+
+
+def all_ready(url: str, workers: int) -> bool:
+    """Readiness is per worker, so ask a few times more than there are workers"""
+    try:
+        return all(requests.get(f"{url}/ready", timeout=2).status_code == 200 for _ in range(workers * 4))
+    except requests.RequestException:
+        return False
+
+
+def children(pid: int):
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [int(child) for child in f.read().split()]
+    except OSError:
+        return []
+
+
+def memory_mb(pid: int):
+    """(RSS, PSS, USS) in MB from smaps_rollup"""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            match = re.match(r"(\w+):\s+(\d+) kB", line)
+            if match:
+                fields[match.group(1)] = int(match.group(2)) / 1024
+    uss = fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)
+    return fields.get("Rss", 0), fields.get("Pss", 0), uss
+
+
+def client(args):
+    url, seconds, offset = args
+    session = requests.Session()
+    done = errors = 0
+    stop_at = time.monotonic() + seconds
+    while time.monotonic() < stop_at:
+        query = QUERIES[(offset + done) % len(QUERIES)]
+        try:
+            response = session.post(f"{url}/chat", json={"query": query}, timeout=30)
+            errors += response.status_code != 200
+        except requests.RequestException:
+            errors += 1
+        done += 1
+    return done, errors
+
+
+def measure(workers: int, preload: bool, seconds: float, clients: int):
+    process, url = start(workers, preload)
+    try:
+        with multiprocessing.Pool(clients) as pool:
+            pool.map(client, [(url, 1.0, i) for i in range(clients)])  # warm every worker
+            start_time = time.perf_counter()
+            results = pool.map(client, [(url, seconds, i) for i in range(clients)])
+            elapsed = time.perf_counter() - start_time
+        pids = children(process.pid)
+        worker_memory = [memory_mb(pid) for pid in pids]
+        parent_memory = memory_mb(process.pid)
+    finally:
+        process.send_signal(signal.SIGTERM)
+        process.wait(timeout=60)
+    requests_done = sum(done for done, _ in results)
+    return {
+        "rps": requests_done / elapsed,
+        "errors": sum(errors for _, errors in results),
+        "rss": sum(m[0] for m in worker_memory) / len(worker_memory),
+        "pss": sum(m[1] for m in worker_memory) / len(worker_memory),
+        "uss": sum(m[2] for m in worker_memory) / len(worker_memory),
+        "total_pss": sum(m[1] for m in worker_memory) + parent_memory[1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    default_workers = sorted({1, 2, max(1, os.cpu_count() or 1)})
+    parser.add_argument("--workers", default=",".join(map(str, default_workers)))
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--clients-per-worker", type=int, default=2)
+    args = parser.parse_args()
+    counts = [int(n) for n in args.workers.split(",")]
+
+    print(f"{os.cpu_count()} CPUs")
+    print(f"{'workers':>8}{'mode':>12}{'req/s':>10}{'scaling':>9}{'errors':>8}"
+          f"{'RSS/wkr':>10}{'PSS/wkr':>10}{'USS/wkr':>10}{'total PSS':>11}")
+    base = None
+    runs = [(n, True) for n in counts] + [(max(counts), False)]
+    for workers, preload in runs:
+        result = measure(workers, preload, args.seconds, workers * args.clients_per_worker)
+        if preload and base is None:
+            base = result["rps"]
+        print(f"{workers:>8}{'preload' if preload else 'no-preload':>12}{result['rps']:>10.0f}"
+              f"{result['rps'] / base:>8.2f}x{result['errors']:>8}{result['rss']:>10.0f}"
+              f"{result['pss']:>10.0f}{result['uss']:>10.0f}{result['total_pss']:>11.0f}")
+    print("(memory in MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Ad-hoc filtered queries: pandas boolean masks vs the bitmap query engine.
+
+For each scale, times the index build, then each query with a cold mask
+cache (first run) and a warm one, against a pandas reference that builds
+the boolean masks from the DataFrame every time. Answers must match.
+
+Usage:
+    python -m benchmarks.query_engine [--scales 1,100,2000] [--repeat 20]
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import make_scaled_frame
+from query_engine import QueryEngine, parse_query
+
+QUERIES = [
+    "survival rate of women over 30 in class 2 from Southampton",
+    "survival rate of men in third class by port",
+    "average age of survivors in first class",
+    "fare of passengers aged between 20 and 30 who died",
+    "how many children in 3rd class embarked from Cherbourg",
+    "survival of passengers who paid over $100 by sex",
+]
+
+PANDAS_OPS = {">": "__gt__", ">=": "__ge__", "<": "__lt__", "<=": "__le__"}
+
+
+def pandas_answer(df, spec):
+    """Reference: the same query with DataFrame boolean masks"""
+    mask = np.ones(len(df), dtype=bool)
+    for flt in spec.filters:
+        column = df[flt.column]
+        if flt.op == "in":
+            mask &= column.isin(flt.value).to_numpy()
+        else:
+            mask &= getattr(column, PANDAS_OPS[flt.op])(flt.value).to_numpy()
+    subset = df[mask]
+    if spec.metric == "survival":
+        value = float(subset["Survived"].mean()) * 100 if len(subset) else None
+    elif spec.metric in ("age", "fare"):
+        value = float(subset[spec.metric.capitalize()].mean()) if len(subset) else None
+    else:
+        value = len(subset)
+    groups = None
+    if spec.group_by:
+        grouped = subset.groupby(spec.group_by, observed=True)
+        groups = {key: len(group) for key, group in grouped}
+    return len(subset), value, groups
+
+
+def engine_answer(engine, spec):
+    result = engine.execute(spec)
+    value = result["value"]
+    value = {"survival": value.get("rate_pct"), "age": value.get("mean"),
+             "fare": value.get("mean"), "count": value.get("count")}[spec.metric]
+    groups = {g["group"]: g["matched"] for g in result["groups"]} if result["groups"] is not None else None
+    return result["matched"], value, groups
+
+
+def same(a, b):
+    if a[0] != b[0] or a[2] != b[2]:
+        return False
+    if a[1] is None or b[1] is None:
+        return a[1] is b[1]
+    return abs(a[1] - b[1]) <= 1e-9 * max(1.0, abs(a[1]))
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scales", default="1,100,2000")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    specs = [parse_query(q) for q in QUERIES]
+    mismatches = 0
+    for scale in (int(s) for s in args.scales.split(",")):
+        df = make_scaled_frame(scale)
+        start = time.perf_counter()
+        engine = QueryEngine(df)
+        build_ms = (time.perf_counter() - start) * 1000
+        print(f"\nrows={len(df):,}  index build {build_ms:.1f} ms")
+        print(f"{'query':<58}{'pandas ms':>10}{'cold ms':>10}{'warm ms':>10}{'speedup':>9}")
+        for query, spec in zip(QUERIES, specs):
+            start = time.perf_counter()
+            answer = engine_answer(engine, spec)
+            cold = (time.perf_counter() - start) * 1000
+            reference = pandas_answer(df, spec)
+            if not same(answer, reference):
+                mismatches += 1
+                print(f"MISMATCH {query}: engine {answer}, pandas {reference}")
+            pandas_ms = timed(lambda: pandas_answer(df, spec), args.repeat)
+            warm = timed(lambda: engine_answer(engine, spec), args.repeat)
+            print(f"{query[:56]:<58}{pandas_ms:>10.2f}{cold:>10.2f}{warm:>10.3f}{pandas_ms / warm:>8.0f}x")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Backend cost of the Streamlit Quick Stats panel per rerun, before and after /stats.
+
+Starts the API on a local port and replays what one rerun of the panel does:
+  before: GET /info + two /chat queries (fresh connections) + regex parsing
+  after:  one GET /stats on a pooled session, cached for a TTL like st.cache_data
+
+Usage:
+    python -m benchmarks.quick_stats_rerun [--reruns 50]
+"""
+import argparse
+import re
+import socket
+import threading
+import time
+
+import requests
+import uvicorn
+
+import main
+
+
+def start_server() -> str:
+    """Run the API in a background thread; return its base URL"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}"
+
+
+def rerun_before(api_url: str):
+    """The original panel: three round trips and regex parsing"""
+    info = requests.get(f"{api_url}/info", timeout=5).json()
+    gender = requests.post(f"{api_url}/chat", json={"query": "What percentage were male?"}, timeout=30).json()
+    male_pct = re.search(r'Male:.*?\(([\d.]+)%\)', gender["answer"]).group(1)
+    survival = requests.post(f"{api_url}/chat", json={"query": "What was the survival rate?"}, timeout=30).json()
+    survival_pct = re.search(r'Overall Survival Rate: ([\d.]+)%', survival["answer"]).group(1)
+    return info["shape"][0], male_pct, survival_pct, len(info["columns"])
+
+
+class TTLCache:
+    """Stand-in for st.cache_data(ttl=...) outside a Streamlit runtime"""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.values = {}
+
+    def get(self, key, compute):
+        value, expires = self.values.get(key, (None, 0.0))
+        if time.monotonic() >= expires:
+            value = compute()
+            self.values[key] = (value, time.monotonic() + self.ttl)
+        return value
+
+
+def make_rerun_after(api_url: str, ttl: float):
+    session = requests.Session()
+    cache = TTLCache(ttl)
+
+    def rerun():
+        stats = cache.get("/stats", lambda: session.get(f"{api_url}/stats", timeout=5).json())
+        return stats["total_passengers"], stats["male_percentage"], stats["survival_rate"], stats["features"]
+    return rerun
+
+
+def measure(name, rerun, reruns):
+    timings = []
+    for _ in range(reruns):
+        start = time.perf_counter()
+        rerun()
+        timings.append((time.perf_counter() - start) * 1000)
+    ordered = sorted(timings)
+    print(f"{name:<28} first {timings[0]:7.2f} ms   median {ordered[len(ordered) // 2]:7.3f} ms   "
+          f"max {ordered[-1]:7.2f} ms   total {sum(timings):8.1f} ms")
+
+
+def run():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--reruns", type=int, default=50)
+    args = parser.parse_args()
+
+    api_url = start_server()
+    rerun_before(api_url)  # warm the server side
+
+    measure("before (/info + 2x /chat)", lambda: rerun_before(api_url), args.reruns)
+    measure("after, TTL expired", make_rerun_after(api_url, ttl=0), args.reruns)
+    measure("after, cached", make_rerun_after(api_url, ttl=300), args.reruns)
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,172 @@
+"""
+Response cache: correctness checks and throughput on repetitive traffic.
+
+Checks that normalizing a query never changes its route, that cached
+answers equal freshly computed ones, that concurrent identical misses
+compute once and that a dataset version change drops old answers. Then
+replays a skewed query mix (mostly the Streamlit sidebar examples, with
+case, punctuation and filler-word variations) with and without the cache.
+Exits non-zero if any check fails.
+
+Usage:
+    python -m benchmarks.response_cache [--requests 20000] [--threads 16]
+"""
+import argparse
+import random
+import sys
+import threading
+import time
+
+from agent import TitanicAgent
+from benchmarks.intent_accuracy import LABELLED_QUERIES
+from response_cache import ResponseCache, normalize_query
+
+SIDEBAR_EXAMPLES = [
+    "What percentage of passengers were male on the Titanic?",
+    "Show me a histogram of passenger ages",
+    "What was the average ticket fare?",
+    "How many passengers embarked from each port?",
+    "Show me survival rates by class",
+    "What's the overall survival rate?",
+]
+
+LONG_TAIL = [query for query, _ in LABELLED_QUERIES] + [
+    "survival rate of women in class 3 by port",
+    "average fare of survivors over 60",
+    "how many children under 10 survived by class",
+]
+
+
+def variants(query):
+    """Ways users type the same question"""
+    return [query, query.lower(), query.upper(), f"  {query}  ", query.rstrip("?") + "??",
+            f"Please {query[0].lower()}{query[1:]}", query.replace(" ", "  ")]
+
+
+def traffic(n, seed=0):
+    """80% sidebar examples (typed in varying ways), 20% long tail"""
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(n):
+        if rng.random() < 0.8:
+            queries.append(rng.choice(variants(rng.choice(SIDEBAR_EXAMPLES))))
+        else:
+            queries.append(rng.choice(LONG_TAIL))
+    return queries
+
+
+def check_normalization(agent):
+    failures = 0
+    for query in SIDEBAR_EXAMPLES + LONG_TAIL:
+        for variant in variants(query) + [normalize_query(query)]:
+            if agent.route(variant).key() != agent.route(query).key():
+                failures += 1
+                print(f"FAIL route changes: {query!r} vs {variant!r}")
+    return failures
+
+
+def check_answers(agent):
+    cached = TitanicAgent(response_cache=ResponseCache())
+    cached.analyzer = agent.analyzer
+    failures = 0
+    for query in SIDEBAR_EXAMPLES + LONG_TAIL:
+        for variant in variants(query):
+            expected = agent.process_query(variant, inline_images=False)
+            for _ in range(2):
+                if cached.process_query(variant, inline_images=False) != expected:
+                    failures += 1
+                    print(f"FAIL cached answer differs: {variant!r}")
+    return failures
+
+
+def check_single_flight(threads):
+    cache = ResponseCache()
+    calls = []
+    barrier = threading.Barrier(threads)
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.05)
+        return {"answer": "slow"}
+
+    def worker():
+        barrier.wait()
+        cache.get_or_compute("same", "v1", compute)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    if len(calls) != 1:
+        print(f"FAIL single-flight: {threads} concurrent misses computed {len(calls)} times")
+        return 1
+    return 0
+
+
+def check_invalidation():
+    now = [0.0]
+    cache = ResponseCache(ttl=10, clock=lambda: now[0])
+    cache.get_or_compute("q", "v1", lambda: {"answer": "old"})
+    cache.retain_version("v2")
+    failures = 0
+    if cache.stats()["entries"] != 0:
+        failures += 1
+        print("FAIL answers from the old version survived retain_version")
+    cache.get_or_compute("q", "v1", lambda: {"answer": "old"})  # late request on the old version
+    if cache.stats()["entries"] != 0:
+        failures += 1
+        print("FAIL an answer from a retired version was stored")
+    cache.get_or_compute("q", "v2", lambda: {"answer": "new"})
+    now[0] = 11
+    if cache.get_or_compute("q", "v2", lambda: {"answer": "newer"})["answer"] != "newer":
+        failures += 1
+        print("FAIL an expired answer was served")
+    return failures
+
+
+def replay(agent, queries, threads):
+    chunks = [queries[i::threads] for i in range(threads)]
+
+    def worker(chunk):
+        for query in chunk:
+            agent.process_query(query, inline_images=False)
+
+    workers = [threading.Thread(target=worker, args=(chunk,)) for chunk in chunks]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--threads", type=int, default=16)
+    args = parser.parse_args()
+
+    uncached = TitanicAgent(response_cache=ResponseCache(max_entries=0))
+    failures = check_normalization(uncached)
+    failures += check_answers(uncached)
+    failures += check_single_flight(args.threads)
+    failures += check_invalidation()
+
+    queries = traffic(args.requests)
+    cached = TitanicAgent(response_cache=ResponseCache())
+    cached.analyzer = uncached.analyzer
+    before = replay(uncached, queries, args.threads)
+    after = replay(cached, queries, args.threads)
+    stats = cached.response_cache.stats()
+    print(f"{args.requests} queries on {args.threads} threads")
+    print(f"  no cache:   {before:.2f}s  ({args.requests / before:,.0f} queries/s)")
+    print(f"  with cache: {after:.2f}s  ({args.requests / after:,.0f} queries/s)  {before / after:.1f}x")
+    print(f"  hit rate {stats['hit_rate']:.1%}: {stats['hits']} hits, {stats['coalesced']} coalesced, "
+          f"{stats['misses']} misses, {stats['entries']} entries, {stats['routes']} remembered routes")
+    print(f"{failures} failed checks")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,50 @@
+"""
+CSV parsing vs columnar snapshot loading at several dataset scales.
+
+Usage:
+    python -m benchmarks.snapshot_load [--scales 1 100 1000] [--workdir /tmp/titanic-bench]
+"""
+import argparse
+import os
+import shutil
+import time
+
+import pandas as pd
+
+from benchmarks.synthetic import write_scaled_csv
+from snapshot import load_snapshot
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 100, 1000])
+    parser.add_argument("--workdir", default="/tmp/titanic-bench")
+    args = parser.parse_args()
+
+    print(f"{'scale':>6}{'rows':>12}{'read_csv':>12}{'build':>12}{'load':>12}{'csv MB':>10}{'heap MB':>10}")
+    for scale in args.scales:
+        csv_path = write_scaled_csv(scale, os.path.join(args.workdir, f"titanic_x{scale}.csv"))
+        snapshot_dir = os.path.join(args.workdir, f".snapshot_x{scale}")
+        shutil.rmtree(snapshot_dir, ignore_errors=True)
+
+        parsed, parse_time = timed(lambda: pd.read_csv(csv_path))
+        _, build_time = timed(lambda: load_snapshot(csv_path, snapshot_dir))
+        loaded, load_time = timed(lambda: load_snapshot(csv_path, snapshot_dir))
+        assert len(loaded) == len(parsed)
+
+        # Memory-mapped numeric columns live in the page cache, not the heap
+        heap = loaded.memory_usage(deep=True).sum()
+        mapped = sum(loaded[c].nbytes for c in loaded.columns if loaded[c].dtype.kind in "if")
+        print(f"{scale:>6}{len(parsed):>12,}{parse_time * 1000:>10.1f}ms{build_time * 1000:>10.1f}ms"
+              f"{load_time * 1000:>10.1f}ms{os.path.getsize(csv_path) / 1e6:>10.1f}"
+              f"{(heap - mapped) / 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Cold-start report for the API process.
+
+Runs fresh interpreters to measure `import main` wall time, the slowest
+imports (from `python -X importtime`), and time to the first text and first
+chart answers.
+
+Usage:
+    python -m benchmarks.startup_time [--top 15] [--runs 3]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TIMING_SCRIPT = """
+import time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+main.agent.process_query("What percentage were male?")
+text = time.perf_counter()
+main.agent.process_query("Show me a histogram of passenger ages")
+chart = time.perf_counter()
+import sys
+print(imported - start, text - start, chart - start,
+      int("matplotlib" in sys.modules), int("seaborn" in sys.modules))
+"""
+
+
+def run_python(args, env=None):
+    env = dict(os.environ, TITANIC_WARMUP="0", TITANIC_RENDER_CACHE_BYTES="0", **(env or {}))
+    env.pop("TITANIC_RENDER_CACHE_DIR", None)
+    return subprocess.run([sys.executable, *args], cwd=ROOT, env=env,
+                          capture_output=True, text=True, check=True)
+
+
+def importtime_report(top: int):
+    """Parse `-X importtime` output into (cumulative_us, self_us, module) rows"""
+    stderr = run_python(["-X", "importtime", "-c", "import main"]).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us), int(self_us), module.rstrip()))
+    print(f"Slowest imports (cumulative, top {top}):")
+    for cumulative_us, self_us, module in sorted(rows, reverse=True)[:top]:
+        print(f"  {cumulative_us / 1000:9.1f} ms  (self {self_us / 1000:7.1f} ms)  {module}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    importtime_report(args.top)
+
+    samples = []
+    for _ in range(args.runs):
+        samples.append([float(v) for v in run_python(["-c", TIMING_SCRIPT]).stdout.split()])
+    imported, text, chart = (statistics.median(s[i] for s in samples) for i in range(3))
+    print(f"\nMedian of {args.runs} fresh processes:")
+    print(f"  import main (agent + dataset):   {imported * 1000:8.1f} ms")
+    print(f"  first text answer:               {text * 1000:8.1f} ms")
+    print(f"  first chart answer:              {chart * 1000:8.1f} ms")
+    print(f"  matplotlib loaded after charts:  {bool(samples[-1][3])}")
+    print(f"  seaborn loaded:                  {bool(samples[-1][4])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Time to first byte: /chat (answer and base64 chart in one body) vs /chat/stream.
+
+Starts the API on a local port with the render cache disabled, so every
+chart query really renders, and reports for each chart query:
+  /chat:        TTFB and total time (the body is sent only after rendering)
+  /chat/stream: TTFB (answer event), time to the visualization event, total
+
+Usage:
+    python -m benchmarks.stream_ttfb [--repeat 10]
+"""
+import argparse
+import json
+import statistics
+import time
+
+import requests
+
+import main
+from benchmarks.quick_stats_rerun import start_server
+from render_cache import default_cache
+
+QUERIES = [
+    "What percentage were male?",
+    "Show me a histogram of passenger ages",
+    "Show me a gender pie chart",
+    "Show me survival rates by class",
+]
+
+
+def time_chat(session, api_url, query):
+    start = time.perf_counter()
+    with session.post(f"{api_url}/chat", json={"query": query, "include_base64": True},
+                      stream=True, timeout=60) as response:
+        chunks = response.iter_content(chunk_size=None)
+        next(chunks)
+        first = time.perf_counter()
+        for _ in chunks:
+            pass
+    return first - start, None, time.perf_counter() - start
+
+
+def time_stream(session, api_url, query):
+    start = time.perf_counter()
+    first = chart = None
+    with session.post(f"{api_url}/chat/stream", json={"query": query}, stream=True, timeout=60) as response:
+        for line in response.iter_lines():
+            if not line:
+                continue
+            event = json.loads(line)["event"]
+            if first is None:
+                first = time.perf_counter()
+            if event == "visualization":
+                chart = time.perf_counter()
+    end = time.perf_counter()
+    return first - start, (chart - start) if chart else None, end - start
+
+
+def ms(samples):
+    values = [s for s in samples if s is not None]
+    return f"{statistics.median(values) * 1000:8.2f}" if values else f"{'-':>8}"
+
+
+def run():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    default_cache.max_bytes = 0
+    main.agent.analyzer.render_cache.max_bytes = 0
+    api_url = start_server()
+    session = requests.Session()
+    for query in QUERIES:  # load the plotting stack and open the connection
+        time_stream(session, api_url, query)
+
+    print(f"{'query':<40}{'endpoint':<14}{'ttfb ms':>9}{'chart ms':>9}{'total ms':>9}")
+    for query in QUERIES:
+        for name, fn in (("/chat", time_chat), ("/chat/stream", time_stream)):
+            samples = [fn(session, api_url, query) for _ in range(args.repeat)]
+            ttfb, chart, total = zip(*samples)
+            print(f"{query[:38]:<40}{name:<14}{ms(ttfb)} {ms(chart)} {ms(total)}")
+
+
+if __name__ == "__main__":
+    run()
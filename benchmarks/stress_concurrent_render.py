@@ -0,0 +1,72 @@
+"""
+Stress test: render every chart kind from many threads at once and check
+each image against a serial reference render.
+
+Exits non-zero if any render fails or differs from the reference.
+
+Usage:
+    python -m benchmarks.stress_concurrent_render [--threads 16] [--rounds 10]
+"""
+import argparse
+import io
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+from agent import CHART_KINDS, TitanicAgent
+from render_cache import RenderCache
+
+CHART_QUERIES = {
+    "age_histogram": "Show me a histogram of passenger ages",
+    "gender_pie": "Show me a gender pie chart",
+    "embarkation_bar": "Show me a bar chart of embarkation ports",
+    "fare_histogram": "Show me a histogram of fares",
+    "survival_by_class": "Show me survival rates by class",
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--rounds", type=int, default=10)
+    args = parser.parse_args()
+
+    agent = TitanicAgent()
+    analyzer = agent.analyzer
+    # A zero-byte cache stores nothing, so every call really renders
+    analyzer.render_cache = RenderCache(max_bytes=0, cache_dir=None)
+
+    reference = {kind: analyzer.render_chart(kind) for kind in CHART_KINDS}
+    sizes = {kind: Image.open(io.BytesIO(png)).size for kind, png in reference.items()}
+
+    def render_via_query(kind):
+        result = agent.process_query(CHART_QUERIES[kind])
+        assert result["visualization_id"].endswith(kind), result["visualization_id"]
+        return kind, analyzer.render_chart(kind)
+
+    jobs = [kind for _ in range(args.rounds) for kind in CHART_KINDS]
+    failures = 0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        futures = [pool.submit(render_via_query, kind) for kind in jobs]
+        for future in futures:
+            try:
+                kind, png = future.result()
+                image = Image.open(io.BytesIO(png))
+                image.verify()
+                if image.size != sizes[kind] or png != reference[kind]:
+                    failures += 1
+                    print(f"MISMATCH {kind}: size {image.size}, expected {sizes[kind]}")
+            except Exception as e:
+                failures += 1
+                print(f"ERROR {type(e).__name__}: {e}")
+    elapsed = time.perf_counter() - start
+
+    print(f"{len(jobs)} renders on {args.threads} threads in {elapsed:.2f}s, {failures} failures")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
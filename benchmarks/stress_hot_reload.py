@@ -0,0 +1,184 @@
+"""
+Stress test: hammer /chat and /chat/batch while the dataset file is swapped
+back and forth between two versions, and check that every response is
+complete and answered from a single dataset version.
+
+Runs the API in-process on a copy of the dataset with the file watcher
+polling quickly. Exits non-zero on any error or mixed-version response.
+
+Usage:
+    python -m benchmarks.stress_hot_reload [--flips 10] [--concurrency 16]
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+import pandas as pd
+
+WORKDIR = tempfile.mkdtemp(prefix="titanic-reload-")
+DATA_PATH = os.path.join(WORKDIR, "titanic.csv")
+os.environ["TITANIC_DATA_PATH"] = DATA_PATH
+os.environ["TITANIC_SNAPSHOT_DIR"] = os.path.join(WORKDIR, ".snapshot")
+os.environ.pop("TITANIC_RENDER_CACHE_DIR", None)
+# Room for every concurrent request, so backpressure (503) is not counted as a failure
+os.environ.setdefault("TITANIC_RENDER_QUEUE_DEPTH", "1024")
+
+import httpx  # noqa: E402
+
+from data_loader import _resolve_data_path  # noqa: E402
+
+QUERIES = [
+    "What percentage were male?",
+    "Show me a gender pie chart",
+    "What was the average ticket fare?",
+    "Show me a histogram of passenger ages",
+    "How many passengers embarked from each port?",
+    "Show me survival rates by class",
+    "survival rate of women in class 3 by port",
+    "Give me a summary",
+]
+
+
+def write_variants(source: str):
+    """Two CSVs that differ in size, survival and ages"""
+    original = pd.read_csv(source)
+    changed = original.iloc[:-60].copy()
+    changed.loc[changed.index[::7], "Survived"] = 1 - changed.loc[changed.index[::7], "Survived"]
+    changed["Age"] = changed["Age"] + 1
+    paths = []
+    for name, frame in (("a", original), ("b", changed)):
+        path = os.path.join(WORKDIR, f"variant-{name}.csv")
+        frame.to_csv(path, index=False)
+        paths.append(path)
+    return paths
+
+
+def install(variant: str):
+    """Replace the live dataset file atomically"""
+    tmp_path = f"{DATA_PATH}.tmp"
+    shutil.copyfile(variant, tmp_path)
+    os.replace(tmp_path, DATA_PATH)
+
+
+def wait_for_reload(manager, reloads: int, timeout: float = 30.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while manager.reloads <= reloads:
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def versions_of(expected, query, payload):
+    """Dataset versions whose answer to `query` is exactly `payload`"""
+    return {version for version, answers in expected.items()
+            if answers[query] == (payload["answer"], payload["data"], _viz_kind(payload))
+            and (payload["visualization_id"] is None or payload["visualization_id"].startswith(version))}
+
+
+def _viz_kind(payload):
+    viz_id = payload.get("visualization_id")
+    return viz_id.split("-", 1)[1] if viz_id else None
+
+
+async def hammer(client, expected, stop, counters, worker):
+    i = worker
+    while not stop.is_set():
+        i += 1
+        if i % 5 == 0:
+            response = await client.post("/chat/batch", json={"queries": QUERIES})
+            if response.status_code != 200:
+                counters["errors"] += 1
+                print(f"ERROR /chat/batch {response.status_code}: {response.text[:200]}")
+                continue
+            common = set(expected)
+            for query, item in zip(QUERIES, response.json()["results"]):
+                if item["error"]:
+                    counters["errors"] += 1
+                    print(f"ERROR batch item {query!r}: {item['error']}")
+                common &= versions_of(expected, query, item)
+            counters["batches"] += 1
+            if not common:
+                counters["mixed"] += 1
+                print("MIXED batch: items answered from different dataset versions")
+            continue
+
+        query = QUERIES[i % len(QUERIES)]
+        response = await client.post("/chat", json={"query": query})
+        if response.status_code != 200:
+            counters["errors"] += 1
+            print(f"ERROR /chat {response.status_code}: {response.text[:200]}")
+            continue
+        payload = response.json()
+        counters["requests"] += 1
+        if not versions_of(expected, query, payload):
+            counters["mixed"] += 1
+            print(f"MIXED {query!r}: visualization {payload['visualization_id']} with another version's answer")
+
+
+async def run(flips: int, concurrency: int):
+    variant_a, variant_b = write_variants(_resolve_data_path())
+    install(variant_a)
+
+    import main
+    manager = main.dataset_manager
+    manager.interval = 0.05
+
+    # Reference answers per version, computed serially
+    expected = {}
+    for variant in (variant_b, variant_a):
+        install(variant)
+        manager.reload()
+        analyzer = main.agent.analyzer
+        expected[analyzer.data_version] = {}
+        for query in QUERIES:
+            result = main.agent.process_query(query, inline_images=False)
+            data = json.loads(json.dumps(result["data"]))  # as the client sees it
+            expected[analyzer.data_version][query] = (result["answer"], data, _viz_kind(result))
+    print(f"versions: {', '.join(expected)}")
+
+    manager.start()
+    stop = threading.Event()
+    counters = {"requests": 0, "batches": 0, "errors": 0, "mixed": 0}
+
+    def flip():
+        for n in range(flips):
+            reloads = manager.reloads
+            install(variant_b if n % 2 == 0 else variant_a)
+            if not wait_for_reload(manager, reloads):
+                counters["errors"] += 1
+                print(f"ERROR reload {n} did not happen: {manager.status()}")
+            time.sleep(0.2)
+        stop.set()
+
+    transport = httpx.ASGITransport(app=main.app)
+    start = time.perf_counter()
+    async with httpx.AsyncClient(transport=transport, base_url="http://stress", timeout=60) as client:
+        flipper = threading.Thread(target=flip)
+        flipper.start()
+        await asyncio.gather(*(hammer(client, expected, stop, counters, w) for w in range(concurrency)))
+        flipper.join()
+    manager.stop()
+    elapsed = time.perf_counter() - start
+
+    print(f"{counters['requests']} /chat + {counters['batches']} /chat/batch in {elapsed:.1f}s "
+          f"across {manager.reloads} reloads: {counters['errors']} errors, {counters['mixed']} mixed-version")
+    return 1 if counters["errors"] or counters["mixed"] else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--flips", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+    try:
+        code = asyncio.run(run(args.flips, args.concurrency))
+    finally:
+        shutil.rmtree(WORKDIR, ignore_errors=True)
+    sys.exit(code)
@@ -0,0 +1,310 @@
+"""
+Benchmark suite with JSON results and a regression check.
+
+For each dataset scale (synthetic copies of data/titanic.csv, see
+synthetic.py) a fresh process measures:
+
+- micro: every analyze_* method (memo cleared, so the answer is really
+  computed) and every plot_* method (render cache disabled)
+- routing: process_query over the labelled intent corpus, text only, with
+  the response cache off (process_query_cached: the same with it on, so
+  nearly every call is a hit)
+- load: /health, /info and /chat through the in-process ASGI app at
+  several concurrency levels, response cache off
+
+Each result has p50/p95/mean latency in milliseconds and operations per
+second. With --baseline, every result present in both runs is compared and
+the suite exits 1 if any latency regressed by more than --threshold.
+
+Usage:
+    python -m benchmarks.suite [--scales 1,10,100,1000] [--concurrency 1,8,32] [--quick]
+                               [--out results.json] [--baseline old.json] [--threshold 0.25]
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List
+
+from benchmarks.intent_accuracy import LABELLED_QUERIES
+from benchmarks.synthetic import write_scaled_csv
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ANALYZE_METHODS = ("analyze_gender", "analyze_age", "analyze_fare", "analyze_embarkation", "analyze_survival")
+PLOT_METHODS = ("plot_age_histogram", "plot_gender_pie", "plot_embarkation_bar",
+                "plot_fare_histogram", "plot_survival_by_class")
+
+# Mix of text, chart and filtered questions sent to /chat (charts by URL, not inlined)
+CHAT_QUERIES = [
+    "What percentage were male?",
+    "What was the average ticket fare?",
+    "Show me a histogram of passenger ages",
+    "How many passengers embarked from each port?",
+    "Show me survival rates by class",
+    "survival rate of women in class 3 by port",
+    "Give me a summary",
+]
+
+
+def summarize(samples: List[float], elapsed: float = None) -> Dict[str, float]:
+    """Latency percentiles (ms) of per-operation samples in seconds"""
+    ordered = sorted(samples)
+    n = len(ordered)
+
+    def pct(p):
+        return ordered[min(n - 1, max(0, int(round(p / 100 * n)) - 1))] * 1000
+
+    total = elapsed if elapsed is not None else sum(ordered)
+    return {
+        "n": n,
+        "p50_ms": pct(50),
+        "p95_ms": pct(95),
+        "mean_ms": sum(ordered) / n * 1000,
+        "ops_per_s": n / total if total > 0 else 0.0,
+    }
+
+
+def time_calls(fn: Callable[[], Any], repeat: int, warmup: int = 3,
+               setup: Callable[[], Any] = None) -> Dict[str, float]:
+    """Time `repeat` calls of `fn` individually; `setup` runs untimed before each"""
+    for _ in range(warmup):
+        if setup:
+            setup()
+        fn()
+    samples = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+def bench_micro(analyzer, repeat: int, render_repeat: int) -> Dict[str, Dict[str, float]]:
+    import render_cache
+
+    results = {}
+    for name in ANALYZE_METHODS:
+        results[f"micro/{name}"] = time_calls(getattr(analyzer, name), repeat, setup=analyzer._results.clear)
+    # Every plot_* call renders: nothing is kept in the cache
+    analyzer.render_cache = render_cache.RenderCache(max_bytes=0, cache_dir=None)
+    for name in PLOT_METHODS:
+        results[f"micro/{name}"] = time_calls(getattr(analyzer, name), render_repeat, warmup=1)
+    return results
+
+
+def bench_routing(agent, cached_agent, repeat: int) -> Dict[str, Dict[str, float]]:
+    queries = [query for query, _ in LABELLED_QUERIES]
+    results = {}
+    for name, fn in (("route", agent.route),
+                     ("process_query", lambda q: agent.process_query(q, inline_images=False)),
+                     ("process_query_cached", lambda q: cached_agent.process_query(q, inline_images=False))):
+        for query in queries:
+            fn(query)
+        samples = []
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for query in queries:
+                t0 = time.perf_counter()
+                fn(query)
+                samples.append(time.perf_counter() - t0)
+        results[f"routing/{name}"] = summarize(samples, time.perf_counter() - start)
+    return results
+
+
+async def _load(client, method: str, path: str, bodies, concurrency: int, requests: int):
+    latencies, errors = [], 0
+    per_worker = max(1, requests // concurrency)
+
+    async def worker(offset):
+        nonlocal errors
+        for i in range(per_worker):
+            kwargs = {"json": bodies[(offset + i) % len(bodies)]} if bodies else {}
+            t0 = time.perf_counter()
+            response = await client.request(method, path, **kwargs)
+            latencies.append(time.perf_counter() - t0)
+            if response.status_code != 200:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(w) for w in range(concurrency)))
+    result = summarize(latencies, time.perf_counter() - start)
+    result["errors"] = errors
+    return result
+
+
+async def bench_load(levels: List[int], requests: int) -> Dict[str, Dict[str, float]]:
+    import httpx
+    import main
+
+    targets = [
+        ("health", "GET", "/health", None),
+        ("info", "GET", "/info", None),
+        ("chat", "POST", "/chat", [{"query": query} for query in CHAT_QUERIES]),
+    ]
+    results = {}
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        for name, method, path, bodies in targets:
+            await _load(client, method, path, bodies, 1, 10)  # warm up
+            for concurrency in levels:
+                result = await _load(client, method, path, bodies, concurrency, requests)
+                results[f"load/{name}/c{concurrency}"] = result
+    main.render_executor.shutdown()
+    return results
+
+
+def run_child(args) -> Dict[str, Dict[str, float]]:
+    """All measurements for one dataset scale, in this process"""
+    from agent import TitanicAgent
+    from response_cache import ResponseCache
+
+    # Repeated queries would otherwise time cache hits, not process_query
+    agent = TitanicAgent(response_cache=ResponseCache(max_entries=0))
+    cached_agent = TitanicAgent(response_cache=ResponseCache(max_entries=1024))
+    results = {}
+    results.update(bench_routing(agent, cached_agent, args.routing_repeat))
+    results.update(asyncio.run(bench_load(args.levels, args.requests)))
+    results.update(bench_micro(agent.analyzer, args.repeat, args.render_repeat))
+    results["dataset"] = {"rows": agent.analyzer.stats.total}
+    return results
+
+
+def run_scale(scale: int, args, workdir: str) -> Dict[str, Dict[str, float]]:
+    """Run the child measurements against a dataset `scale` times the original"""
+    from data_loader import _resolve_data_path
+
+    path = _resolve_data_path() if scale == 1 else \
+        write_scaled_csv(scale, os.path.join(tempfile.gettempdir(), f"titanic_x{scale}.csv"))
+    env = dict(os.environ)
+    env.pop("TITANIC_RENDER_CACHE_DIR", None)
+    env.update({
+        "TITANIC_DATA_PATH": path,
+        "TITANIC_SNAPSHOT_DIR": os.path.join(workdir, f"snapshot-x{scale}"),
+        "TITANIC_OUT_OF_CORE": "0",
+        "TITANIC_WARMUP": "0",
+        "TITANIC_RELOAD_INTERVAL": "0",
+        "TITANIC_SERVER_TIMING": "0",
+        # /chat load measures answering, not the response cache
+        "TITANIC_RESPONSE_CACHE_SIZE": "0",
+        # Room for the highest concurrency level, so load tests measure latency, not 503s
+        "TITANIC_RENDER_QUEUE_DEPTH": str(max(1024, max(args.levels) * 2)),
+    })
+    command = [sys.executable, "-m", "benchmarks.suite", "--child",
+               "--concurrency", ",".join(map(str, args.levels)),
+               "--repeat", str(args.repeat), "--render-repeat", str(args.render_repeat),
+               "--routing-repeat", str(args.routing_repeat), "--requests", str(args.requests)]
+    output = subprocess.run(command, cwd=ROOT, env=env, capture_output=True, text=True)
+    if output.returncode != 0:
+        raise SystemExit(f"scale x{scale} failed:\n{output.stderr}")
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], metric: str,
+            threshold: float, min_delta_ms: float) -> List[str]:
+    """
+    Results whose `metric` got worse than the baseline by more than
+    `threshold` (a fraction) and by more than `min_delta_ms`.
+    """
+    regressions = []
+    for key, result in current["results"].items():
+        before = baseline.get("results", {}).get(key)
+        if not before or metric not in result or metric not in before:
+            continue
+        old, new = before[metric], result[metric]
+        if new > old * (1 + threshold) and new - old > min_delta_ms:
+            regressions.append(f"{key}: {metric} {old:.3f} -> {new:.3f} ms ({(new / old - 1) * 100:+.0f}%)")
+    return regressions
+
+
+def metadata(args) -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "scales": args.scales,
+        "concurrency": args.levels,
+    }
+
+
+def print_table(results: Dict[str, Any]):
+    print(f"{'benchmark':<44}{'p50 ms':>10}{'p95 ms':>10}{'ops/s':>12}")
+    for key, result in results.items():
+        if "p50_ms" in result:
+            print(f"{key:<44}{result['p50_ms']:>10.3f}{result['p95_ms']:>10.3f}{result['ops_per_s']:>12.0f}")
+
+
+def parse_ints(text: str) -> List[int]:
+    return [int(part) for part in text.split(",") if part.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scales", type=parse_ints, default=[1, 10, 100, 1000])
+    parser.add_argument("--concurrency", dest="levels", type=parse_ints, default=[1, 8, 32])
+    parser.add_argument("--repeat", type=int, default=200, help="Calls per analyze_* method")
+    parser.add_argument("--render-repeat", type=int, default=10, help="Calls per plot_* method")
+    parser.add_argument("--routing-repeat", type=int, default=20, help="Passes over the query corpus")
+    parser.add_argument("--requests", type=int, default=400, help="Requests per endpoint and concurrency level")
+    parser.add_argument("--quick", action="store_true", help="Scales 1 and 10 with few iterations")
+    parser.add_argument("--out", help="Write the results JSON here (default: stdout)")
+    parser.add_argument("--baseline", help="Results JSON of an earlier run to compare with")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed slowdown, 0.25 = 25%%")
+    parser.add_argument("--metric", default="p50_ms", choices=["p50_ms", "p95_ms", "mean_ms"])
+    parser.add_argument("--min-delta-ms", type=float, default=0.05,
+                        help="Ignore slowdowns smaller than this, however large relatively")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_child(args)))
+        return 0
+    if args.quick:
+        args.scales = [s for s in args.scales if s <= 10]
+        args.repeat, args.render_repeat, args.routing_repeat, args.requests = 50, 3, 5, 100
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="titanic-suite-") as workdir:
+        for scale in args.scales:
+            print(f"scale x{scale} ...", file=sys.stderr)
+            for key, result in run_scale(scale, args, workdir).items():
+                results[f"x{scale}/{key}"] = result
+    report = {"meta": metadata(args), "results": results}
+
+    print_table(results)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nwrote {args.out}")
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.metric, args.threshold, args.min_delta_ms)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"\nno regressions beyond {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,46 @@
+"""
+Synthetic Titanic-shaped datasets scaled up from data/titanic.csv.
+
+Usage:
+    python -m benchmarks.synthetic --scale 1000 --out /tmp/titanic_x1000.csv
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from data_loader import DATA_PATH
+
+
+def make_scaled_frame(scale: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Replicate the sample `scale` times with jittered Age and Fare.
+
+    PassengerId stays unique and the categorical columns keep their
+    distributions, so every analysis still has realistic answers.
+    """
+    base = pd.read_csv(DATA_PATH)
+    df = pd.concat([base] * scale, ignore_index=True)
+    rng = np.random.default_rng(seed)
+    df["PassengerId"] = np.arange(1, len(df) + 1)
+    age_jitter = rng.normal(0, 1.0, len(df))
+    df["Age"] = (df["Age"] + age_jitter).clip(lower=0.1).round(1)
+    df["Fare"] = (df["Fare"] * rng.uniform(0.95, 1.05, len(df))).round(4)
+    return df
+
+
+def write_scaled_csv(scale: int, path: str, seed: int = 0) -> str:
+    """Write a scaled dataset to `path` (skipped if it already exists)"""
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        make_scaled_frame(scale, seed).to_csv(path, index=False)
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scale", type=int, default=10)
+    parser.add_argument("--out", required=True)
+    args = parser.parse_args()
+    print(write_scaled_csv(args.scale, args.out))
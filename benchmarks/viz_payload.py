@@ -0,0 +1,73 @@
+"""
+Payload size and latency: base64 chart inside /chat JSON vs /chat + GET /viz/{id}.
+
+Charts are pre-rendered first, so the numbers compare transport and
+encoding costs rather than matplotlib.
+
+Usage:
+    python -m benchmarks.viz_payload [--repeat 50]
+"""
+import argparse
+import asyncio
+import base64
+import io
+import time
+
+import httpx
+from PIL import Image
+
+import main
+
+CHART_QUERIES = [
+    "Show me a histogram of passenger ages",
+    "Show me a gender pie chart",
+    "Show me a bar chart of embarkation ports",
+    "Show me a histogram of fares",
+    "Show me survival rates by class",
+]
+
+
+async def inline_base64(client, query):
+    """Old path: base64 in JSON, decoded and re-opened with PIL by the client"""
+    response = await client.post("/chat", json={"query": query, "include_base64": True})
+    payload = response.json()
+    Image.open(io.BytesIO(base64.b64decode(payload["visualization"]))).load()
+    return len(response.content)
+
+
+async def via_url(client, query, accept):
+    """New path: small JSON, then the raw image bytes"""
+    response = await client.post("/chat", json={"query": query})
+    image = await client.get(response.json()["visualization_url"], headers={"Accept": accept})
+    return len(response.content) + len(image.content)
+
+
+async def measure(repeat, fn, *args):
+    size = await fn(*args)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        await fn(*args)
+    return size, (time.perf_counter() - start) / repeat * 1000
+
+
+async def run(repeat: int):
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        print(f"{'query':<42}{'mode':<14}{'bytes':>10}{'ms':>8}")
+        for query in CHART_QUERIES:
+            modes = [
+                ("base64 json", inline_base64, ()),
+                ("url + png", via_url, ("image/png",)),
+                ("url + webp", via_url, ("image/webp",)),
+                ("url + svg", via_url, ("image/svg+xml",)),
+            ]
+            for name, fn, extra in modes:
+                size, ms = await measure(repeat, fn, client, query, *extra)
+                print(f"{query[:40]:<42}{name:<14}{size:>10,}{ms:>8.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(run(args.repeat))
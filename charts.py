@@ -0,0 +1,161 @@
+"""
+Thread-safe chart rendering for the Titanic analyzer.
+
+Every function builds its own matplotlib Figure on an Agg canvas and never
+touches pyplot's global figure state, so renders can run in parallel threads.
+"""
+import io
+from typing import Dict, Optional, Sequence
+
+import matplotlib
+import matplotlib.style
+from cycler import cycler
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure, SubplotParams
+
+from render_options import CHART_FIGSIZES, PROFILES, RenderOptions
+
+# seaborn's "husl" palette, inlined so seaborn (and pyplot) never get imported
+HUSL_PALETTE = ['#f77189', '#bb9832', '#50b131', '#36ada4', '#3ba3ec', '#e866f4']
+
+# Set visualization style once; figures read these defaults when created
+matplotlib.style.use('seaborn-v0_8-whitegrid')
+matplotlib.rcParams['axes.prop_cycle'] = cycler(color=HUSL_PALETTE)
+
+# Margins of the "fixed" layout, roomy enough for the axis labels and title
+FIXED_MARGINS = SubplotParams(left=0.1, right=0.96, bottom=0.11, top=0.91)
+
+
+def new_figure(figsize=(10, 6), options: Optional[RenderOptions] = None) -> Figure:
+    """
+    Create a standalone figure attached to its own Agg canvas.
+
+    `figsize` is the chart's default size; `options` may resize it.
+
+    Raises:
+        RenderTooLarge: If the options would exceed the canvas limits
+    """
+    options = options or PROFILES["default"]
+    options.check_raster(figsize)
+    subplotpars = FIXED_MARGINS if options.layout == "fixed" else None
+    fig = Figure(figsize=options.figsize(figsize), dpi=options.dpi, subplotpars=subplotpars)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def finish_layout(fig: Figure, options: Optional[RenderOptions] = None):
+    """Fit the axes to their labels, unless the layout is fixed"""
+    if options is None or options.layout == "tight":
+        fig.tight_layout()
+
+
+def figure_to_bytes(fig: Figure, format: str = "png", options: Optional[RenderOptions] = None) -> bytes:
+    """
+    Encode a figure as PNG, WebP or SVG.
+
+    The tight layout crops to the drawn content, which costs a second draw;
+    the fixed layout saves the canvas as is, at exactly the requested size.
+    """
+    options = options or PROFILES["default"]
+    kwargs = {"format": format, "dpi": options.dpi}
+    if options.layout == "tight":
+        kwargs["bbox_inches"] = "tight"
+    pil_kwargs = {}
+    if format == "png" and options.compression is not None:
+        pil_kwargs["compress_level"] = options.compression
+    elif format == "webp":
+        if options.compression is not None:
+            pil_kwargs["method"] = min(options.compression, 6)
+        if options.quality is not None:
+            pil_kwargs["quality"] = options.quality
+    if pil_kwargs:
+        kwargs["pil_kwargs"] = pil_kwargs
+    buffer = io.BytesIO()
+    fig.savefig(buffer, **kwargs)
+    return buffer.getvalue()
+
+
+def warm_up():
+    """Render a throwaway figure so fonts and the Agg backend are loaded"""
+    fig = new_figure(figsize=(2, 2))
+    ax = fig.add_subplot()
+    ax.bar(['a', 'b'], [1, 2])
+    ax.set_title('warm-up')
+    figure_to_bytes(fig, "png")
+
+
+def age_histogram(edges: Sequence[float], counts: Sequence[int], options: Optional[RenderOptions] = None) -> Figure:
+    """Histogram of passenger ages from precomputed bin edges and counts"""
+    fig = new_figure(CHART_FIGSIZES["age_histogram"], options)
+    ax = fig.add_subplot()
+    ax.hist(edges[:-1], bins=edges, weights=counts, edgecolor='black', alpha=0.7)
+    ax.set_xlabel('Age', fontsize=12)
+    ax.set_ylabel('Frequency', fontsize=12)
+    ax.set_title('Distribution of Passenger Ages', fontsize=14, fontweight='bold')
+    finish_layout(fig, options)
+    return fig
+
+
+def gender_pie(counts: Dict[str, int], options: Optional[RenderOptions] = None) -> Figure:
+    """Pie chart of passengers per sex"""
+    fig = new_figure(CHART_FIGSIZES["gender_pie"], options)
+    ax = fig.add_subplot()
+    colors = ['#FF6B6B', '#4ECDC4']
+    ax.pie(list(counts.values()), labels=list(counts.keys()), autopct='%1.1f%%',
+           colors=colors, explode=(0.05, 0), startangle=90)
+    ax.set_title('Gender Distribution', fontsize=14, fontweight='bold')
+    finish_layout(fig, options)
+    return fig
+
+
+def embarkation_bar(counts: Dict[str, int], options: Optional[RenderOptions] = None) -> Figure:
+    """Bar chart of passengers per embarkation port (keys are port names)"""
+    fig = new_figure(CHART_FIGSIZES["embarkation_bar"], options)
+    ax = fig.add_subplot()
+    colors = ['#3498db', '#e74c3c', '#2ecc71']
+    bars = ax.bar(list(counts.keys()), list(counts.values()), color=colors, edgecolor='black')
+    ax.set_xlabel('Port', fontsize=12)
+    ax.set_ylabel('Number of Passengers', fontsize=12)
+    ax.set_title('Passengers by Embarkation Port', fontsize=14, fontweight='bold')
+
+    # Add value labels on bars
+    for bar in bars:
+        height = bar.get_height()
+        ax.text(bar.get_x() + bar.get_width()/2., height,
+                f'{int(height)}', ha='center', va='bottom', fontsize=11)
+
+    finish_layout(fig, options)
+    return fig
+
+
+def fare_histogram(edges: Sequence[float], counts: Sequence[int], options: Optional[RenderOptions] = None) -> Figure:
+    """Histogram of ticket fares from precomputed bin edges and counts"""
+    fig = new_figure(CHART_FIGSIZES["fare_histogram"], options)
+    ax = fig.add_subplot()
+    ax.hist(edges[:-1], bins=edges, weights=counts, edgecolor='black', alpha=0.7, color='#9b59b6')
+    ax.set_xlabel('Fare ($)', fontsize=12)
+    ax.set_ylabel('Frequency', fontsize=12)
+    ax.set_title('Distribution of Ticket Fares', fontsize=14, fontweight='bold')
+    finish_layout(fig, options)
+    return fig
+
+
+def survival_by_class(rates: Dict[int, float], options: Optional[RenderOptions] = None) -> Figure:
+    """Bar chart of survival rate (percent) per passenger class"""
+    fig = new_figure(CHART_FIGSIZES["survival_by_class"], options)
+    ax = fig.add_subplot()
+    colors = ['#e74c3c', '#f39c12', '#27ae60']
+    bars = ax.bar([f'Class {c}' for c in rates], list(rates.values()),
+                  color=colors, edgecolor='black')
+    ax.set_xlabel('Passenger Class', fontsize=12)
+    ax.set_ylabel('Survival Rate (%)', fontsize=12)
+    ax.set_title('Survival Rate by Passenger Class', fontsize=14, fontweight='bold')
+
+    # Add value labels
+    for bar in bars:
+        height = bar.get_height()
+        ax.text(bar.get_x() + bar.get_width()/2., height,
+                f'{height:.1f}%', ha='center', va='bottom', fontsize=11)
+
+    finish_layout(fig, options)
+    return fig
@@ -2,43 +2,149 @@
 Data loader module for Titanic dataset
 """
 import pandas as pd
+import hashlib
 import os
+from typing import Optional
+
+from snapshot import load_snapshot
+from streaming_stats import StreamingStatsIndex
 
 # Get the path to the dataset
-DATA_PATH = os.path.join(os.path.dirname(__file__), "data", "titanic.csv")
+DATA_PATH = os.environ.get(
+    "TITANIC_DATA_PATH", os.path.join(os.path.dirname(__file__), "data", "titanic.csv")
+)
+
+# Read through a memory-mapped columnar snapshot instead of re-parsing the CSV
+USE_SNAPSHOT = os.environ.get("TITANIC_SNAPSHOT", "1") != "0"
+SNAPSHOT_DIR = os.environ.get("TITANIC_SNAPSHOT_DIR") or None
+
+# Never hold the dataset in memory; answer from aggregates streamed from the CSV
+OUT_OF_CORE = os.environ.get("TITANIC_OUT_OF_CORE", "0") == "1"
+# Keep only the analysed columns, as int8 codes, bits and float32 (see passenger_table.py)
+COMPACT = os.environ.get("TITANIC_COMPACT", "0") == "1"
+CHUNK_ROWS = int(os.environ.get("TITANIC_CHUNK_ROWS", "20000"))
+SKETCH_K = int(os.environ.get("TITANIC_SKETCH_K", "1000"))
+
+def _resolve_data_path() -> str:
+    """Path of the dataset CSV, falling back to ./data/titanic.csv"""
+    if os.path.exists(DATA_PATH):
+        return DATA_PATH
+    return os.path.join(os.getcwd(), "data", "titanic.csv")
 
 def load_titanic_data() -> pd.DataFrame:
     """
-    Load the Titanic dataset from CSV file.
+    Load the Titanic dataset.
+    
+    The CSV is parsed once into a columnar snapshot (see snapshot.py) which is
+    memory-mapped on every later load; the snapshot is rebuilt when the CSV
+    changes. Set TITANIC_SNAPSHOT=0 to read the CSV directly.
     
     Returns:
         pd.DataFrame: The Titanic dataset
     """
-    try:
-        df = pd.read_csv(DATA_PATH)
-        return df
-    except FileNotFoundError:
-        # Try alternative path
-        alt_path = os.path.join(os.getcwd(), "data", "titanic.csv")
-        df = pd.read_csv(alt_path)
-        return df
+    path = _resolve_data_path()
+    if USE_SNAPSHOT:
+        try:
+            return load_snapshot(path, SNAPSHOT_DIR)
+        except OSError:
+            # Snapshot directory not writable - parse the CSV instead
+            pass
+    return pd.read_csv(path)
+
+def load_titanic_aggregates() -> StreamingStatsIndex:
+    """
+    Stream the Titanic CSV in chunks into bounded-memory aggregates.
+    
+    Used instead of load_titanic_data when TITANIC_OUT_OF_CORE=1; memory is
+    bounded by TITANIC_CHUNK_ROWS and the sketch size TITANIC_SKETCH_K.
+    
+    Returns:
+        StreamingStatsIndex: Aggregates with the TitanicStatsIndex attributes
+    """
+    return StreamingStatsIndex.from_csv(_resolve_data_path(), CHUNK_ROWS, SKETCH_K)
+
+def get_dataset_version(df: pd.DataFrame) -> str:
+    """
+    Compute a content hash identifying a loaded dataset.
+    
+    Returns:
+        str: Short hex digest that changes whenever the data changes
+    """
+    digest = hashlib.sha256()
+    digest.update(",".join(map(str, df.columns)).encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+    return digest.hexdigest()[:16]
+
+def get_data_mtime() -> float:
+    """
+    Modification time of the dataset CSV.
+    
+    Returns:
+        float: Seconds since the epoch
+    """
+    return os.path.getmtime(_resolve_data_path())
 
-def get_dataset_info() -> dict:
+def _py(value):
+    """Convert numpy scalars to native Python values (NaN becomes None)"""
+    value = value.item() if hasattr(value, "item") else value
+    return None if isinstance(value, float) and value != value else value
+
+def get_column_stats(df: pd.DataFrame) -> dict:
+    """
+    Per-column statistics: null count, cardinality and, for numeric columns, min/max/mean.
+    
+    Returns:
+        dict: Column name -> statistics
+    """
+    stats = {}
+    for col in df.columns:
+        series = df[col]
+        col_stats = {
+            "dtype": str(series.dtype),
+            "null_count": int(series.isnull().sum()),
+            "cardinality": int(series.nunique()),
+        }
+        values = series.dropna()
+        if isinstance(series.dtype, pd.CategoricalDtype) and pd.api.types.is_numeric_dtype(series.cat.categories):
+            values = values.astype(series.cat.categories.dtype)
+        if pd.api.types.is_numeric_dtype(values) and len(values):
+            col_stats.update(min=_py(values.min()), max=_py(values.max()), mean=_py(values.mean()))
+        elif len(values):
+            top = values.value_counts()
+            col_stats.update(top=_py(top.index[0]), top_count=int(top.iloc[0]))
+        stats[col] = col_stats
+    return stats
+
+# Info computed for the most recent dataset version
+_info_cache = {"version": None, "info": None}
+
+def get_dataset_info(df: Optional[pd.DataFrame] = None, version: Optional[str] = None) -> dict:
     """
     Get basic information about the Titanic dataset.
     
+    Args:
+        df: Already loaded dataset (loaded from disk if omitted)
+        version: Dataset version of `df`; the result is cached per version
+    
     Returns:
-        dict: Dataset info including columns, shape, etc.
+        dict: Dataset info including columns, shape, missing values and column stats
     """
-    df = load_titanic_data()
+    if version is not None and _info_cache["version"] == version:
+        return _info_cache["info"]
+    if df is None:
+        df = load_titanic_data()
     
     # Convert numpy types to native Python types for JSON serialization
-    return {
+    info = {
         "shape": list(df.shape),
         "columns": list(df.columns),
         "dtypes": {k: str(v) for k, v in df.dtypes.to_dict().items()},
-        "missing_values": {k: int(v) for k, v in df.isnull().sum().to_dict().items()}
+        "missing_values": {k: int(v) for k, v in df.isnull().sum().to_dict().items()},
+        "column_stats": get_column_stats(df)
     }
+    if version is not None:
+        _info_cache.update(version=version, info=info)
+    return info
 
 # Test the data loader
 if __name__ == "__main__":
@@ -0,0 +1,136 @@
+"""
+Hot reload of the Titanic dataset
+"""
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from agent import TitanicAgent, TitanicAnalyzer
+from data_loader import _resolve_data_path
+from stats_index import TitanicStatsIndex
+
+# Seconds between checks of the dataset file (0 disables watching)
+RELOAD_INTERVAL = float(os.environ.get("TITANIC_RELOAD_INTERVAL", "2"))
+
+
+class DatasetManager:
+    """
+    Watches the dataset file and swaps a rebuilt analyzer into the agent.
+
+    The replacement (frame, stats index, /info and headline stats) is built
+    while the current analyzer keeps serving; the stats index is refreshed
+    from the current one, so only sections whose columns changed are
+    rebuilt. The swap is one attribute assignment: requests that already
+    read `agent.analyzer` finish on the old snapshot, later ones see only
+    the new one. After the swap the render
+    cache keeps only the new version and listeners are told, so they can
+    drop anything derived from the old one.
+    """
+
+    def __init__(self, agent: TitanicAgent, path: Optional[str] = None, interval: float = RELOAD_INTERVAL):
+        self.agent = agent
+        self.path = path or _resolve_data_path()
+        self.interval = interval
+        self.reloads = 0
+        self.last_error: Optional[str] = None
+        self._signature = self._stat()
+        self._pending: Optional[Tuple[int, int]] = None
+        self._listeners: List[Callable[[TitanicAnalyzer, TitanicAnalyzer], None]] = []
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def add_listener(self, listener: Callable[[TitanicAnalyzer, TitanicAnalyzer], None]):
+        """Call `listener(old, new)` after every swap"""
+        self._listeners.append(listener)
+
+    def start(self):
+        """Start watching the file on a background thread"""
+        if self._thread is None and self.interval > 0:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._watch, name="dataset-watch", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop watching"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+            self._thread = None
+
+    def check(self) -> bool:
+        """
+        Reload if the file changed and has not changed again since the last check.
+
+        Waiting one interval for the size and mtime to settle avoids loading
+        a file that is still being written.
+
+        Returns:
+            bool: True if a new dataset version was swapped in
+        """
+        signature = self._stat()
+        if signature == self._signature:
+            self._pending = None
+            return False
+        if signature != self._pending:
+            self._pending = signature
+            return False
+        return self.reload()
+
+    def reload(self) -> bool:
+        """
+        Rebuild from the file now and swap the result in.
+
+        A file that fails to load is recorded in `last_error` and the current
+        version keeps serving.
+
+        Returns:
+            bool: True if a new dataset version was swapped in (False if the
+            load failed or the content did not change)
+        """
+        with self._reload_lock:
+            signature = self._stat()
+            old = self.agent.analyzer
+            previous = old.stats if isinstance(old.stats, TitanicStatsIndex) else None
+            try:
+                new = TitanicAnalyzer(cache=old.render_cache, out_of_core=old.out_of_core, activate=False,
+                                       compact=old.compact, previous=previous)
+                # Derived results are ready before the first request sees them
+                new.dataset_info()
+                new.get_headline_stats()
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+                self._signature, self._pending = signature, None
+                return False
+            self._signature, self._pending = signature, None
+            self.last_error = None
+            if new.data_version == old.data_version:
+                return False
+
+            self.agent.analyzer = new
+            new.activate()
+            self.reloads += 1
+            for listener in self._listeners:
+                listener(old, new)
+            return True
+
+    def status(self) -> Dict[str, Any]:
+        """Current version and reload counters"""
+        return {
+            "data_version": self.agent.analyzer.data_version,
+            "reloads": self.reloads,
+            "last_error": self.last_error,
+            "watching": self._thread is not None,
+        }
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except OSError as e:
+                # File briefly missing while being replaced
+                self.last_error = f"{type(e).__name__}: {e}"
+
+    def _stat(self) -> Tuple[int, int]:
+        stat = os.stat(self.path)
+        return stat.st_size, stat.st_mtime_ns
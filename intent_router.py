@@ -0,0 +1,249 @@
+"""
+Keyword intent router for Titanic dataset queries
+"""
+import string
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+# Byte -> itself for [a-z0-9], space for anything else (UTF-8 bytes of
+# non-ASCII characters included), so tokens are the runs of [a-z0-9]
+_TOKEN_BYTES = bytes(b if chr(b) in string.ascii_lowercase + string.digits else 32 for b in range(256))
+
+# Slots that are not intents but parameters extracted from the query
+CHART_SLOT = "chart"
+STAT_SLOT = "stat"
+GROUP_SLOT = "group"
+
+# Keyword -> weight for each built-in intent, in priority order for ties
+DEFAULT_INTENTS: Dict[str, Dict[str, float]] = {
+    "gender": {
+        "male": 1, "males": 1, "female": 1, "females": 1, "men": 1, "women": 1,
+        "man": 1, "woman": 1, "gender": 1, "sex": 1,
+    },
+    "age": {
+        "age": 1, "ages": 1, "old": 0.5, "older": 0.5, "young": 0.5, "younger": 0.5,
+        "years": 0.5, "child": 0.5, "children": 0.5,
+    },
+    "fare": {
+        "fare": 1, "fares": 1, "ticket": 1, "tickets": 1, "price": 1, "prices": 1,
+        "cost": 1, "paid": 1, "pay": 0.5, "expensive": 0.5, "cheap": 0.5,
+    },
+    "embarkation": {
+        "embark": 1, "embarked": 1, "embarkation": 1, "port": 1, "ports": 1,
+        "board": 1, "boarded": 1, "boarding": 1,
+        "southampton": 1, "cherbourg": 1, "queenstown": 1,
+    },
+    "survival": {
+        "survive": 3, "survived": 3, "survival": 3, "survivors": 3, "surviving": 3,
+        "died": 3, "dead": 3, "death": 3, "deaths": 3, "perished": 3,
+    },
+    "summary": {
+        "summary": 1, "overview": 1, "info": 1, "information": 1, "describe": 1,
+    },
+}
+
+# Keyword -> weight that only counts when the intent matched one of its own
+# keywords ("from Cherbourg" is about a port, "Where are you from?" is not)
+SUPPORTING_KEYWORDS: Dict[str, Dict[str, float]] = {
+    "embarkation": {"from": 0.5},
+}
+
+# Keyword -> chart type ('any' when the query just asks to see something)
+CHART_KEYWORDS: Dict[str, str] = {
+    "pie": "pie", "bar": "bar", "bars": "bar", "histogram": "histogram", "hist": "histogram",
+    "chart": "any", "plot": "any", "graph": "any", "visual": "any", "visualize": "any",
+    "visualise": "any", "visualization": "any", "show": "any", "draw": "any",
+    "distribution": "any",
+}
+
+# Keywords asking for numbers rather than (or as well as) a picture
+STAT_KEYWORDS = (
+    "what", "percentage", "percent", "average", "mean", "median", "how many",
+    "count", "each", "rate", "rates", "statistics", "stats",
+)
+
+# Keyword -> column a breakdown is requested by
+GROUP_KEYWORDS: Dict[str, str] = {
+    "class": "Pclass", "classes": "Pclass", "pclass": "Pclass",
+    "sex": "Sex", "gender": "Sex",
+    "port": "Embarked", "ports": "Embarked",
+}
+
+# Column each intent is about
+INTENT_COLUMNS: Dict[str, str] = {
+    "gender": "Sex",
+    "age": "Age",
+    "fare": "Fare",
+    "embarkation": "Embarked",
+    "survival": "Survived",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercase runs of ASCII letters and digits in `text`.
+
+    Same tokens as re.findall(r"[a-z0-9]+", text.lower()), in a third of the
+    time: the router is called once per request and the regex was most of it.
+    """
+    return text.lower().encode("utf-8").translate(_TOKEN_BYTES).decode("ascii").split()
+
+
+@dataclass
+class RouteResult:
+    """Outcome of routing a query"""
+    intent: Optional[str]
+    score: float = 0.0
+    ranked: List[Tuple[str, float]] = field(default_factory=list)
+    chart: Optional[str] = None
+    wants_stats: bool = False
+    column: Optional[str] = None
+    group_by: Optional[str] = None
+    spec: Any = None  # Parsed ad-hoc query (query_engine.QuerySpec) for the "query" intent
+
+    def key(self) -> Tuple:
+        """Everything an intent handler depends on; equal keys give equal answers"""
+        return (self.intent, self.chart, self.wants_stats, self.group_by, self.spec)
+
+
+class IntentRouter:
+    """
+    Scores every registered intent in a single pass over the query tokens.
+
+    All keywords (unigrams and bigrams) live in one index mapping a keyword to
+    the intents and parameter slots it contributes to. Routing reads a table
+    compiled from that index, with one precomputed entry per keyword, and
+    only walks token pairs when the query holds the first word of a bigram.
+    """
+
+    def __init__(self):
+        self._priority: Dict[str, int] = {}
+        self._index: Dict[str, List[Tuple[str, object]]] = {}
+        self._supporting: Dict[str, List[Tuple[str, float]]] = {}
+        self._table: Optional[Dict[str, Tuple]] = None
+        self._bigram_heads: frozenset = frozenset()
+
+    def register_intent(self, name: str, keywords: Dict[str, float],
+                        supporting: Optional[Dict[str, float]] = None):
+        """
+        Add an intent (or extra keywords for an existing one).
+
+        Args:
+            name: Intent name
+            keywords: Keyword -> weight
+            supporting: Keyword -> weight counted only when one of the
+                intent's own keywords also matched
+        """
+        self._priority.setdefault(name, len(self._priority))
+        for keyword, weight in keywords.items():
+            self._add(keyword, name, weight)
+        for keyword, weight in (supporting or {}).items():
+            self._supporting.setdefault(self._normalize(keyword), []).append((name, weight))
+        self._table = None
+
+    def register_slot(self, slot: str, keywords: Dict[str, object]):
+        """Add keywords that fill a parameter slot"""
+        for keyword, value in keywords.items():
+            self._add(keyword, slot, value)
+        self._table = None
+
+    def route(self, query: str) -> RouteResult:
+        """
+        Route a query to its best matching intent.
+
+        Args:
+            query: User's natural language question
+
+        Returns:
+            RouteResult with the winning intent (None if nothing matched),
+            all matched intents ranked by score and the extracted parameters
+        """
+        table = self._table if self._table is not None else self._compile()
+        heads = self._bigram_heads
+        scores: Dict[str, float] = {}
+        support: Optional[Dict[str, float]] = None
+        chart = group_by = None
+        wants_stats = False
+        tokens = tokenize(query)
+        if heads.isdisjoint(tokens):
+            matched = [table[token] for token in tokens if token in table]
+        else:
+            matched = []
+            previous = None
+            for token in tokens:
+                if token in table:
+                    matched.append(table[token])
+                if previous in heads and f"{previous} {token}" in table:
+                    matched.append(table[f"{previous} {token}"])
+                previous = token
+
+        for weights, supporting, entry_chart, entry_stats, entry_group in matched:
+            for intent, weight in weights:
+                scores[intent] = scores.get(intent, 0.0) + weight
+            if supporting:
+                support = {} if support is None else support
+                for intent, weight in supporting:
+                    support[intent] = support.get(intent, 0.0) + weight
+            # A specific chart type beats a generic request to see something
+            if entry_chart is not None and chart in (None, "any"):
+                chart = entry_chart
+            wants_stats = wants_stats or entry_stats
+            group_by = group_by or entry_group
+
+        if support:
+            for intent, weight in support.items():
+                if intent in scores:
+                    scores[intent] += weight
+        result = RouteResult(intent=None, chart=chart, wants_stats=wants_stats, group_by=group_by)
+        if scores:
+            if len(scores) == 1:
+                result.ranked = list(scores.items())
+            else:
+                priority = self._priority
+                result.ranked = sorted(scores.items(), key=lambda item: (-item[1], priority[item[0]]))
+            result.intent, result.score = result.ranked[0]
+            result.column = INTENT_COLUMNS.get(result.intent)
+            if result.group_by == result.column:
+                result.group_by = None
+        return result
+
+    def _compile(self) -> Dict[str, Tuple]:
+        """
+        Fold the index into one (intent weights, supporting weights, chart,
+        stats, group) entry per keyword.
+        """
+        table = {}
+        for keyword in set(self._index) | set(self._supporting):
+            weights, chart, stats, group = [], None, False, None
+            for target, value in self._index.get(keyword, []):
+                if target == CHART_SLOT:
+                    if chart in (None, "any"):
+                        chart = value
+                elif target == STAT_SLOT:
+                    stats = True
+                elif target == GROUP_SLOT:
+                    group = group or value
+                else:
+                    weights.append((target, value))
+            table[keyword] = (tuple(weights), tuple(self._supporting.get(keyword, ())), chart, stats, group)
+        self._bigram_heads = frozenset(keyword.split(" ", 1)[0] for keyword in table if " " in keyword)
+        self._table = table
+        return table
+
+    @staticmethod
+    def _normalize(keyword: str) -> str:
+        return " ".join(tokenize(keyword))
+
+    def _add(self, keyword: str, target: str, value: object):
+        self._index.setdefault(self._normalize(keyword), []).append((target, value))
+
+
+def default_router() -> IntentRouter:
+    """Router with the built-in Titanic intents and parameter slots"""
+    router = IntentRouter()
+    for name, keywords in DEFAULT_INTENTS.items():
+        router.register_intent(name, keywords, SUPPORTING_KEYWORDS.get(name))
+    router.register_slot(CHART_SLOT, CHART_KEYWORDS)
+    router.register_slot(STAT_SLOT, {keyword: True for keyword in STAT_KEYWORDS})
+    router.register_slot(GROUP_SLOT, GROUP_KEYWORDS)
+    return router
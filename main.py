@@ -1,19 +1,65 @@
 """
 FastAPI Backend for Titanic Chatbot
 """
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from email.utils import formatdate, parsedate_to_datetime
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from pydantic import BaseModel, Field
+from typing import Optional, Dict, Any, List
+import asyncio
+import base64
+import json
+import os
+import threading
 import uvicorn
 
-from agent import TitanicAgent
+from agent import TitanicAgent, CHART_FORMATS, parse_visualization_id
+from render_options import CHART_FIGSIZES, PROFILES, RenderTooLarge, resolve_options
+from dataset_manager import DatasetManager
+from render_pool import RenderExecutor, RenderQueueFull, RenderTimeout, VersionUnavailable
+import metrics
+from metrics import MetricsMiddleware, timed
+from profiler import install_signal_handler, profiler
+
+
+# Load the plotting stack in the background once the server is up
+WARMUP = os.environ.get("TITANIC_WARMUP", "1") != "0"
+warmup_state = {"enabled": WARMUP, "done": False, "error": None}
+
+# Expose the /debug/profile endpoints
+DEBUG = os.environ.get("TITANIC_DEBUG", "0") == "1"
+
+
+def _warm_up():
+    """Background warm-up of the rendering executor"""
+    try:
+        render_executor.warm_up()
+    except Exception as e:
+        warmup_state["error"] = str(e)
+    finally:
+        warmup_state["done"] = True
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start the optional warm-up and the dataset watcher; stop both with the app"""
+    if WARMUP:
+        threading.Thread(target=_warm_up, name="warmup", daemon=True).start()
+    install_signal_handler()
+    dataset_manager.start()
+    yield
+    dataset_manager.stop()
+    render_executor.shutdown(wait=False)
+
 
 # Initialize FastAPI app
 app = FastAPI(
     title="Titanic Chatbot API",
     description="A friendly chatbot that analyzes the Titanic dataset",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -23,21 +69,85 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
 
+# Request latency, in-flight requests and the optional Server-Timing header
+app.add_middleware(MetricsMiddleware)
+
 # Initialize the Titanic agent
 agent = TitanicAgent()
+agent.analyzer.dataset_info()
+
+# Queries (and the charts they render) run here, not on the event loop
+render_executor = RenderExecutor(agent)
+
+# Rebuilds the dataset in the background when the CSV changes
+dataset_manager = DatasetManager(agent)
+# Cached answers from the previous dataset version are dropped on reload
+dataset_manager.add_listener(lambda old, new: agent.response_cache.retain_version(new.data_version))
+
+# Largest number of queries accepted by /chat/batch
+MAX_BATCH_SIZE = 100
+
+# Wire formats of /chat/stream
+STREAM_FORMATS = {"ndjson": "application/x-ndjson", "sse": "text/event-stream"}
+
+# State owned by other components, read when /metrics is scraped
+metrics.Gauge("titanic_render_jobs_pending", "Render executor jobs running or queued",
+              function=lambda: render_executor.pending())
+metrics.Gauge("titanic_render_cache", "Render cache counters", ("counter",),
+              function=lambda: {(k,): v for k, v in agent.analyzer.render_cache.stats().items()})
+metrics.Gauge("titanic_response_cache", "Response cache counters", ("counter",),
+              function=lambda: {(k,): v for k, v in agent.response_cache.stats().items()})
+metrics.Gauge("titanic_dataset_reloads", "Dataset versions swapped in since startup",
+              function=lambda: dataset_manager.reloads)
 
 
 class QueryRequest(BaseModel):
     """Request model for chat queries"""
     query: str
+    include_base64: bool = False  # Also embed the chart in the response
+
+
+class StreamQueryRequest(QueryRequest):
+    """Request model for streamed chat queries"""
+    image_format: str = "png"  # Chart format pre-rendered for the visualization event (png, webp, svg)
 
 
 class QueryResponse(BaseModel):
     """Response model for chat queries"""
     answer: str
-    visualization: Optional[str] = None  # Base64 encoded image
+    data: Optional[Dict[str, Any]] = None  # The numbers behind the answer
+    visualization_id: Optional[str] = None
+    visualization_url: Optional[str] = None  # Fetch the image from here
+    thumbnail_url: Optional[str] = None  # Small preview of the same chart
+    # Base64 encoded chart, only if requested: PNG from /chat; in /chat/stream
+    # visualization events, the request's image_format (png, webp or svg)
+    visualization: Optional[str] = None
+
+
+class BatchQueryRequest(BaseModel):
+    """Request model for batched chat queries"""
+    queries: List[str] = Field(..., max_length=MAX_BATCH_SIZE)
+    include_base64: bool = False
+
+
+class BatchItemResponse(BaseModel):
+    """Result for one query of a batch; `error` is set instead of `answer` on failure"""
+    query: str
+    answer: Optional[str] = None
+    data: Optional[Dict[str, Any]] = None
+    visualization_id: Optional[str] = None
+    visualization_url: Optional[str] = None
+    thumbnail_url: Optional[str] = None
+    visualization: Optional[str] = None  # Base64 encoded PNG, only if requested
+    error: Optional[str] = None
+
+
+class BatchQueryResponse(BaseModel):
+    """Response model for batched chat queries, in request order"""
+    results: List[BatchItemResponse]
 
 
 @app.get("/")
@@ -47,23 +157,137 @@ async def root():
         "message": "Welcome to Titanic Chatbot API",
         "endpoints": {
             "/chat": "POST - Send a query about the Titanic dataset",
+            "/chat/stream": "POST - Stream the answer, then the chart",
+            "/chat/batch": "POST - Send many queries at once",
+            "/viz/{id}": "GET - Rendered chart (PNG, WebP or SVG via Accept; ?profile=, ?width=, ?dpi=...)",
+            "/viz/profiles": "GET - Named chart rendering profiles",
             "/info": "GET - Get dataset information",
-            "/health": "GET - Health check"
+            "/stats": "GET - Headline metrics as JSON numbers",
+            "/cache/stats": "GET - Render and response cache counters",
+            "/metrics": "GET - Prometheus metrics",
+            "/health": "GET - Health check",
+            "/ready": "GET - Readiness (503 until warm-up finishes)"
         }
     }
 
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint"""
-    return {"status": "healthy"}
+    """Health check endpoint (liveness; does not wait for warm-up)"""
+    return {
+        "status": "healthy",
+        "warm": warmup_state["done"] or not WARMUP,
+        "data_version": agent.analyzer.data_version,
+    }
+
+
+@app.get("/ready")
+async def ready_check():
+    """Readiness endpoint: 503 while the plotting stack is still warming up"""
+    if WARMUP and not warmup_state["done"]:
+        return JSONResponse(status_code=503, content={"status": "warming_up"})
+    return {"status": "ready", "warmup": warmup_state}
 
 
 @app.get("/info")
-async def get_info():
-    """Get dataset information"""
-    from data_loader import get_dataset_info
-    return get_dataset_info()
+async def get_info(request: Request):
+    """
+    Get dataset information.
+    
+    Computed once per dataset version and served with ETag/Last-Modified,
+    so clients can revalidate and receive 304 Not Modified.
+    """
+    analyzer = agent.analyzer
+    headers = _dataset_cache_headers(analyzer, "info")
+    if _not_modified(request, headers["ETag"], analyzer.data_mtime):
+        return Response(status_code=304, headers=headers)
+    info = analyzer.dataset_info()
+    return JSONResponse(content=info, headers=headers)
+
+
+@app.get("/stats")
+async def get_stats(request: Request):
+    """
+    Headline metrics (total passengers, male percentage, survival rate, ...)
+    as numbers, with the same conditional GET support as /info.
+    """
+    analyzer = agent.analyzer
+    headers = _dataset_cache_headers(analyzer, "stats")
+    if _not_modified(request, headers["ETag"], analyzer.data_mtime):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content=analyzer.get_headline_stats(), headers=headers)
+
+
+def _dataset_cache_headers(analyzer, resource: str) -> Dict[str, str]:
+    """Validators for responses derived only from the current dataset"""
+    return {
+        "ETag": f'"{analyzer.data_version}-{resource}"',
+        "Last-Modified": formatdate(analyzer.data_mtime, usegmt=True),
+        "Cache-Control": "no-cache",
+    }
+
+
+def _not_modified(request: Request, etag: str, mtime: float) -> bool:
+    """Evaluate If-None-Match / If-Modified-Since against the current dataset"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags or f"W/{etag}" in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Render cache counters, with the response cache's (including its hit rate) under `responses`"""
+    return {**agent.analyzer.render_cache.stats(), "responses": agent.response_cache.stats()}
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """Request, stage, query and chart metrics in the Prometheus text format"""
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
+@app.get("/debug/profile")
+async def profile_status():
+    """Sampling profiler state (TITANIC_DEBUG=1 only)"""
+    _require_debug()
+    return profiler.status()
+
+
+@app.post("/debug/profile/start")
+async def profile_start(interval: Optional[float] = None):
+    """Start the sampling profiler, discarding the previous profile (TITANIC_DEBUG=1 only)"""
+    _require_debug()
+    if interval is not None and interval <= 0:
+        raise HTTPException(status_code=400, detail="interval must be positive")
+    if not profiler.start(interval):
+        raise HTTPException(status_code=409, detail="Profiler is already running")
+    return profiler.status()
+
+
+@app.post("/debug/profile/stop")
+async def profile_stop():
+    """
+    Stop the sampling profiler and download the profile in the folded
+    format (`stack count` per line), ready for flamegraph.pl or speedscope.
+    TITANIC_DEBUG=1 only.
+    """
+    _require_debug()
+    folded = await asyncio.to_thread(profiler.stop)
+    return PlainTextResponse(folded, headers={"Content-Disposition": 'attachment; filename="profile.folded"'})
+
+
+def _require_debug():
+    """Debug endpoints don't exist unless TITANIC_DEBUG=1"""
+    if not DEBUG:
+        raise HTTPException(status_code=404, detail="Not Found")
 
 
 @app.post("/chat", response_model=QueryResponse)
@@ -78,13 +302,267 @@ async def chat(request: QueryRequest):
         QueryResponse with answer and optional visualization
     """
     try:
-        result = agent.process_query(request.query)
-        return QueryResponse(
-            answer=result["answer"],
-            visualization=result.get("visualization")
-        )
+        result = await render_executor.run_query(request.query, request.include_base64, agent.analyzer)
+        with timed("serialize"):
+            body = QueryResponse(
+                answer=result["answer"],
+                data=result.get("data"),
+                visualization_id=result["visualization_id"],
+                visualization_url=_visualization_url(result["visualization_id"]),
+                thumbnail_url=_thumbnail_url(result["visualization_id"]),
+                visualization=result.get("visualization")
+            ).model_dump_json()
+        return Response(content=body, media_type="application/json")
+    except (RenderQueueFull, VersionUnavailable) as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except RenderTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/chat/stream")
+async def chat_stream(request: StreamQueryRequest, http_request: Request, format: Optional[str] = None):
+    """
+    Process a chat query and stream the result as it becomes ready.
+    
+    The first event carries the answer text and data (the same fields as
+    /chat, without the chart) and is sent as soon as the text is computed.
+    When the query has a chart, a second `visualization` event follows once
+    it is rendered in `image_format`; its `visualization_url` names that
+    format, so fetching it is served from cache, and with `include_base64`
+    its `visualization` field holds the image in that format. A final `done`
+    event closes the stream; render failures arrive as an `error` event.
+    
+    The stream is NDJSON (one JSON object per line) by default, or
+    Server-Sent Events with `?format=sse` or `Accept: text/event-stream`.
+    
+    Args:
+        request: StreamQueryRequest containing the user's question
+        
+    Returns:
+        StreamingResponse of answer / visualization / done events
+    """
+    if format is None:
+        format = "sse" if "text/event-stream" in http_request.headers.get("accept", "") else "ndjson"
+    if format not in STREAM_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported stream format: {format}")
+    if request.image_format not in CHART_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported image format: {request.image_format}")
+    
+    # Compute the text before the response starts so overload still maps to 503/504
+    analyzer = agent.analyzer
+    try:
+        result = await render_executor.run_query(request.query, False, analyzer)
+    except (RenderQueueFull, VersionUnavailable) as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except RenderTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    
+    encode = _sse_event if format == "sse" else _ndjson_event
+    
+    async def events():
+        viz_id = result["visualization_id"]
+        yield encode("answer", {
+            "answer": result["answer"],
+            "data": result.get("data"),
+            "visualization_id": viz_id,
+            "visualization_url": _visualization_url(viz_id),
+            "thumbnail_url": _thumbnail_url(viz_id),
+        })
+        if viz_id:
+            try:
+                _, kind = parse_visualization_id(viz_id)
+                image = await render_executor.run_chart(kind, request.image_format, analyzer)
+                url = f"{_visualization_url(viz_id)}?format={request.image_format}"
+                event = {"visualization_id": viz_id, "visualization_url": url}
+                if request.include_base64:
+                    event["visualization"] = base64.b64encode(image).decode('utf-8')
+                yield encode("visualization", event)
+            except Exception as e:
+                yield encode("error", {"detail": _batch_error(e)})
+        yield encode("done", {})
+    
+    return StreamingResponse(
+        events(),
+        media_type=STREAM_FORMATS[format],
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def _ndjson_event(event: str, payload: Dict[str, Any]) -> str:
+    """One NDJSON line, with the event name under the `event` key"""
+    return json.dumps({"event": event, **payload}) + "\n"
+
+
+def _sse_event(event: str, payload: Dict[str, Any]) -> str:
+    """One Server-Sent Event with a JSON data line"""
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+
+@app.post("/chat/batch", response_model=BatchQueryResponse)
+async def chat_batch(request: BatchQueryRequest):
+    """
+    Process many chat queries in one request.
+    
+    Queries that route to the same intent and parameters are answered once,
+    and the distinct answers (with their charts) are computed in parallel on
+    the render executor. Failures are reported per item.
+    
+    Args:
+        request: BatchQueryRequest containing the questions
+        
+    Returns:
+        BatchQueryResponse with one result per query, in order
+    """
+    # Every item is routed and answered from the same dataset version
+    analyzer = agent.analyzer
+    groups: Dict[Any, List[int]] = {}
+    for i, query in enumerate(request.queries):
+        groups.setdefault(agent.route(query, analyzer).key(), []).append(i)
+    
+    representatives = [request.queries[indices[0]] for indices in groups.values()]
+    outcomes = await asyncio.gather(
+        *(render_executor.run_query(query, request.include_base64, analyzer) for query in representatives),
+        return_exceptions=True
+    )
+    
+    results: List[Optional[BatchItemResponse]] = [None] * len(request.queries)
+    for indices, outcome in zip(groups.values(), outcomes):
+        for i in indices:
+            if isinstance(outcome, Exception):
+                results[i] = BatchItemResponse(query=request.queries[i], error=_batch_error(outcome))
+            else:
+                results[i] = BatchItemResponse(
+                    query=request.queries[i],
+                    answer=outcome["answer"],
+                    data=outcome.get("data"),
+                    visualization_id=outcome["visualization_id"],
+                    visualization_url=_visualization_url(outcome["visualization_id"]),
+                    thumbnail_url=_thumbnail_url(outcome["visualization_id"]),
+                    visualization=outcome.get("visualization")
+                )
+    return BatchQueryResponse(results=results)
+
+
+def _batch_error(error: Exception) -> str:
+    """Error message for a failed batch item"""
+    if isinstance(error, (RenderQueueFull, VersionUnavailable)):
+        return f"busy: {error}"
+    if isinstance(error, RenderTimeout):
+        return f"timeout: {error}"
+    return str(error)
+
+
+@app.get("/viz/profiles")
+async def render_profiles():
+    """The named render profiles accepted by /viz/{id}?profile="""
+    return {name: options.params() for name, options in PROFILES.items()}
+
+
+@app.get("/viz/{viz_id}")
+async def get_visualization(
+    viz_id: str,
+    request: Request,
+    format: Optional[str] = None,
+    profile: Optional[str] = None,
+    width: Optional[int] = None,
+    height: Optional[int] = None,
+    dpi: Optional[int] = None,
+    compression: Optional[int] = None,
+    quality: Optional[int] = None,
+    layout: Optional[str] = None,
+):
+    """
+    Stream a rendered chart as raw image bytes.
+    
+    The format is taken from `?format=` or negotiated from the Accept header
+    (PNG, WebP or SVG; PNG by default). IDs include the dataset version, so
+    responses are immutable and cached aggressively.
+    
+    Rendering follows a named `profile` (default, fast, small, thumbnail,
+    hires), and `width`/`height` (pixels), `dpi`, `compression` (PNG zlib
+    level, WebP effort), `quality` (WebP) and `layout` (tight or fixed)
+    override single settings of it.
+    """
+    try:
+        data_version, kind = parse_visualization_id(viz_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    analyzer = agent.analyzer
+    if data_version != analyzer.data_version:
+        raise HTTPException(status_code=404, detail="Visualization is from an older dataset version")
+    
+    if format is not None and format not in CHART_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {format}")
+    format = format or _negotiate_format(request.headers.get("accept", ""))
+    if format is None:
+        raise HTTPException(status_code=406, detail=f"Available: {', '.join(CHART_FORMATS.values())}")
+    try:
+        options = resolve_options(profile, width=width, height=height, dpi=dpi,
+                                  compression=compression, quality=quality, layout=layout)
+        options.check_raster(CHART_FIGSIZES[kind])
+    except RenderTooLarge as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    variant = "".join(f".{key}={value}" for key, value in sorted(options.params().items()))
+    headers = {
+        "ETag": f'"{viz_id}.{format}{variant}"',
+        "Cache-Control": "public, max-age=31536000, immutable",
+        "Vary": "Accept",
+    }
+    if _not_modified(request, headers["ETag"], analyzer.data_mtime):
+        return Response(status_code=304, headers=headers)
+    try:
+        image = await render_executor.run_chart(kind, format, analyzer, options)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except RenderQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except RenderTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    return Response(content=image, media_type=CHART_FORMATS[format], headers=headers)
+
+
+def _visualization_url(viz_id: Optional[str]) -> Optional[str]:
+    """Relative URL of a visualization"""
+    return f"/viz/{viz_id}" if viz_id else None
+
+
+def _thumbnail_url(viz_id: Optional[str]) -> Optional[str]:
+    """Relative URL of a visualization's preview"""
+    return f"/viz/{viz_id}?profile=thumbnail" if viz_id else None
+
+
+def _negotiate_format(accept: str) -> Optional[str]:
+    """Pick the best chart format for an Accept header (None if nothing fits)"""
+    if not accept.strip():
+        return "png"
+    by_mime = {mime: fmt for fmt, mime in CHART_FORMATS.items()}
+    best, best_q = None, 0.0
+    for position, part in enumerate(accept.split(",")):
+        mime, *params = [p.strip() for p in part.split(";")]
+        q = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        if mime in by_mime:
+            fmt = by_mime[mime]
+        elif mime in ("image/*", "*/*"):
+            fmt = "png"
+        else:
+            continue
+        # Earlier entries win ties
+        if q > best_q:
+            best, best_q = fmt, q
+    return best
 
 
 # Run the app
@@ -0,0 +1,194 @@
+"""
+Compact in-memory model of the passenger table
+"""
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from query_engine import popcount
+from stats_index import QUANTILES, _py
+
+# Low-cardinality columns kept as int8 codes (-1 = missing)
+CODED_COLUMNS = ("Sex", "Embarked", "Pclass")
+
+# Numeric columns kept as float32 values plus a packed validity mask
+MEASURE_COLUMNS = ("Age", "Fare")
+
+
+class PassengerTable:
+    """
+    Only the columns the analyses read, in their smallest useful form.
+
+    Sex, Embarked and Pclass are int8 codes into sorted categories, Survived
+    is one bit per passenger, and Age and Fare are float32 arrays with a
+    packed bit per row telling whether the value is present. Name, Ticket,
+    Cabin and the other columns are not kept; `frame()` loads the full
+    table again when something (the /info column stats) needs it.
+    """
+
+    def __init__(self, rows: int, codes: Dict[str, np.ndarray], categories: Dict[str, List[Any]],
+                 survived: np.ndarray, measures: Dict[str, np.ndarray], valid: Dict[str, np.ndarray],
+                 load_frame: Optional[Callable[[], pd.DataFrame]] = None):
+        self.rows = rows
+        self.codes = codes
+        self.categories = categories
+        self.survived_bits = survived
+        self.measures = measures
+        self.valid_bits = valid
+        self._load_frame = load_frame
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, load_frame: Optional[Callable[[], pd.DataFrame]] = None) -> "PassengerTable":
+        """
+        Project and compress a loaded DataFrame.
+
+        Args:
+            df: The full passenger table (need not be kept afterwards)
+            load_frame: Loads the full table again on demand
+        """
+        codes, categories = {}, {}
+        for column in CODED_COLUMNS:
+            series = df[column]
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                column_codes, uniques = series.cat.codes.to_numpy(), series.cat.categories
+            else:
+                column_codes, uniques = pd.factorize(series, sort=True)
+            codes[column] = column_codes.astype(np.int8)
+            categories[column] = [_py(value) for value in uniques]
+
+        measures, valid = {}, {}
+        for column in MEASURE_COLUMNS:
+            values = df[column].to_numpy(dtype=np.float32)
+            present = ~np.isnan(values)
+            measures[column] = np.where(present, values, np.float32(0))
+            valid[column] = np.packbits(present)
+
+        survived = np.packbits(df["Survived"].to_numpy() == 1)
+        return cls(len(df), codes, categories, survived, measures, valid, load_frame)
+
+    def survived(self) -> np.ndarray:
+        """One bool per passenger"""
+        return np.unpackbits(self.survived_bits, count=self.rows).view(bool)
+
+    def valid(self, column: str) -> np.ndarray:
+        """One bool per passenger: whether `column` has a value"""
+        return np.unpackbits(self.valid_bits[column], count=self.rows).view(bool)
+
+    def values(self, column: str) -> np.ndarray:
+        """The non-missing float32 values of a measure column"""
+        return self.measures[column][self.valid(column)]
+
+    def frame(self) -> pd.DataFrame:
+        """The full table, loaded again (nothing beyond this object is kept in memory)"""
+        if self._load_frame is None:
+            raise LookupError("This table was built without a way to load the full frame")
+        return self._load_frame()
+
+    def analysis_frame(self) -> pd.DataFrame:
+        """
+        The kept columns as a DataFrame (categoricals over the same codes,
+        NaN for missing values), for code that works on DataFrames.
+        """
+        data = {}
+        for column in CODED_COLUMNS:
+            dtype = pd.CategoricalDtype(pd.Index(self.categories[column]))
+            data[column] = pd.Categorical.from_codes(self.codes[column], dtype=dtype, validate=False)
+        data["Survived"] = self.survived().view(np.int8)
+        for column in MEASURE_COLUMNS:
+            data[column] = np.where(self.valid(column), self.measures[column], np.float32(np.nan))
+        return pd.DataFrame(data, copy=False)
+
+    def memory_usage(self) -> Dict[str, int]:
+        """Bytes held per column"""
+        usage = {column: codes.nbytes for column, codes in self.codes.items()}
+        usage["Survived"] = self.survived_bits.nbytes
+        for column in MEASURE_COLUMNS:
+            usage[column] = self.measures[column].nbytes + self.valid_bits[column].nbytes
+        return usage
+
+    @property
+    def nbytes(self) -> int:
+        return sum(self.memory_usage().values())
+
+
+class CompactStatsIndex:
+    """
+    The TitanicStatsIndex attributes computed directly on a PassengerTable:
+    group counts with bincount over codes, survivors from the Survived bits,
+    and moments and quantiles on the float32 values (accumulated in float64).
+    """
+
+    def __init__(self, table: PassengerTable):
+        self.table = table
+        self.total = table.rows
+        self.survived = popcount(table.survived_bits)
+        self.survival_rate = self.survived / self.total if self.total else float("nan")
+
+        survived = table.survived()
+        self.sex_counts = self._value_counts("Sex")
+        self.pclass_counts = self._value_counts("Pclass")
+        self.embarked_counts = self._value_counts("Embarked")
+        self.embarked_total = int((table.codes["Embarked"] >= 0).sum())
+        self.by_sex = self._group_table(("Sex",), survived)
+        self.by_pclass = self._group_table(("Pclass",), survived)
+        self.by_embarked = self._group_table(("Embarked",), survived)
+        self.by_sex_pclass = self._group_table(("Sex", "Pclass"), survived)
+        self.by_sex_embarked = self._group_table(("Sex", "Embarked"), survived)
+        self.by_pclass_embarked = self._group_table(("Pclass", "Embarked"), survived)
+        self.age = self._numeric_summary("Age")
+        self.fare = self._numeric_summary("Fare")
+
+    def _value_counts(self, column: str) -> Dict[Any, int]:
+        """Counts per category, most frequent first (missing values skipped)"""
+        categories = self.table.categories[column]
+        counts = np.bincount(self.table.codes[column] + 1, minlength=len(categories) + 1)[1:]
+        order = sorted(range(len(categories)), key=lambda i: -counts[i])
+        return {categories[i]: int(counts[i]) for i in order if counts[i]}
+
+    def _group_table(self, columns, survived: np.ndarray) -> Dict[Any, Dict[str, Any]]:
+        """Count, survivors and rate per observed combination, in category order"""
+        sizes = [len(self.table.categories[column]) for column in columns]
+        combined = np.zeros(self.total, dtype=np.int64)
+        present = np.ones(self.total, dtype=bool)
+        for column, size in zip(columns, sizes):
+            codes = self.table.codes[column]
+            present &= codes >= 0
+            combined = combined * size + codes
+        combined = combined[present]
+        length = int(np.prod(sizes))
+        counts = np.bincount(combined, minlength=length)
+        survivors = np.bincount(combined, weights=survived[present], minlength=length)
+
+        table = {}
+        for flat in np.flatnonzero(counts):
+            index = np.unravel_index(flat, sizes)
+            values = tuple(self.table.categories[column][i] for column, i in zip(columns, index))
+            count = int(counts[flat])
+            table[values if len(values) > 1 else values[0]] = {
+                "count": count,
+                "survived": int(survivors[flat]),
+                "rate": float(survivors[flat] / count),
+            }
+        return table
+
+    def _numeric_summary(self, column: str) -> Dict[str, Any]:
+        values = self.table.values(column)
+        count = len(values)
+        if not count:
+            nan = float("nan")
+            return {"count": 0, "missing": self.total, "mean": nan, "std": nan, "min": nan,
+                    "max": nan, "median": nan, "quantiles": {}}
+        mean = float(values.mean(dtype=np.float64))
+        std = float(values.std(dtype=np.float64, ddof=1)) if count > 1 else float("nan")
+        quantiles = np.quantile(values.astype(np.float64), QUANTILES)
+        return {
+            "count": count,
+            "missing": self.total - count,
+            "mean": mean,
+            "std": std,
+            "min": float(values.min()),
+            "max": float(values.max()),
+            "median": float(quantiles[list(QUANTILES).index(0.5)]),
+            "quantiles": {float(q): float(v) for q, v in zip(QUANTILES, quantiles)},
+        }
@@ -0,0 +1,137 @@
+"""
+Sampling profiler that can be switched on and off in a running server
+"""
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Optional
+
+# Seconds between stack samples
+PROFILE_INTERVAL = float(os.environ.get("TITANIC_PROFILE_INTERVAL", "0.005"))
+
+# Where a profile stopped by SIGUSR2 is written
+PROFILE_PATH = os.environ.get("TITANIC_PROFILE_PATH", "titanic-profile.folded")
+
+
+class SamplingProfiler:
+    """
+    Samples the stack of every thread at a fixed interval.
+
+    The result is in the folded format (`frame;frame;frame count` per line)
+    read by flamegraph.pl, speedscope and inferno. Sampling only reads
+    `sys._current_frames()`, so nothing is slowed down while it is off and
+    the cost while on is one walk of each stack per interval.
+    """
+
+    def __init__(self, interval: float = PROFILE_INTERVAL):
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self.started_at: Optional[float] = None
+        self.duration = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self, interval: Optional[float] = None) -> bool:
+        """
+        Discard any previous profile and start sampling.
+
+        Returns:
+            bool: False if the profiler was already running
+        """
+        with self._lock:
+            if self._thread is not None:
+                return False
+            if interval is not None:
+                self.interval = interval
+            self.samples = Counter()
+            self.started_at = time.time()
+            self.duration = 0.0
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+            self._thread.start()
+            return True
+
+    def stop(self) -> str:
+        """Stop sampling and return the folded profile"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+            if thread is not None:
+                self._stop.set()
+                thread.join()
+                self.duration = time.time() - self.started_at
+        return self.folded()
+
+    def folded(self) -> str:
+        """The samples collected so far, one `stack count` line per distinct stack"""
+        samples = self.samples.copy()
+        return "".join(f"{stack} {count}\n" for stack, count in samples.most_common())
+
+    def status(self) -> Dict[str, Any]:
+        """Whether sampling is on, and how much has been collected"""
+        return {
+            "running": self.running,
+            "interval": self.interval,
+            "samples": sum(self.samples.values()),
+            "stacks": len(self.samples),
+            "duration": (time.time() - self.started_at) if self.running else self.duration,
+        }
+
+    def dump(self, path: str = PROFILE_PATH) -> str:
+        """Write the folded profile to `path` and return the path"""
+        with open(path, "w") as f:
+            f.write(self.folded())
+        return path
+
+    def _run(self):
+        own = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, "thread"))
+                self.samples[";".join(reversed(stack))] += 1
+
+
+profiler = SamplingProfiler()
+
+
+def install_signal_handler(signum: int = getattr(signal, "SIGUSR2", 0), path: str = PROFILE_PATH) -> bool:
+    """
+    Toggle the profiler with a signal (`kill -USR2 <pid>`): the first signal
+    starts sampling, the next one stops it and writes the profile to `path`.
+
+    Returns:
+        bool: False where the signal does not exist or handlers can't be set
+        (Windows, or not on the main thread)
+    """
+    if not signum:
+        return False
+
+    def toggle(signum, frame):
+        if profiler.running:
+            # Joining the sampler must not block the interrupted main thread
+            threading.Thread(target=lambda: (profiler.stop(), profiler.dump(path)), daemon=True).start()
+        else:
+            profiler.start()
+
+    try:
+        signal.signal(signum, toggle)
+    except ValueError:
+        return False
+    return True
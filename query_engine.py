@@ -0,0 +1,533 @@
+"""
+Vectorized filter / group-by query engine over the Titanic dataset
+"""
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from streaming_stats import GROUP_SECTIONS
+
+# Columns indexed with one bitmap per distinct value
+CATEGORICAL_COLUMNS = ("Sex", "Pclass", "Embarked", "Survived")
+
+# Interior bucket edges of numeric columns; buckets are [edge, next edge)
+# with open-ended first and last buckets
+BUCKET_EDGES = {
+    "Age": tuple(range(5, 85, 5)),
+    "Fare": (5, 7.5, 10, 15, 20, 30, 50, 75, 100, 200, 300),
+}
+
+# Columns the out-of-core group tables cover (see AggregateQueryEngine)
+AGGREGATE_COLUMNS = ("Sex", "Pclass", "Embarked")
+
+# Compiled filter masks kept per index
+MASK_CACHE_SIZE = 256
+
+# Upper age bound (exclusive) of "children"
+CHILD_AGE = 18
+
+# Set bits per byte value (np.bitwise_count needs NumPy 2)
+POPCOUNT = np.array([bin(byte).count("1") for byte in range(256)], dtype=np.uint8)
+
+PORT_CODES = {"cherbourg": "C", "queenstown": "Q", "southampton": "S"}
+PORT_NAMES = {code: name.capitalize() for name, code in PORT_CODES.items()}
+
+SEX_TERMS = {
+    "female": ("women", "woman", "female", "females", "ladies", "lady", "girls", "girl"),
+    "male": ("men", "man", "male", "males", "gentlemen", "boys", "boy"),
+}
+
+GROUP_TERMS = {
+    "class": "Pclass", "classes": "Pclass", "pclass": "Pclass",
+    "sex": "Sex", "gender": "Sex",
+    "port": "Embarked", "ports": "Embarked", "embarkation": "Embarked",
+}
+
+GROUP_LABELS = {"Pclass": "Class", "Sex": "Sex", "Embarked": "Port"}
+
+# What the fixed intent handlers answer without the engine: a count split by
+# one of FIXED_FILTER_COLUMNS, and these (metric, group-by) pairs
+FIXED_FILTER_COLUMNS = ("Sex", "Embarked")
+FIXED_GROUPS = {("count", "Sex"), ("count", "Embarked"), ("survival", "Sex"), ("survival", "Pclass")}
+
+SURVIVAL_TERMS = ("survival", "survive", "survived", "surviving", "survivors", "survivor",
+                  "died", "death", "deaths", "perished", "dead")
+AGE_TERMS = ("age", "ages", "old")
+FARE_TERMS = ("fare", "fares", "ticket", "tickets", "paid", "price", "prices", "cost")
+FARE_SUBJECTS = ("fare", "fares", "ticket", "tickets", "price", "prices", "paid", "paying")
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+CLASS_PATTERN = re.compile(
+    r"\b(?:p?class\s*([123])|([123])(?:st|nd|rd)?[\s-]*class|(first|second|third)[\s-]*class)\b"
+)
+ORDINALS = {"first": 1, "second": 2, "third": 3}
+RANGE_PATTERN = re.compile(
+    r"(?:\b(?P<subject>ages?|aged|fares?|tickets?|prices?|paid|paying)\s+(?:of\s+|was\s+|is\s+)?)?"
+    r"\b(?P<op>over|above|older than|younger than|under|below|more than|less than|greater than"
+    r"|at least|at most|between|aged)\s+"
+    r"(?P<dollar>\$)?(?P<low>\d+(?:\.\d+)?)"
+    r"(?:\s*(?:and|to|-)\s*\$?(?P<high>\d+(?:\.\d+)?))?"
+    r"(?P<unit>\s*(?:years?|yrs|dollars|pounds)\b)?"
+)
+DECADE_PATTERN = re.compile(r"\b(?:in\s+(?:their|the)\s+)?([1-9])0s\b")
+RANGE_OPS = {
+    "over": ">", "above": ">", "older than": ">", "more than": ">", "greater than": ">",
+    "at least": ">=",
+    "under": "<", "below": "<", "younger than": "<", "less than": "<",
+    "at most": "<=",
+}
+
+
+@dataclass(frozen=True)
+class Filter:
+    """One predicate: `column op value` ('in' takes a tuple of values)"""
+    column: str
+    op: str
+    value: Any
+
+    def describe(self) -> str:
+        """Human readable form, e.g. 'Age > 30' or 'Embarked = Cherbourg'"""
+        if self.op == "in":
+            values = [PORT_NAMES.get(v, v) if self.column == "Embarked" else v for v in self.value]
+            return f"{self.column} = {' or '.join(str(v) for v in values)}"
+        value = f"${self.value:g}" if self.column == "Fare" else f"{self.value:g}"
+        return f"{self.column} {self.op} {value}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        value = list(self.value) if self.op == "in" else self.value
+        return {"column": self.column, "op": self.op, "value": value}
+
+
+@dataclass(frozen=True)
+class QuerySpec:
+    """A parsed ad-hoc query: filters, an optional group-by column and a metric"""
+    filters: Tuple[Filter, ...] = ()
+    group_by: Optional[str] = None
+    metric: str = "count"
+
+    @property
+    def ad_hoc(self) -> bool:
+        """
+        Whether the query needs the engine rather than a fixed intent handler.
+
+        The fixed handlers answer a lone count filter on sex or port ("what
+        percentage were male?") and the groupings in FIXED_GROUPS with no
+        filter ("survival by class"); anything else is not.
+        """
+        if not self.filters:
+            return self.group_by is not None and (self.metric, self.group_by) not in FIXED_GROUPS
+        if self.metric == "count" and self.group_by is None and len(self.filters) == 1:
+            return self.filters[0].column not in FIXED_FILTER_COLUMNS
+        return True
+
+
+def parse_query(query: str) -> QuerySpec:
+    """
+    Extract filters, a group-by column and the requested metric from a question.
+
+    Args:
+        query: User's natural language question
+
+    Returns:
+        QuerySpec (check `.ad_hoc` before sending it to the engine)
+    """
+    text = query.lower()
+    filters: List[Filter] = []
+    group_by = None
+
+    # Numeric ranges first; their text is blanked so "fare over 50" is not
+    # also read as a fare metric
+    for match in RANGE_PATTERN.finditer(text):
+        subject, op = match.group("subject"), match.group("op")
+        low, high = float(match.group("low")), match.group("high")
+        unit = (match.group("unit") or "").strip()
+        if subject in FARE_SUBJECTS or match.group("dollar") or unit in ("dollars", "pounds"):
+            column = "Fare"
+        else:
+            column = "Age"
+        if op in ("between", "aged"):
+            if high is None:
+                if op == "between":
+                    continue
+                filters += [Filter(column, ">=", low), Filter(column, "<", low + 1)]
+            else:
+                filters += [Filter(column, ">=", low), Filter(column, "<=", float(high))]
+        else:
+            filters.append(Filter(column, RANGE_OPS[op], low))
+        text = text[:match.start()] + " " * (match.end() - match.start()) + text[match.end():]
+
+    for match in DECADE_PATTERN.finditer(text):
+        decade = int(match.group(1)) * 10
+        filters += [Filter("Age", ">=", float(decade)), Filter("Age", "<", float(decade + 10))]
+
+    classes = set()
+    for match in CLASS_PATTERN.finditer(text):
+        number, prefix, ordinal = match.groups()
+        classes.add(int(number or prefix) if (number or prefix) else ORDINALS[ordinal])
+        text = text[:match.start()] + " " * (match.end() - match.start()) + text[match.end():]
+    if classes:
+        filters.append(Filter("Pclass", "in", tuple(sorted(classes))))
+
+    tokens = TOKEN_PATTERN.findall(text)
+    token_set = set(tokens)
+    for previous, token in zip([None] + tokens, tokens):
+        if previous in ("by", "per", "each", "across") and token in GROUP_TERMS:
+            group_by = group_by or GROUP_TERMS[token]
+
+    sexes = tuple(sex for sex, terms in SEX_TERMS.items() if token_set.intersection(terms))
+    if len(sexes) == 1:
+        filters.append(Filter("Sex", "in", sexes))
+    elif len(sexes) > 1:
+        group_by = group_by or "Sex"
+
+    ports = tuple(sorted(code for name, code in PORT_CODES.items() if name in token_set))
+    if ports:
+        filters.append(Filter("Embarked", "in", ports))
+
+    if token_set.intersection(("children", "child", "kids")):
+        filters.append(Filter("Age", "<", float(CHILD_AGE)))
+    elif token_set.intersection(("adults", "adult")):
+        filters.append(Filter("Age", ">=", float(CHILD_AGE)))
+
+    # Metric: an explicit age/fare question turns survival words into a filter
+    survival_words = token_set.intersection(SURVIVAL_TERMS)
+    if token_set.intersection(AGE_TERMS):
+        metric = "age"
+    elif token_set.intersection(FARE_TERMS):
+        metric = "fare"
+    elif survival_words:
+        metric = "survival"
+    else:
+        metric = "count"
+    if survival_words and metric in ("age", "fare"):
+        died = survival_words.intersection(("died", "death", "deaths", "perished", "dead"))
+        filters.append(Filter("Survived", "in", (0,) if died else (1,)))
+
+    return QuerySpec(filters=tuple(filters), group_by=group_by, metric=metric)
+
+
+def _pack(mask: np.ndarray) -> np.ndarray:
+    return np.packbits(mask)
+
+
+def popcount(bitmap: np.ndarray) -> int:
+    """Number of set bits in a packed bitmap"""
+    return int(POPCOUNT[bitmap].sum(dtype=np.int64))
+
+
+class BitmapIndex:
+    """
+    Packed bitmaps (one bit per row) per categorical value and numeric bucket.
+
+    A filter compiles to a bitmap by OR-ing the bitmaps of the values or
+    buckets it covers; only rows in a bucket cut by a range boundary are
+    compared individually. Compiled filters are cached, and filters combine
+    with a bitwise AND over n/8 bytes.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.rows = len(df)
+        self.values: Dict[str, List[Any]] = {}
+        self._bitmaps: Dict[Tuple[str, Any], np.ndarray] = {}
+        self._numeric: Dict[str, np.ndarray] = {}
+        self._bucket_bounds: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._bucket_rows: Dict[str, List[np.ndarray]] = {}
+        self._masks: "OrderedDict[Filter, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.all_rows = _pack(np.ones(self.rows, dtype=bool))
+
+        for column in CATEGORICAL_COLUMNS:
+            if column in df.columns:
+                self._index_categorical(column, df[column])
+        for column, edges in BUCKET_EDGES.items():
+            if column in df.columns:
+                values = df[column].to_numpy()
+                # A float32 column (the compact table) stays float32
+                if values.dtype != np.float32:
+                    values = values.astype(np.float64, copy=False)
+                self._index_buckets(column, values, edges)
+
+    def _index_categorical(self, column: str, series: pd.Series):
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            codes, uniques = series.cat.codes.to_numpy(), series.cat.categories
+        else:
+            codes, uniques = pd.factorize(series, sort=True)
+        self.values[column] = []
+        for code, value in enumerate(uniques):
+            value = value.item() if hasattr(value, "item") else value
+            self.values[column].append(value)
+            self._bitmaps[(column, value)] = _pack(codes == code)
+
+    def _index_buckets(self, column: str, values: np.ndarray, edges: Tuple[float, ...]):
+        edges = np.asarray(edges, dtype=np.float64)
+        self._numeric[column] = values
+        self._bucket_bounds[column] = (np.concatenate(([-np.inf], edges)), np.concatenate((edges, [np.inf])))
+        bucket_ids = np.searchsorted(edges, values, side="right")
+        bucket_ids[np.isnan(values)] = -1
+        index_dtype = np.int32 if self.rows < 2 ** 31 else np.int64
+        rows = []
+        for bucket in range(len(edges) + 1):
+            in_bucket = bucket_ids == bucket
+            self._bitmaps[(column, bucket)] = _pack(in_bucket)
+            rows.append(np.flatnonzero(in_bucket).astype(index_dtype))
+        self._bucket_rows[column] = rows
+
+    def bitmap(self, column: str, value: Any) -> np.ndarray:
+        """Bitmap of rows where a categorical column equals `value` (empty if unseen)"""
+        bitmap = self._bitmaps.get((column, value))
+        return bitmap if bitmap is not None else np.zeros_like(self.all_rows)
+
+    def mask(self, flt: Filter) -> np.ndarray:
+        """Packed bitmap of the rows matching one filter (cached)"""
+        with self._lock:
+            cached = self._masks.get(flt)
+            if cached is not None:
+                self._masks.move_to_end(flt)
+                return cached
+        mask = self._compile(flt)
+        with self._lock:
+            self._masks[flt] = mask
+            while len(self._masks) > MASK_CACHE_SIZE:
+                self._masks.popitem(last=False)
+        return mask
+
+    def combine(self, filters: Tuple[Filter, ...]) -> np.ndarray:
+        """Packed bitmap of the rows matching every filter"""
+        result = self.all_rows
+        for flt in filters:
+            result = np.bitwise_and(result, self.mask(flt))
+        return result
+
+    @staticmethod
+    def count(bitmap: np.ndarray) -> int:
+        """Number of set bits"""
+        return popcount(bitmap)
+
+    def select(self, column: str, bitmap: np.ndarray) -> np.ndarray:
+        """Non-missing values of a numeric column on the rows of `bitmap`"""
+        rows = np.unpackbits(bitmap, count=self.rows).view(bool)
+        values = self._numeric[column][rows]
+        return values[~np.isnan(values)]
+
+    def _compile(self, flt: Filter) -> np.ndarray:
+        if flt.op == "in":
+            result = np.zeros_like(self.all_rows)
+            for value in flt.value:
+                result |= self.bitmap(flt.column, value)
+            return result
+        if flt.column not in self._numeric:
+            raise ValueError(f"No numeric index for column {flt.column}")
+
+        compare = {">": np.greater, ">=": np.greater_equal, "<": np.less, "<=": np.less_equal}[flt.op]
+        lows, highs = self._bucket_bounds[flt.column]
+        x = flt.value
+        # Buckets hold values in [low, high): wholly inside, wholly outside or cut
+        if flt.op in (">", ">="):
+            full, empty = compare(lows, x), highs <= x
+        else:
+            full, empty = highs <= x, (lows >= x if flt.op == "<" else lows > x)
+
+        result = np.zeros_like(self.all_rows)
+        values = self._numeric[flt.column]
+        for bucket in range(len(lows)):
+            if full[bucket]:
+                result |= self._bitmaps[(flt.column, bucket)]
+            elif not empty[bucket]:
+                rows = self._bucket_rows[flt.column][bucket]
+                rows = rows[compare(values[rows], x)]
+                np.bitwise_or.at(result, rows >> 3, (0x80 >> (rows & 7)).astype(np.uint8))
+        return result
+
+
+class QueryEngine:
+    """Answers QuerySpecs from a BitmapIndex built once per dataset version"""
+
+    def __init__(self, df: pd.DataFrame):
+        self.index = BitmapIndex(df)
+
+    def execute(self, spec: QuerySpec) -> Dict[str, Any]:
+        """
+        Run a query.
+
+        Returns:
+            Dict with the filters, metric, total and matched row counts, the
+            metric over all matched rows and, with a group-by, per group
+        """
+        index = self.index
+        bitmap = index.combine(spec.filters)
+        matched = index.count(bitmap)
+        result = {
+            "filters": [f.to_dict() for f in spec.filters],
+            "conditions": [f.describe() for f in spec.filters],
+            "group_by": spec.group_by,
+            "metric": spec.metric,
+            "total": index.rows,
+            "matched": matched,
+            "matched_pct": matched / index.rows * 100 if index.rows else None,
+            "value": self._metric(spec.metric, bitmap, matched),
+            "groups": None,
+        }
+        if spec.group_by:
+            result["groups"] = []
+            for value in index.values.get(spec.group_by, []):
+                group = np.bitwise_and(bitmap, index.bitmap(spec.group_by, value))
+                count = index.count(group)
+                if count:
+                    result["groups"].append({
+                        "group": value,
+                        "matched": count,
+                        "value": self._metric(spec.metric, group, count),
+                    })
+        return result
+
+    def _metric(self, metric: str, bitmap: np.ndarray, matched: int) -> Dict[str, Any]:
+        index = self.index
+        if metric == "survival":
+            survived = index.count(np.bitwise_and(bitmap, index.bitmap("Survived", 1)))
+            return {"survived": survived, "rate_pct": survived / matched * 100 if matched else None}
+        if metric in ("age", "fare"):
+            values = index.select(metric.capitalize(), bitmap)
+            if not len(values):
+                return {"count": 0, "mean": None, "median": None, "min": None, "max": None}
+            return {
+                "count": int(len(values)),
+                "mean": float(values.mean(dtype=np.float64)),
+                "median": float(np.median(values)),
+                "min": float(values.min()),
+                "max": float(values.max()),
+            }
+        return {"count": matched}
+
+
+class AggregateQueryEngine:
+    """
+    Answers the QuerySpecs that count or take survival rates over sex, class
+    and port from the group tables of a StreamingStatsIndex, for out-of-core
+    mode where there are no rows to filter. Results have the QueryEngine shape.
+    """
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    @staticmethod
+    def answerable(spec: QuerySpec) -> bool:
+        """Whether the group tables hold everything `spec` needs"""
+        return (spec.metric in ("count", "survival")
+                and all(f.op == "in" and f.column in AGGREGATE_COLUMNS for f in spec.filters)
+                and spec.group_by in (None,) + AGGREGATE_COLUMNS)
+
+    def execute(self, spec: QuerySpec) -> Dict[str, Any]:
+        """
+        Run a query.
+
+        Raises:
+            ValueError: If the query filters on or measures age or fare
+        """
+        if not self.answerable(spec):
+            raise ValueError("Only counts and survival rates over sex, class and port are kept out of core")
+        matched, survived = self._counts(spec.filters, None)[None]
+        total = self.stats.total
+        result = {
+            "filters": [f.to_dict() for f in spec.filters],
+            "conditions": [f.describe() for f in spec.filters],
+            "group_by": spec.group_by,
+            "metric": spec.metric,
+            "total": total,
+            "matched": matched,
+            "matched_pct": matched / total * 100 if total else None,
+            "value": self._metric(spec.metric, matched, survived),
+            "groups": None,
+        }
+        if spec.group_by:
+            result["groups"] = [
+                {"group": value, "matched": count, "value": self._metric(spec.metric, count, group_survived)}
+                for value, (count, group_survived) in sorted(self._counts(spec.filters, spec.group_by).items())
+                if count
+            ]
+        return result
+
+    def _counts(self, filters: Tuple[Filter, ...], group_by: Optional[str]) -> Dict[Any, List[int]]:
+        """[passengers, survivors] matching `filters`, per value of `group_by` (one None group without)"""
+        columns = {f.column for f in filters} | ({group_by} if group_by else set())
+        if not columns:
+            return {None: [self.stats.total, self.stats.survived]}
+        # The smallest table holding every column involved (rows missing one are not in it)
+        keys, table = min(
+            ((keys, name) for name, keys in GROUP_SECTIONS.items() if columns <= set(keys)),
+            key=lambda item: len(item[0]),
+        )
+        groups: Dict[Any, List[int]] = {} if group_by else {None: [0, 0]}
+        for key, entry in getattr(self.stats, table).items():
+            row = dict(zip(keys, key if isinstance(key, tuple) else (key,)))
+            if all(row[f.column] in f.value for f in filters):
+                group = groups.setdefault(row.get(group_by), [0, 0])
+                group[0] += entry["count"]
+                group[1] += entry["survived"]
+        return groups
+
+    @staticmethod
+    def _metric(metric: str, matched: int, survived: int) -> Dict[str, Any]:
+        if metric == "survival":
+            return {"survived": survived, "rate_pct": survived / matched * 100 if matched else None}
+        return {"count": matched}
+
+
+def format_result(result: Dict[str, Any]) -> str:
+    """Prose answer for a QueryEngine result"""
+    metric = result["metric"]
+    title = METRIC_TITLES[metric]
+    if result["conditions"]:
+        title += f" ({', '.join(result['conditions'])})"
+    text = f"{title}:\n- Passengers matched: {result['matched']} of {result['total']}"
+    text += f" ({result['matched_pct']:.2f}%)\n" if result["matched_pct"] is not None else "\n"
+    if not result["matched"]:
+        return text + "- No passengers match these filters.\n"
+    text += _format_metric(metric, result["value"])
+
+    if result["groups"]:
+        group_by = result["group_by"]
+        text += f"\nBy {GROUP_LABELS.get(group_by, group_by)}:\n"
+        for group in result["groups"]:
+            text += f"  - {_group_name(group_by, group['group'])}: {group['matched']} passengers"
+            text += f", {_format_metric(metric, group['value'], inline=True)}\n" if metric != "count" else "\n"
+    return text
+
+
+METRIC_TITLES = {
+    "count": "Passenger Count",
+    "survival": "Survival Rate",
+    "age": "Age Statistics",
+    "fare": "Ticket Fare Statistics",
+}
+
+
+def _group_name(group_by: str, value: Any) -> str:
+    if group_by == "Embarked":
+        return PORT_NAMES.get(value, value)
+    if group_by == "Pclass":
+        return f"Class {value}"
+    return str(value).capitalize()
+
+
+def _format_metric(metric: str, value: Dict[str, Any], inline: bool = False) -> str:
+    """Metric lines under the match count, or a short fragment for a group line"""
+    if metric == "survival":
+        if inline:
+            return f"{value['rate_pct']:.2f}% survived"
+        return f"- Survival Rate: {value['rate_pct']:.2f}% ({value['survived']} survived)\n"
+    if metric in ("age", "fare"):
+        name, unit, money = ("Age", " years", "") if metric == "age" else ("Fare", "", "$")
+        if not value["count"]:
+            return f"no known {metric} values" if inline else f"- No known {metric} values.\n"
+        if inline:
+            return f"mean {money}{value['mean']:.2f}{unit}, median {money}{value['median']:.2f}{unit}"
+        return "".join(
+            f"- {label} {name}: {money}{value[key]:.2f}{unit}\n"
+            for label, key in (("Mean", "mean"), ("Median", "median"), ("Min", "min"), ("Max", "max"))
+        )
+    return ""
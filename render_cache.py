@@ -0,0 +1,197 @@
+"""
+Content-addressed cache for rendered visualizations
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+# Cache configuration - overridable through the environment
+RENDER_CACHE_BYTES = int(os.environ.get("TITANIC_RENDER_CACHE_BYTES", str(64 * 1024 * 1024)))
+RENDER_CACHE_DIR = os.environ.get("TITANIC_RENDER_CACHE_DIR") or None
+
+# Names of the per-version directories of the disk tier (data_loader.get_dataset_version);
+# anything else under cache_dir is not the cache's to delete
+VERSION_DIR = re.compile(r"[0-9a-f]{16}")
+
+
+def make_key(kind: str, params: Dict[str, Any], data_version: str) -> str:
+    """
+    Build the cache key for a chart.
+
+    Args:
+        kind: Chart kind, e.g. 'age_histogram'
+        params: Rendering parameters (must be JSON serializable)
+        data_version: Version hash of the dataset the chart is drawn from
+
+    Returns:
+        str: Hex digest identifying the rendered image
+    """
+    payload = json.dumps([kind, params, data_version], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class RenderCache:
+    """
+    Two-tier cache of rendered images.
+
+    Memory tier: LRU bounded by total bytes. Disk tier (optional): one file per
+    image under `cache_dir/<data_version>/`, so restarted workers start warm.
+    """
+
+    def __init__(self, max_bytes: int = RENDER_CACHE_BYTES, cache_dir: Optional[str] = RENDER_CACHE_DIR):
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (data_version, bytes)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._rendering: Dict[str, threading.Lock] = {}
+        self._retained: Optional[str] = None  # Only this dataset version is stored, once set
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str, data_version: str) -> Optional[bytes]:
+        """Return the cached image bytes, or None on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+        data = self._read_disk(key, data_version)
+        with self._lock:
+            if data is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._store(key, data_version, data)
+        return data
+
+    def put(self, key: str, data_version: str, data: bytes):
+        """Store image bytes in both tiers (renders of a retired version are not stored)"""
+        with self._lock:
+            if self._retained is not None and data_version != self._retained:
+                return
+            self._store(key, data_version, data)
+        self._write_disk(key, data_version, data)
+
+    def get_or_render(self, key: str, data_version: str, render: Callable[[], bytes]) -> bytes:
+        """
+        Return the cached image, rendering it on a miss.
+
+        Concurrent misses for the same key render once; the other callers
+        wait and receive the same bytes.
+        """
+        data = self.get(key, data_version)
+        if data is not None:
+            return data
+        with self._lock:
+            key_lock = self._rendering.setdefault(key, threading.Lock())
+        try:
+            with key_lock:
+                with self._lock:
+                    entry = self._entries.get(key)
+                if entry is not None:
+                    return entry[1]
+                data = render()
+                self.put(key, data_version, data)
+                return data
+        finally:
+            # A caller that arrives after the leader finished may have made a
+            # new lock; only whoever's lock is still registered removes it
+            with self._lock:
+                if self._rendering.get(key) is key_lock:
+                    del self._rendering[key]
+
+    def retain_version(self, data_version: str):
+        """
+        Drop every entry that was rendered from a different dataset version.
+
+        On disk only version directories are removed, so cache_dir may be a
+        shared directory.
+        """
+        with self._lock:
+            self._retained = data_version
+            stale = [k for k, (version, _) in self._entries.items() if version != data_version]
+            for key in stale:
+                self._bytes -= len(self._entries.pop(key)[1])
+            self.evictions += len(stale)
+
+        if self.cache_dir and os.path.isdir(self.cache_dir):
+            for name in os.listdir(self.cache_dir):
+                path = os.path.join(self.cache_dir, name)
+                if name != data_version and VERSION_DIR.fullmatch(name) and os.path.isdir(path):
+                    shutil.rmtree(path, ignore_errors=True)
+
+    def clear(self):
+        """Empty the memory tier"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss/eviction counters and current memory usage"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def _store(self, key: str, data_version: str, data: bytes):
+        # Caller holds the lock
+        if len(data) > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= len(old[1])
+        self._entries[key] = (data_version, data)
+        self._bytes += len(data)
+        while self._bytes > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+            self.evictions += 1
+
+    def _disk_path(self, key: str, data_version: str) -> str:
+        return os.path.join(self.cache_dir, data_version, f"{key}.img")
+
+    def _read_disk(self, key: str, data_version: str) -> Optional[bytes]:
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._disk_path(key, data_version), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _write_disk(self, key: str, data_version: str, data: bytes):
+        if not self.cache_dir:
+            return
+        path = self._disk_path(key, data_version)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            # The disk tier is best effort
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+
+# Shared cache used by TitanicAnalyzer instances in this process
+default_cache = RenderCache()
@@ -0,0 +1,129 @@
+"""
+Per-request chart rendering options and named server-side profiles
+"""
+import os
+from dataclasses import asdict, dataclass, replace
+from typing import Any, Dict, Optional, Tuple
+
+# Chart layouts: "tight" measures the labels and crops to them (an extra
+# layout pass per render), "fixed" uses preset margins
+LAYOUTS = ("tight", "fixed")
+
+# Bounds on request-supplied values, so one request can't ask for a huge render:
+# each side of the rendered canvas, and its area
+MAX_PIXELS = 4000
+MAX_AREA = 10_000_000
+DPI_RANGE = (10, 600)
+
+# Size in inches each chart is drawn at unless width/height override it
+CHART_FIGSIZES = {
+    "age_histogram": (10, 6),
+    "gender_pie": (8, 8),
+    "embarkation_bar": (10, 6),
+    "fare_histogram": (10, 6),
+    "survival_by_class": (10, 6),
+}
+
+
+class RenderTooLarge(ValueError):
+    """The options would render a canvas beyond MAX_PIXELS / MAX_AREA"""
+
+
+@dataclass(frozen=True)
+class RenderOptions:
+    """
+    How a chart is drawn and encoded.
+
+    Attributes:
+        width: Output width in pixels (None = the chart's default size)
+        height: Output height in pixels (None = keep the chart's aspect ratio)
+        dpi: Pixels per inch; fonts and lines scale with it
+        compression: PNG zlib level 0-9, or WebP encoder effort 0-6
+            (None = the encoder default)
+        quality: WebP quality 1-100 (None = the encoder default)
+        layout: One of LAYOUTS
+    """
+    width: Optional[int] = None
+    height: Optional[int] = None
+    dpi: int = 100
+    compression: Optional[int] = None
+    quality: Optional[int] = None
+    layout: str = "tight"
+
+    def __post_init__(self):
+        for name in ("width", "height"):
+            value = getattr(self, name)
+            if value is not None and not 16 <= value <= MAX_PIXELS:
+                raise ValueError(f"{name} must be between 16 and {MAX_PIXELS} pixels")
+        if not DPI_RANGE[0] <= self.dpi <= DPI_RANGE[1]:
+            raise ValueError(f"dpi must be between {DPI_RANGE[0]} and {DPI_RANGE[1]}")
+        if self.compression is not None and not 0 <= self.compression <= 9:
+            raise ValueError("compression must be between 0 and 9")
+        if self.quality is not None and not 1 <= self.quality <= 100:
+            raise ValueError("quality must be between 1 and 100")
+        if self.layout not in LAYOUTS:
+            raise ValueError(f"layout must be one of: {', '.join(LAYOUTS)}")
+
+    def figsize(self, default: tuple) -> tuple:
+        """Figure size in inches for a chart whose default size is `default`"""
+        if self.width is None and self.height is None:
+            return default
+        aspect = default[1] / default[0]
+        width = self.width if self.width is not None else self.height / aspect
+        height = self.height if self.height is not None else self.width * aspect
+        return width / self.dpi, height / self.dpi
+
+    def raster_size(self, default: tuple) -> Tuple[int, int]:
+        """Canvas size in pixels (figure size x dpi) for a chart whose default size is `default`"""
+        width, height = self.figsize(default)
+        return round(width * self.dpi), round(height * self.dpi)
+
+    def check_raster(self, default: tuple):
+        """
+        Raises:
+            RenderTooLarge: If the canvas would exceed MAX_PIXELS per side or MAX_AREA
+        """
+        width, height = self.raster_size(default)
+        if width > MAX_PIXELS or height > MAX_PIXELS or width * height > MAX_AREA:
+            raise RenderTooLarge(f"{width}x{height} pixels exceeds the limit of {MAX_PIXELS} per side "
+                                 f"and {MAX_AREA:,} in total; lower dpi, width or height")
+
+    def params(self) -> Dict[str, Any]:
+        """The options that differ from the defaults, for cache keys and ETags"""
+        defaults = asdict(RenderOptions())
+        return {k: v for k, v in asdict(self).items() if v != defaults[k]}
+
+
+# Named option sets, selected with ?profile=
+PROFILES: Dict[str, RenderOptions] = {
+    # Cropped to the labels, as charts have always been rendered
+    "default": RenderOptions(),
+    # Skips the layout measurement pass and uses fast zlib
+    "fast": RenderOptions(layout="fixed", compression=1),
+    # Smallest full-size payload: maximum compression effort
+    "small": RenderOptions(layout="fixed", compression=9, quality=75),
+    # Previews: the same layout at about a quarter of the width (240x144 for most charts)
+    "thumbnail": RenderOptions(dpi=24, layout="fixed", compression=9, quality=60),
+    # High-resolution for print or zooming
+    "hires": RenderOptions(dpi=200),
+}
+
+# Profile used when a request does not choose one
+DEFAULT_PROFILE = os.environ.get("TITANIC_RENDER_PROFILE", "default")
+if DEFAULT_PROFILE not in PROFILES:
+    raise ValueError(f"Unknown TITANIC_RENDER_PROFILE: {DEFAULT_PROFILE}")
+
+
+def resolve_options(profile: Optional[str] = None, **overrides) -> RenderOptions:
+    """
+    Options from a named profile (DEFAULT_PROFILE if None) with individual
+    fields overridden; overrides that are None are ignored.
+
+    Raises:
+        ValueError: Unknown profile or an out-of-range value
+    """
+    name = profile or DEFAULT_PROFILE
+    if name not in PROFILES:
+        raise ValueError(f"Unknown render profile: {name} (available: {', '.join(PROFILES)})")
+    changes = {k: v for k, v in overrides.items() if v is not None}
+    return replace(PROFILES[name], **changes) if changes else PROFILES[name]
@@ -0,0 +1,192 @@
+"""
+Rendering executor for running chart work off the event loop
+"""
+import asyncio
+import contextvars
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+# Executor configuration - overridable through the environment
+RENDER_EXECUTOR = os.environ.get("TITANIC_RENDER_EXECUTOR", "thread")  # thread | process | inline
+RENDER_WORKERS = int(os.environ.get("TITANIC_RENDER_WORKERS", "4"))
+RENDER_QUEUE_DEPTH = int(os.environ.get("TITANIC_RENDER_QUEUE_DEPTH", "32"))
+RENDER_TIMEOUT = float(os.environ.get("TITANIC_RENDER_TIMEOUT", "30"))
+
+
+class RenderQueueFull(Exception):
+    """Raised when the executor already has the maximum number of jobs queued"""
+
+
+class RenderTimeout(Exception):
+    """Raised when a job does not finish within the configured timeout"""
+
+
+class VersionUnavailable(LookupError):
+    """Raised in process mode when a worker no longer holds the requested dataset version"""
+
+
+# Per-process agent used by process pool workers
+_worker_agent = None
+
+# The analyzer a worker replaced on its last reload, kept for jobs the parent
+# submitted against that version before (or while) it switched
+_worker_previous = None
+
+
+def _init_worker():
+    """Build an agent and warm up matplotlib once per worker process"""
+    global _worker_agent
+    from agent import TitanicAgent, warm_up_rendering
+
+    _worker_agent = TitanicAgent()
+    warm_up_rendering()
+
+
+def _worker_analyzer(data_version: Optional[str]):
+    """
+    The worker's analyzer for `data_version`, reloading the dataset when the
+    parent has moved to a newer version. The analyzer it replaces is kept, so
+    jobs still on the old version finish on it.
+
+    Raises:
+        VersionUnavailable: The worker holds neither the requested version
+            nor, after a reload, the file on disk
+    """
+    global _worker_previous
+    from agent import TitanicAnalyzer
+
+    analyzer = _worker_agent.analyzer
+    if data_version is None or analyzer.data_version == data_version:
+        return analyzer
+    if _worker_previous is not None and _worker_previous.data_version == data_version:
+        return _worker_previous
+    loaded = TitanicAnalyzer()
+    if loaded.data_version != analyzer.data_version:
+        _worker_previous, _worker_agent.analyzer = analyzer, loaded
+    if loaded.data_version != data_version:
+        raise VersionUnavailable(f"Dataset version {data_version} is no longer available")
+    return loaded
+
+
+def _process_query_in_worker(query: str, inline_images: bool, data_version: Optional[str] = None) -> Dict[str, Any]:
+    """Entry point for queries executed in a process pool worker"""
+    return _worker_agent.process_query(query, inline_images, _worker_analyzer(data_version))
+
+
+def _render_chart_in_worker(kind: str, format: str, data_version: Optional[str] = None, options=None) -> bytes:
+    """Entry point for chart renders executed in a process pool worker"""
+    return _worker_analyzer(data_version).render_chart(kind, format, options)
+
+
+def _noop():
+    """Job that only forces a worker process (and its initializer) to start"""
+    return os.getpid()
+
+
+class RenderExecutor:
+    """
+    Bounded executor for agent queries and chart rendering.
+
+    At most `queue_depth` jobs may be running or waiting at once; further
+    submissions fail fast with RenderQueueFull so callers can shed load.
+    """
+
+    def __init__(
+        self,
+        agent=None,
+        kind: str = RENDER_EXECUTOR,
+        workers: int = RENDER_WORKERS,
+        queue_depth: int = RENDER_QUEUE_DEPTH,
+        timeout: float = RENDER_TIMEOUT,
+    ):
+        if kind not in ("thread", "process", "inline"):
+            raise ValueError(f"Unknown render executor kind: {kind}")
+        self.agent = agent
+        self.kind = kind
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(queue_depth)
+        self._pool = None
+        if kind == "thread":
+            self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="render")
+        elif kind == "process":
+            self._pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+
+    async def run(self, fn: Callable, *args) -> Any:
+        """
+        Run `fn(*args)` on the executor and await its result.
+
+        In process mode `fn` must be a picklable module-level function.
+
+        Raises:
+            RenderQueueFull: If `queue_depth` jobs are already pending
+            RenderTimeout: If the job takes longer than `timeout` seconds
+        """
+        if not self._slots.acquire(blocking=False):
+            raise RenderQueueFull(f"Render queue is full ({self.queue_depth} jobs pending)")
+
+        if self._pool is None:
+            try:
+                return fn(*args)
+            finally:
+                self._slots.release()
+
+        try:
+            if self.kind == "thread":
+                # Stage timings recorded in the job count towards the calling request
+                future = self._pool.submit(contextvars.copy_context().run, fn, *args)
+            else:
+                future = self._pool.submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        # The slot is held until the job really finishes, even after a timeout
+        future.add_done_callback(self._release_slot)
+
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            raise RenderTimeout(f"Render job exceeded {self.timeout:.1f}s")
+
+    async def run_query(self, query: str, inline_images: bool = True, analyzer=None) -> Dict[str, Any]:
+        """Process a chat query on the executor, from `analyzer`'s dataset version if given"""
+        if self.kind == "process":
+            version = analyzer.data_version if analyzer is not None else None
+            return await self.run(_process_query_in_worker, query, inline_images, version)
+        return await self.run(self.agent.process_query, query, inline_images, analyzer)
+
+    async def run_chart(self, kind: str, format: str = "png", analyzer=None, options=None) -> bytes:
+        """
+        Render a chart on the executor, from `analyzer`'s dataset version if
+        given, with RenderOptions `options` (the default profile if omitted)
+        """
+        if self.kind == "process":
+            version = analyzer.data_version if analyzer is not None else None
+            return await self.run(_render_chart_in_worker, kind, format, version, options)
+        analyzer = analyzer if analyzer is not None else self.agent.analyzer
+        return await self.run(analyzer.render_chart, kind, format, options)
+
+    def warm_up(self):
+        """Blocking: load the plotting stack wherever charts will be rendered"""
+        if self.kind == "process":
+            # Workers start lazily; one job per worker runs every initializer
+            for future in [self._pool.submit(_noop) for _ in range(self.workers)]:
+                future.result()
+        else:
+            from agent import warm_up_rendering
+            warm_up_rendering()
+
+    def pending(self) -> int:
+        """Number of jobs currently running or queued"""
+        return self.queue_depth - self._slots._value
+
+    def shutdown(self, wait: bool = True):
+        """Shut down the underlying pool"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait, cancel_futures=True)
+
+    def _release_slot(self, future: Optional[Future] = None):
+        self._slots.release()
@@ -0,0 +1,156 @@
+"""
+Cache of whole chat answers, in front of TitanicAgent.process_query
+"""
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+# Cache configuration - overridable through the environment (size 0 disables it)
+RESPONSE_CACHE_SIZE = int(os.environ.get("TITANIC_RESPONSE_CACHE_SIZE", "1024"))
+RESPONSE_CACHE_TTL = float(os.environ.get("TITANIC_RESPONSE_CACHE_TTL", "300"))
+
+# Words no intent, parameter or filter depends on
+STOP_WORDS = frozenset({"please", "a", "an", "the", "me", "us", "can", "could", "would", "you", "tell"})
+
+# Punctuation outside numbers ("$12.50" and "20-30" keep theirs)
+PUNCTUATION_PATTERN = re.compile(r"[?!,;:\"()]|\.(?!\d)")
+
+
+def normalize_query(query: str) -> str:
+    """
+    Case, whitespace, punctuation and stop words folded away, so that
+    "Show me the age histogram!" and "show age histogram" are one entry.
+    """
+    words = PUNCTUATION_PATTERN.sub(" ", query.lower()).split()
+    return " ".join(word for word in words if word not in STOP_WORDS)
+
+
+class ResponseCache:
+    """
+    LRU of answers with a time-to-live, keyed by (dataset version, route key,
+    inline images).
+
+    Keying on the route rather than the text lets paraphrases that resolve
+    to the same intent and parameters share one entry. The route of each
+    normalized query is remembered too, so repeated questions skip routing.
+    Concurrent misses for the same key are computed once: the first caller
+    computes, the others wait for its result.
+    """
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_SIZE, ttl: float = RESPONSE_CACHE_TTL,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._routes: "OrderedDict[str, Any]" = OrderedDict()  # normalized query -> RouteResult
+        self._inflight: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self._retained: Optional[str] = None  # Only this dataset version is stored, once set
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def route(self, query: str, route: Callable[[str], Any]):
+        """The route of `query`, from the memo of normalized queries if seen before"""
+        if not self.enabled:
+            return route(query)
+        normalized = normalize_query(query)
+        with self._lock:
+            result = self._routes.get(normalized)
+            if result is not None:
+                self._routes.move_to_end(normalized)
+                return result
+        result = route(query)
+        with self._lock:
+            self._routes[normalized] = result
+            while len(self._routes) > self.max_entries:
+                self._routes.popitem(last=False)
+        return result
+
+    def get_or_compute(self, key: Hashable, data_version: str,
+                       compute: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Return the cached response for `key`, computing it on a miss.
+
+        The caller gets its own copy of the top-level dict; errors are not cached.
+        """
+        if not self.enabled:
+            return compute()
+        key = (data_version, key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if self.clock() - entry[0] <= self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return dict(entry[1])
+                del self._entries[key]
+                self.expirations += 1
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return dict(future.result())
+        try:
+            response = compute()
+        except BaseException as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+            future.set_exception(e)
+            raise
+        with self._lock:
+            self._inflight.pop(key, None)
+            if self._retained is None or data_version == self._retained:
+                self._entries[key] = (self.clock(), response)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        future.set_result(response)
+        return dict(response)
+
+    def retain_version(self, data_version: str):
+        """Drop every answer computed from a different dataset version"""
+        with self._lock:
+            self._retained = data_version
+            for key in [k for k in self._entries if k[0] != data_version]:
+                del self._entries[key]
+                self.evictions += 1
+
+    def clear(self):
+        """Remove every answer and remembered route"""
+        with self._lock:
+            self._entries.clear()
+            self._routes.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters, hit rate and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "hit_rate": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "entries": len(self._entries),
+                "routes": len(self._routes),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+            }
@@ -0,0 +1,214 @@
+"""
+Pre-fork production server for the Titanic Chatbot API.
+
+The parent loads the app once (dataset, stats index, query bitmaps, the
+plotting stack and pre-rendered charts), binds the listening socket and
+forks the workers, which share all of it copy-on-write. The dataset columns
+are memory-mapped snapshot files, so their pages are shared through the
+page cache as well.
+
+Usage:
+    python server.py [--workers 4] [--host 0.0.0.0] [--port 8000] [--max-requests 10000]
+
+Signals to the parent: SIGTERM/SIGINT stop gracefully, SIGHUP replaces the
+workers one at a time without dropping capacity.
+"""
+import argparse
+import gc
+import os
+import random
+import signal
+import socket
+import sys
+import time
+from typing import Dict, Optional
+
+import uvicorn
+
+# Server configuration - overridable through the environment
+WORKERS = int(os.environ.get("TITANIC_WORKERS", str(os.cpu_count() or 1)))
+HOST = os.environ.get("TITANIC_HOST", "0.0.0.0")
+PORT = int(os.environ.get("TITANIC_PORT", "8000"))
+MAX_REQUESTS = int(os.environ.get("TITANIC_MAX_REQUESTS", "0"))  # Recycle a worker after this many (0 = never)
+MAX_REQUESTS_JITTER = int(os.environ.get("TITANIC_MAX_REQUESTS_JITTER", "0"))  # Spread recycling out
+GRACEFUL_TIMEOUT = float(os.environ.get("TITANIC_GRACEFUL_TIMEOUT", "30"))  # Seconds to finish in-flight requests
+
+# A worker that exits sooner than this after starting is restarted with a delay
+MIN_WORKER_LIFETIME = 1.0
+
+
+def load_app():
+    """Import the API and compute everything derived from the dataset"""
+    import main
+
+    main.agent.analyzer.warm(charts=True)
+    return main.app
+
+
+class PreforkServer:
+    """
+    Supervises a fixed number of forked uvicorn workers on one socket.
+
+    Workers that exit (after `max_requests`, or by crashing) are replaced.
+    With `preload` off every worker imports and loads the app itself, which
+    is how independent processes behave; it exists for comparison.
+    """
+
+    def __init__(self, host: str = HOST, port: int = PORT, workers: int = WORKERS,
+                 max_requests: int = MAX_REQUESTS, max_requests_jitter: int = MAX_REQUESTS_JITTER,
+                 graceful_timeout: float = GRACEFUL_TIMEOUT, preload: bool = True, log_level: str = "info"):
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.max_requests = max_requests
+        self.max_requests_jitter = max_requests_jitter
+        self.graceful_timeout = graceful_timeout
+        self.preload = preload
+        self.log_level = log_level
+        self.app = None
+        self.socket: Optional[socket.socket] = None
+        self.children: Dict[int, float] = {}  # pid -> start time
+        self.restarts = 0
+        self._stopping = False
+        self._recycle = False
+
+    def run(self) -> int:
+        """Load, fork and supervise until stopped; returns the exit code"""
+        # An explicit IPPROTO_TCP lets asyncio set TCP_NODELAY on accepted connections;
+        # without it every response waits for the client's delayed ACK (~40 ms)
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.socket.bind((self.host, self.port))
+        self.socket.listen(2048)
+        self.socket.set_inheritable(True)
+
+        if self.preload:
+            self.app = load_app()
+            # Keep the collector from writing to inherited objects, which would copy their pages
+            gc.collect()
+            gc.freeze()
+
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+        signal.signal(signal.SIGHUP, self._handle_recycle)
+
+        print(f"[{os.getpid()}] serving on http://{self.host}:{self.port} with {self.workers} workers", flush=True)
+        for _ in range(self.workers):
+            self._spawn()
+        while not self._stopping:
+            if self._recycle:
+                self._recycle = False
+                self._recycle_all()
+            self._reap(respawn=True)
+            time.sleep(0.1)
+        self._shutdown()
+        return 0
+
+    def _spawn(self) -> int:
+        pid = os.fork()
+        if pid:
+            self.children[pid] = time.monotonic()
+            return pid
+        # Worker: uvicorn installs its own graceful SIGTERM/SIGINT handling
+        for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+            signal.signal(signum, signal.SIG_DFL)
+        random.seed()
+        code = 0
+        try:
+            app = self.app if self.app is not None else load_app()
+            limit = None
+            if self.max_requests > 0:
+                limit = self.max_requests + random.randint(0, max(0, self.max_requests_jitter))
+            config = uvicorn.Config(app, limit_max_requests=limit, log_level=self.log_level,
+                                    timeout_graceful_shutdown=self.graceful_timeout)
+            uvicorn.Server(config).run(sockets=[self.socket])
+        except BaseException:
+            import traceback
+            traceback.print_exc()
+            code = 1
+        finally:
+            os._exit(code)
+
+    def _reap(self, respawn: bool):
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            started = self.children.pop(pid, None)
+            if started is None:
+                continue
+            if respawn and not self._stopping:
+                if time.monotonic() - started < MIN_WORKER_LIFETIME:
+                    # Crashing on startup: don't fork in a tight loop
+                    time.sleep(MIN_WORKER_LIFETIME)
+                self.restarts += 1
+                self._spawn()
+
+    def _recycle_all(self):
+        """Replace every worker, starting each replacement before stopping the old one"""
+        for pid in list(self.children):
+            self._spawn()
+            self._terminate(pid)
+
+    def _terminate(self, pid: int):
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+        deadline = time.monotonic() + self.graceful_timeout
+        while pid in self.children and time.monotonic() < deadline:
+            try:
+                done, _ = os.waitpid(pid, os.WNOHANG)
+            except ChildProcessError:
+                done = pid
+            if done:
+                self.children.pop(pid, None)
+                return
+            time.sleep(0.05)
+        if pid in self.children:
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+            self.children.pop(pid, None)
+
+    def _shutdown(self):
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                self.children.pop(pid, None)
+        deadline = time.monotonic() + self.graceful_timeout
+        while self.children and time.monotonic() < deadline:
+            self._reap(respawn=False)
+            time.sleep(0.05)
+        for pid in list(self.children):
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+            self.children.pop(pid, None)
+        self.socket.close()
+
+    def _handle_stop(self, signum, frame):
+        self._stopping = True
+
+    def _handle_recycle(self, signum, frame):
+        self._recycle = True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--max-requests", type=int, default=MAX_REQUESTS)
+    parser.add_argument("--max-requests-jitter", type=int, default=MAX_REQUESTS_JITTER)
+    parser.add_argument("--graceful-timeout", type=float, default=GRACEFUL_TIMEOUT)
+    parser.add_argument("--no-preload", dest="preload", action="store_false",
+                        help="Load the app in every worker instead of once in the parent")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+    sys.exit(PreforkServer(args.host, args.port, args.workers, args.max_requests, args.max_requests_jitter,
+                           args.graceful_timeout, args.preload, args.log_level).run())
@@ -0,0 +1,308 @@
+"""
+Columnar binary snapshots of the Titanic CSV with memory-mapped reads
+"""
+import hashlib
+import json
+import os
+import shutil
+from typing import Dict, List, Optional, Set
+
+import numpy as np
+import pandas as pd
+
+SNAPSHOT_FORMAT = 1
+CHUNK_ROWS = 500_000
+
+# Storage dtype of known columns; 'category' columns are stored as codes.
+# Integer columns are widened (up to float64 for missing values) when a
+# later chunk holds values the dtype cannot
+COLUMN_DTYPES = {
+    "PassengerId": "int64",
+    "Survived": "int8",
+    "Pclass": "category",
+    "Name": "category",
+    "Sex": "category",
+    "Age": "float64",
+    "SibSp": "int16",
+    "Parch": "int16",
+    "Ticket": "category",
+    "Fare": "float64",
+    "Cabin": "category",
+    "Embarked": "category",
+}
+
+# Columns parsed as strings in every chunk, so a chunk of all-numeric tickets
+# does not add integer categories next to the string ones
+TEXT_COLUMNS = {"Name", "Sex", "Ticket", "Cabin", "Embarked"}
+
+INT_DTYPES = ("int8", "int16", "int32", "int64")
+
+
+class _MixedColumns(Exception):
+    """Columns that were parsed as numbers in some chunks and text in others"""
+
+    def __init__(self, columns):
+        super().__init__(", ".join(sorted(columns)))
+        self.columns = set(columns)
+
+
+def default_snapshot_dir(csv_path: str) -> str:
+    """Snapshot directory that sits next to the CSV"""
+    return os.path.join(os.path.dirname(os.path.abspath(csv_path)), ".snapshot")
+
+
+def file_sha256(path: str) -> str:
+    """Hex SHA-256 of a file, read in blocks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_snapshot(csv_path: str, snapshot_dir: Optional[str] = None) -> pd.DataFrame:
+    """
+    Load `csv_path` through its snapshot, rebuilding the snapshot if the CSV changed.
+
+    Args:
+        csv_path: Source CSV file
+        snapshot_dir: Where snapshots are kept (defaults to `.snapshot` next to the CSV)
+
+    Returns:
+        pd.DataFrame: Columns backed by read-only memory maps of the snapshot
+    """
+    snapshot_dir = snapshot_dir or default_snapshot_dir(csv_path)
+    source_hash = _source_hash(csv_path, snapshot_dir)
+    path = os.path.join(snapshot_dir, source_hash[:16])
+    if not os.path.exists(os.path.join(path, "manifest.json")):
+        build_snapshot(csv_path, path, source_hash)
+        _remove_stale(snapshot_dir, keep=os.path.basename(path))
+    return read_snapshot(path)
+
+
+def build_snapshot(csv_path: str, path: str, source_hash: str = "") -> str:
+    """
+    Stream the CSV in chunks into a snapshot directory at `path`.
+
+    Column dtypes hold every chunk: a column is widened on disk when a later
+    chunk needs it, and a column of unknown type that turns out to mix
+    numbers and text is rebuilt as text. The snapshot is written to a
+    temporary directory and renamed into place, so concurrent builders never
+    expose a half-written snapshot.
+    """
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    text_columns = set(TEXT_COLUMNS)
+    while True:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        try:
+            columns, dtypes, categories, rows = _write_columns(csv_path, tmp_path, text_columns)
+            break
+        except _MixedColumns as e:
+            text_columns |= e.columns
+
+    manifest = {"format": SNAPSHOT_FORMAT, "source": os.path.abspath(csv_path),
+                "source_sha256": source_hash, "rows": rows, "columns": []}
+    for name in columns:
+        if name in categories:
+            values = _sort_categories(os.path.join(tmp_path, f"{name}.bin"), categories[name],
+                                      dtypes[name], rows)
+            np.save(os.path.join(tmp_path, f"{name}.categories.npy"), np.array(values), allow_pickle=False)
+            manifest["columns"].append({"name": name, "kind": "category", "dtype": dtypes[name]})
+        else:
+            manifest["columns"].append({"name": name, "kind": "numeric", "dtype": dtypes[name]})
+    with open(os.path.join(tmp_path, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    try:
+        os.rename(tmp_path, path)
+    except OSError:
+        # Another process finished the same snapshot first
+        shutil.rmtree(tmp_path, ignore_errors=True)
+    return path
+
+
+def _write_columns(csv_path: str, tmp_path: str, text_columns: Set[str]):
+    """
+    Write one `<column>.bin` file per column under `tmp_path`.
+
+    Returns:
+        (columns, storage dtype per column, category -> code mapping per
+        category column, rows)
+
+    Raises:
+        _MixedColumns: If a column not in `text_columns` changed between
+            numbers and text from one chunk to another
+    """
+    columns: List[str] = []
+    dtypes: Dict[str, str] = {}
+    categories: Dict[str, Dict[object, int]] = {}
+    is_text: Dict[str, bool] = {}
+    files = {}
+    rows = 0
+    try:
+        chunks = pd.read_csv(csv_path, chunksize=CHUNK_ROWS, dtype={name: str for name in text_columns})
+        for chunk in chunks:
+            if not columns:
+                columns = list(chunk.columns)
+                for name in columns:
+                    files[name] = open(os.path.join(tmp_path, f"{name}.bin"), "wb")
+                    dtypes[name] = _storage_dtype(name, chunk[name])
+                    if dtypes[name] == "category":
+                        categories[name] = {}
+                        is_text[name] = _is_text(chunk[name])
+                        dtypes[name] = _code_dtype(0)
+            for name in columns:
+                series = chunk[name]
+                if name in categories:
+                    if name not in text_columns and _is_text(series) != is_text[name]:
+                        raise _MixedColumns([name])
+                    codes = _encode_chunk(series, categories[name])
+                    needed = _code_dtype(len(categories[name]))
+                elif _is_text(series):
+                    if name in COLUMN_DTYPES:
+                        raise ValueError(f"Column {name!r} of {csv_path} has non-numeric values")
+                    raise _MixedColumns([name])
+                else:
+                    needed = _numeric_dtype(dtypes[name], series)
+                if needed != dtypes[name]:
+                    files[name].close()
+                    _widen(files[name].name, dtypes[name], needed, rows)
+                    files[name] = open(files[name].name, "ab")
+                    dtypes[name] = needed
+                values = codes.astype(needed) if name in categories else series.to_numpy(dtype=needed)
+                files[name].write(np.ascontiguousarray(values).tobytes())
+            rows += len(chunk)
+    finally:
+        for f in files.values():
+            f.close()
+    return columns, dtypes, categories, rows
+
+
+def read_snapshot(path: str) -> pd.DataFrame:
+    """Open a snapshot directory as a DataFrame over memory-mapped columns"""
+    with open(os.path.join(path, "manifest.json")) as f:
+        manifest = json.load(f)
+    rows = manifest["rows"]
+    data = {}
+    for column in manifest["columns"]:
+        name = column["name"]
+        values = _memmap(os.path.join(path, f"{name}.bin"), column["dtype"], rows)
+        if column["kind"] == "category":
+            categories = np.load(os.path.join(path, f"{name}.categories.npy"), allow_pickle=False)
+            dtype = pd.CategoricalDtype(pd.Index(categories))
+            values = pd.Categorical.from_codes(values, dtype=dtype, validate=False)
+        data[name] = values
+    return pd.DataFrame(data, copy=False)
+
+
+def _memmap(path: str, dtype: str, rows: int) -> np.ndarray:
+    if rows == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=(rows,))
+
+
+def _storage_dtype(name: str, series: pd.Series) -> str:
+    if name in COLUMN_DTYPES:
+        return COLUMN_DTYPES[name]
+    return "float64" if pd.api.types.is_numeric_dtype(series) else "category"
+
+
+def _is_text(series: pd.Series) -> bool:
+    return not pd.api.types.is_numeric_dtype(series)
+
+
+def _code_dtype(categories: int) -> str:
+    """
+    The code width pandas itself uses for this many categories, so the
+    memory-mapped codes back the Categorical as they are instead of being
+    copied into a narrower array on load.
+    """
+    for dtype in INT_DTYPES[:-1]:
+        if categories < np.iinfo(dtype).max:
+            return dtype
+    return INT_DTYPES[-1]
+
+
+def _numeric_dtype(current: str, series: pd.Series) -> str:
+    """`current`, or the narrowest wider dtype that holds every value of the chunk"""
+    if np.dtype(current).kind == "f" or pd.api.types.is_bool_dtype(series):
+        return current
+    if not pd.api.types.is_integer_dtype(series):
+        return "float64"  # missing or fractional values
+    low, high = series.min(), series.max()
+    for dtype in INT_DTYPES[INT_DTYPES.index(current):]:
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return dtype
+    return "float64"
+
+
+def _widen(path: str, dtype: str, wider: str, rows: int):
+    """Rewrite the `rows` values already written to a column file as `wider`"""
+    tmp_path = f"{path}.widen"
+    with open(tmp_path, "wb") as f:
+        if rows:
+            values = np.memmap(path, dtype=dtype, mode="r", shape=(rows,))
+            for start in range(0, rows, CHUNK_ROWS):
+                f.write(values[start:start + CHUNK_ROWS].astype(wider).tobytes())
+            del values
+    os.replace(tmp_path, path)
+
+
+def _encode_chunk(series: pd.Series, mapping: Dict[object, int]) -> np.ndarray:
+    """Map a chunk onto int64 category codes shared by all chunks (-1 for missing)"""
+    chunk_codes, chunk_categories = pd.factorize(series, use_na_sentinel=True)
+    lookup = np.empty(len(chunk_categories) + 1, dtype=np.int64)
+    lookup[-1] = -1
+    for i, value in enumerate(chunk_categories):
+        value = value.item() if hasattr(value, "item") else value
+        lookup[i] = mapping.setdefault(value, len(mapping))
+    return lookup[chunk_codes]
+
+
+def _sort_categories(path: str, mapping: Dict[object, int], dtype: str, rows: int) -> List[object]:
+    """Renumber codes on disk so categories are in sorted order; return the categories"""
+    values = list(mapping)
+    order = sorted(range(len(values)), key=lambda i: values[i])
+    if order == list(range(len(values))) or rows == 0:
+        return values
+    remap = np.empty(len(values) + 1, dtype=dtype)
+    remap[-1] = -1
+    remap[np.array(order, dtype=np.int64)] = np.arange(len(values), dtype=dtype)
+    codes = np.memmap(path, dtype=dtype, mode="r+", shape=(rows,))
+    for start in range(0, rows, CHUNK_ROWS):
+        block = codes[start:start + CHUNK_ROWS]
+        block[:] = remap[block]
+    codes.flush()
+    del codes
+    return [values[i] for i in order]
+
+
+def _source_hash(csv_path: str, snapshot_dir: str) -> str:
+    """SHA-256 of the CSV, recomputed only when its size or mtime changes"""
+    stat = os.stat(csv_path)
+    state_path = os.path.join(snapshot_dir, "source.json")
+    try:
+        with open(state_path) as f:
+            state = json.load(f)
+        if state["size"] == stat.st_size and state["mtime_ns"] == stat.st_mtime_ns:
+            return state["sha256"]
+    except (OSError, ValueError, KeyError):
+        pass
+
+    sha = file_sha256(csv_path)
+    os.makedirs(snapshot_dir, exist_ok=True)
+    tmp_path = f"{state_path}.tmp-{os.getpid()}"
+    with open(tmp_path, "w") as f:
+        json.dump({"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": sha}, f)
+    os.replace(tmp_path, state_path)
+    return sha
+
+
+def _remove_stale(snapshot_dir: str, keep: str):
+    """Delete snapshots of older CSV versions (open memory maps stay valid)"""
+    for name in os.listdir(snapshot_dir):
+        full = os.path.join(snapshot_dir, name)
+        if name != keep and os.path.isdir(full) and ".tmp-" not in name:
+            shutil.rmtree(full, ignore_errors=True)
@@ -0,0 +1,164 @@
+"""
+Precomputed aggregate index over the Titanic dataset
+"""
+import copy
+import hashlib
+from typing import Any, Dict, List
+
+import pandas as pd
+
+QUANTILES = (0.25, 0.5, 0.75)
+
+# Columns each section of the index is computed from
+SECTION_COLUMNS = {
+    "overall": ("Survived",),
+    "sex": ("Sex", "Survived"),
+    "pclass": ("Pclass", "Survived"),
+    "embarked": ("Embarked", "Survived"),
+    "sex_pclass": ("Sex", "Pclass", "Survived"),
+    "sex_embarked": ("Sex", "Embarked", "Survived"),
+    "pclass_embarked": ("Pclass", "Embarked", "Survived"),
+    "age": ("Age",),
+    "fare": ("Fare",),
+}
+
+
+def _py(value: Any) -> Any:
+    """Convert numpy scalars to native Python values"""
+    return value.item() if hasattr(value, "item") else value
+
+
+def _numeric_summary(series: pd.Series) -> Dict[str, Any]:
+    """Count, moments and quantiles of a numeric column (nulls skipped)"""
+    values = series.dropna()
+    quantiles = values.quantile(list(QUANTILES)) if len(values) else pd.Series(dtype=float)
+    return {
+        "count": int(len(values)),
+        "missing": int(len(series) - len(values)),
+        "mean": _py(values.mean()),
+        "std": _py(values.std()),
+        "min": _py(values.min()),
+        "max": _py(values.max()),
+        "median": _py(values.median()),
+        "quantiles": {float(q): _py(v) for q, v in quantiles.items()},
+    }
+
+
+def _group_table(df: pd.DataFrame, keys: List[str]) -> Dict[Any, Dict[str, Any]]:
+    """Passenger count, survivor count and survival rate per group"""
+    grouped = df.groupby(keys, observed=True)["Survived"].agg(["count", "sum", "mean"])
+    table = {}
+    for key, row in grouped.iterrows():
+        key = tuple(_py(k) for k in key) if isinstance(key, tuple) else _py(key)
+        table[key] = {
+            "count": int(row["count"]),
+            "survived": int(row["sum"]),
+            "rate": float(row["mean"]),
+        }
+    return table
+
+
+def _value_counts(series: pd.Series) -> Dict[Any, int]:
+    """Value counts ordered from most to least frequent"""
+    return {_py(k): int(v) for k, v in series.value_counts().items()}
+
+
+class TitanicStatsIndex:
+    """
+    Counts, moments, quantiles and group-by tables computed once per dataset.
+
+    Sections are rebuilt independently: `refresh` only recomputes the sections
+    whose source columns changed since the last build, and `updated` does the
+    same on a copy, for a reload that must not disturb the index being served.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self._fingerprints: Dict[str, str] = {}
+        self.total = 0
+        self.survived = 0
+        self.survival_rate = float("nan")
+        self.sex_counts: Dict[str, int] = {}
+        self.pclass_counts: Dict[int, int] = {}
+        self.embarked_counts: Dict[str, int] = {}
+        self.embarked_total = 0
+        self.by_sex: Dict[Any, Dict[str, Any]] = {}
+        self.by_pclass: Dict[Any, Dict[str, Any]] = {}
+        self.by_embarked: Dict[Any, Dict[str, Any]] = {}
+        self.by_sex_pclass: Dict[Any, Dict[str, Any]] = {}
+        self.by_sex_embarked: Dict[Any, Dict[str, Any]] = {}
+        self.by_pclass_embarked: Dict[Any, Dict[str, Any]] = {}
+        self.age: Dict[str, Any] = {}
+        self.fare: Dict[str, Any] = {}
+        self.refresh(df)
+
+    def refresh(self, df: pd.DataFrame) -> List[str]:
+        """
+        Bring the index up to date with `df`.
+
+        Returns:
+            List[str]: Names of the sections that were rebuilt
+        """
+        fingerprints = self._column_fingerprints(df)
+        changed = {col for col, fp in fingerprints.items() if self._fingerprints.get(col) != fp}
+        changed |= set(self._fingerprints) - set(fingerprints)
+        if len(df) != self.total:
+            changed |= set(fingerprints)
+
+        rebuilt = [name for name, cols in SECTION_COLUMNS.items() if changed.intersection(cols)]
+        for name in rebuilt:
+            getattr(self, f"_build_{name}")(df)
+        self.total = len(df)
+        self._fingerprints = fingerprints
+        return rebuilt
+
+    def updated(self, df: pd.DataFrame) -> "TitanicStatsIndex":
+        """
+        A copy brought up to date with `df`, leaving this index unchanged.
+
+        Sections are replaced, never mutated, so the copy can share the ones
+        that did not change.
+        """
+        index = copy.copy(self)
+        index.refresh(df)
+        return index
+
+    @staticmethod
+    def _column_fingerprints(df: pd.DataFrame) -> Dict[str, str]:
+        """Digest of each source column's row hashes, in row order (a sum would miss swapped values)"""
+        columns = {col for cols in SECTION_COLUMNS.values() for col in cols}
+        return {
+            col: hashlib.sha256(pd.util.hash_pandas_object(df[col], index=False).to_numpy().tobytes()).hexdigest()
+            for col in columns if col in df.columns
+        }
+
+    def _build_overall(self, df: pd.DataFrame):
+        self.survived = int(df["Survived"].sum())
+        self.survival_rate = _py(df["Survived"].mean())
+
+    def _build_sex(self, df: pd.DataFrame):
+        self.sex_counts = _value_counts(df["Sex"])
+        self.by_sex = _group_table(df, ["Sex"])
+
+    def _build_pclass(self, df: pd.DataFrame):
+        self.pclass_counts = _value_counts(df["Pclass"])
+        self.by_pclass = _group_table(df, ["Pclass"])
+
+    def _build_embarked(self, df: pd.DataFrame):
+        self.embarked_counts = _value_counts(df["Embarked"])
+        self.embarked_total = int(df["Embarked"].notna().sum())
+        self.by_embarked = _group_table(df, ["Embarked"])
+
+    def _build_sex_pclass(self, df: pd.DataFrame):
+        self.by_sex_pclass = _group_table(df, ["Sex", "Pclass"])
+
+    def _build_sex_embarked(self, df: pd.DataFrame):
+        self.by_sex_embarked = _group_table(df, ["Sex", "Embarked"])
+
+    def _build_pclass_embarked(self, df: pd.DataFrame):
+        self.by_pclass_embarked = _group_table(df, ["Pclass", "Embarked"])
+
+    def _build_age(self, df: pd.DataFrame):
+        self.age = _numeric_summary(df["Age"])
+
+    def _build_fare(self, df: pd.DataFrame):
+        self.fare = _numeric_summary(df["Fare"])
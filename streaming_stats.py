@@ -0,0 +1,424 @@
+"""
+Out-of-core aggregates over the Titanic dataset
+
+The CSV is streamed in chunks and folded into mergeable summaries, so memory
+stays bounded by the chunk size and the sketch sizes rather than the file:
+counts and survivor sums per group, Welford moments, KLL quantile sketches
+and auto-ranging histograms.
+"""
+import hashlib
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from stats_index import QUANTILES
+
+# Group tables kept per chunk, by attribute name
+GROUP_SECTIONS = {
+    "by_sex": ["Sex"],
+    "by_pclass": ["Pclass"],
+    "by_embarked": ["Embarked"],
+    "by_sex_pclass": ["Sex", "Pclass"],
+    "by_sex_embarked": ["Sex", "Embarked"],
+    "by_pclass_embarked": ["Pclass", "Embarked"],
+    "by_sex_pclass_embarked": ["Sex", "Pclass", "Embarked"],
+}
+
+# Numeric columns with full summaries (moments, quantiles, histogram)
+SUMMARY_COLUMNS = ("Age", "Fare")
+
+# Categorical columns whose value counts are reported (cardinality, top value)
+COUNTED_COLUMNS = ("Sex", "Pclass", "Embarked")
+
+
+def _py(value: Any) -> Any:
+    """Convert numpy scalars to native Python values"""
+    return value.item() if hasattr(value, "item") else value
+
+
+class RunningMoments:
+    """Count, mean, variance (Welford / Chan merge), min and max of a stream"""
+
+    def __init__(self):
+        self.count = 0
+        self.missing = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values: np.ndarray):
+        """Fold in a chunk of values (NaNs are counted as missing)"""
+        values = np.asarray(values, dtype=np.float64)
+        known = values[~np.isnan(values)]
+        self.missing += len(values) - len(known)
+        if len(known):
+            chunk = RunningMoments()
+            chunk.count = len(known)
+            chunk.mean = float(known.mean())
+            chunk.m2 = float(((known - chunk.mean) ** 2).sum())
+            chunk.min, chunk.max = float(known.min()), float(known.max())
+            self._combine(chunk)
+
+    def merge(self, other: "RunningMoments"):
+        """Combine with moments computed over another part of the data"""
+        self.missing += other.missing
+        self._combine(other)
+
+    def _combine(self, other: "RunningMoments"):
+        if not other.count:
+            return
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / total
+        self.m2 += other.m2 + delta * delta * self.count * other.count / total
+        self.count = total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def std(self) -> float:
+        """Sample standard deviation (ddof=1, like pandas)"""
+        return float(np.sqrt(self.m2 / (self.count - 1))) if self.count > 1 else float("nan")
+
+
+class KLLSketch:
+    """
+    KLL quantile sketch.
+
+    Keeps a stack of compactors; level h holds items of weight 2**h. When a
+    level overflows it is sorted and every other item (random offset) moves
+    up a level. Retains O(k) items with rank error around 1/k and merges by
+    concatenating levels. Until the first compaction it is exact.
+    """
+
+    def __init__(self, k: int = 1000, seed: int = 0):
+        self.k = k
+        self.n = 0
+        self.levels: List[np.ndarray] = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, values: np.ndarray):
+        """Add a chunk of values (NaNs are ignored)"""
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if len(values):
+            self.n += len(values)
+            self.levels[0] = np.concatenate((self.levels[0], values))
+            self._compress()
+
+    def merge(self, other: "KLLSketch"):
+        """Absorb a sketch of another part of the data"""
+        for level, items in enumerate(other.levels):
+            if level == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[level] = np.concatenate((self.levels[level], items))
+        self.n += other.n
+        self._compress()
+
+    def quantile(self, q: float) -> float:
+        """Approximate q-quantile (exact, with linear interpolation, before any compaction)"""
+        if not self.n:
+            return float("nan")
+        if len(self.levels) == 1:
+            return float(np.quantile(self.levels[0], q))
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level_items), 2 ** level)
+                                  for level, level_items in enumerate(self.levels)])
+        order = np.argsort(items, kind="stable")
+        cumulative = np.cumsum(weights[order])
+        position = np.searchsorted(cumulative, q * cumulative[-1], side="left")
+        return float(items[order][min(position, len(items) - 1)])
+
+    def retained(self) -> int:
+        """Number of items held"""
+        return sum(len(items) for items in self.levels)
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(8, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compress(self):
+        while True:
+            for level in range(len(self.levels)):
+                if len(self.levels[level]) > self._capacity(level):
+                    self._compact(level)
+                    break
+            else:
+                return
+
+    def _compact(self, level: int):
+        if level + 1 == len(self.levels):
+            self.levels.append(np.empty(0))
+        items = np.sort(self.levels[level])
+        odd = len(items) % 2
+        promoted = items[odd + int(self._rng.integers(2))::2]
+        self.levels[level] = items[:odd]
+        self.levels[level + 1] = np.concatenate((self.levels[level + 1], promoted))
+
+
+class StreamingHistogram:
+    """
+    Fixed number of fine, equal-width bins whose range doubles as needed.
+
+    Any coarser histogram over [min, max] is re-binned from the fine bins,
+    so counts near coarse bin edges are approximate to one fine bin width.
+    """
+
+    def __init__(self, bins: int = 4096):
+        self.bins = bins
+        self.counts: Optional[np.ndarray] = None
+        self.origin = 0.0
+        self.width = 1.0
+
+    def update(self, values: np.ndarray, weights: Optional[np.ndarray] = None):
+        """Add a chunk of values (NaNs are ignored)"""
+        values = np.asarray(values, dtype=np.float64)
+        known = ~np.isnan(values)
+        values = values[known]
+        if not len(values):
+            return
+        if weights is not None:
+            weights = np.asarray(weights)[known]
+        low, high = float(values.min()), float(values.max())
+        if self.counts is None:
+            self.counts = np.zeros(self.bins, dtype=np.int64)
+            self.origin = low
+            self.width = max((high - low) / self.bins * (1 + 1e-9), 1e-9)
+        half = self.bins // 2
+        while high >= self.origin + self.bins * self.width:
+            self.counts = np.concatenate((self.counts.reshape(-1, 2).sum(axis=1), np.zeros(half, dtype=np.int64)))
+            self.width *= 2
+        while low < self.origin:
+            self.counts = np.concatenate((np.zeros(half, dtype=np.int64), self.counts.reshape(-1, 2).sum(axis=1)))
+            self.origin -= self.bins * self.width
+            self.width *= 2
+        index = np.clip(((values - self.origin) / self.width).astype(np.int64), 0, self.bins - 1)
+        self.counts += np.bincount(index, weights=weights, minlength=self.bins).astype(np.int64)
+
+    def merge(self, other: "StreamingHistogram"):
+        """Absorb another histogram (its fine bins are re-added at their centres)"""
+        if other.counts is None:
+            return
+        nonzero = np.flatnonzero(other.counts)
+        self.update(other.origin + (nonzero + 0.5) * other.width, other.counts[nonzero])
+
+    def histogram(self, bins: int, low: float, high: float) -> Tuple[List[float], List[int]]:
+        """Edges and counts of `bins` equal bins over [low, high], like np.histogram"""
+        if self.counts is None:
+            counts, edges = np.histogram(np.empty(0), bins=bins)
+            return edges.tolist(), counts.tolist()
+        nonzero = np.flatnonzero(self.counts)
+        centres = np.clip(self.origin + (nonzero + 0.5) * self.width, low, high)
+        counts, edges = np.histogram(centres, bins=bins, range=(low, high), weights=self.counts[nonzero])
+        return edges.tolist(), counts.astype(np.int64).tolist()
+
+
+class _HashingReader:
+    """File wrapper that hashes the bytes as pandas reads them"""
+
+    def __init__(self, f):
+        self._f = f
+        self.digest = hashlib.sha256()
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._f.read(size)
+        self.digest.update(data)
+        return data
+
+    def __iter__(self):
+        return iter(self._f)
+
+
+class StreamingStatsIndex:
+    """
+    The TitanicStatsIndex attributes, accumulated chunk by chunk.
+
+    Built with `from_csv` (one pass over the file, which also yields the
+    dataset version hash); partial indexes over different parts of a dataset
+    combine with `merge`.
+    """
+
+    def __init__(self, sketch_k: int = 1000):
+        self.sketch_k = sketch_k
+        self.version: Optional[str] = None
+        self.total = 0
+        self.survived = 0
+        self.columns: List[str] = []
+        self.dtypes: Dict[str, str] = {}
+        self.missing_values: Dict[str, int] = {}
+        self.moments: Dict[str, RunningMoments] = {}
+        self.sketches = {col: KLLSketch(sketch_k) for col in SUMMARY_COLUMNS}
+        self.histograms = {col: StreamingHistogram() for col in SUMMARY_COLUMNS}
+        self._groups: Dict[str, Dict[Any, List[int]]] = {name: {} for name in GROUP_SECTIONS}
+        self._value_counts: Dict[str, Dict[Any, int]] = {col: {} for col in COUNTED_COLUMNS}
+
+    @classmethod
+    def from_csv(cls, path: str, chunk_rows: int = 20_000, sketch_k: int = 1000) -> "StreamingStatsIndex":
+        """
+        Stream a CSV into a new index.
+
+        Args:
+            path: Dataset CSV
+            chunk_rows: Rows parsed per chunk (bounds peak memory)
+            sketch_k: KLL sketch size (larger is more accurate)
+        """
+        index = cls(sketch_k)
+        with open(path, "rb") as f:
+            reader = _HashingReader(f)
+            for chunk in pd.read_csv(reader, chunksize=chunk_rows):
+                index.update(chunk)
+            # Drain anything the parser did not request
+            while reader.read(1 << 20):
+                pass
+        index.version = reader.digest.hexdigest()[:16]
+        return index
+
+    def update(self, chunk: pd.DataFrame):
+        """Fold one chunk of rows into the aggregates"""
+        if not self.columns:
+            self.columns = list(chunk.columns)
+        self.total += len(chunk)
+        for col in chunk.columns:
+            series = chunk[col]
+            self.dtypes[col] = _merge_dtype(self.dtypes.get(col), str(series.dtype))
+            self.missing_values[col] = self.missing_values.get(col, 0) + int(series.isna().sum())
+            if pd.api.types.is_numeric_dtype(series):
+                self.moments.setdefault(col, RunningMoments()).update(series.to_numpy(dtype=np.float64))
+        for col in SUMMARY_COLUMNS:
+            if col in chunk.columns:
+                values = chunk[col].to_numpy(dtype=np.float64)
+                self.sketches[col].update(values)
+                self.histograms[col].update(values)
+        for col in COUNTED_COLUMNS:
+            if col in chunk.columns:
+                _add_counts(self._value_counts[col], chunk[col].value_counts())
+        if "Survived" in chunk.columns:
+            self.survived += int(chunk["Survived"].sum())
+            for name, keys in GROUP_SECTIONS.items():
+                if set(keys).issubset(chunk.columns):
+                    grouped = chunk.groupby(keys, observed=True)["Survived"].agg(["count", "sum"])
+                    table = self._groups[name]
+                    for key, row in grouped.iterrows():
+                        key = tuple(_py(k) for k in key) if isinstance(key, tuple) else _py(key)
+                        entry = table.setdefault(key, [0, 0])
+                        entry[0] += int(row["count"])
+                        entry[1] += int(row["sum"])
+
+    def merge(self, other: "StreamingStatsIndex"):
+        """Combine with an index over another part of the same dataset"""
+        self.columns = self.columns or list(other.columns)
+        self.total += other.total
+        self.survived += other.survived
+        for col, dtype in other.dtypes.items():
+            self.dtypes[col] = _merge_dtype(self.dtypes.get(col), dtype)
+        for col, missing in other.missing_values.items():
+            self.missing_values[col] = self.missing_values.get(col, 0) + missing
+        for col, moments in other.moments.items():
+            self.moments.setdefault(col, RunningMoments()).merge(moments)
+        for col in SUMMARY_COLUMNS:
+            self.sketches[col].merge(other.sketches[col])
+            self.histograms[col].merge(other.histograms[col])
+        for col, counts in other._value_counts.items():
+            _add_counts(self._value_counts[col], counts)
+        for name, table in other._groups.items():
+            for key, (count, survived) in table.items():
+                entry = self._groups[name].setdefault(key, [0, 0])
+                entry[0] += count
+                entry[1] += survived
+
+    # TitanicStatsIndex interface
+    @property
+    def survival_rate(self) -> float:
+        count = self.moments["Survived"].count if "Survived" in self.moments else 0
+        return self.survived / count if count else float("nan")
+
+    @property
+    def sex_counts(self) -> Dict[Any, int]:
+        return _by_frequency(self._value_counts["Sex"])
+
+    @property
+    def pclass_counts(self) -> Dict[Any, int]:
+        return _by_frequency(self._value_counts["Pclass"])
+
+    @property
+    def embarked_counts(self) -> Dict[Any, int]:
+        return _by_frequency(self._value_counts["Embarked"])
+
+    @property
+    def embarked_total(self) -> int:
+        return sum(self._value_counts["Embarked"].values())
+
+    def __getattr__(self, name: str):
+        if name in GROUP_SECTIONS:
+            return self._group_table(name)
+        if name in ("age", "fare"):
+            return self._numeric_summary(name.capitalize())
+        raise AttributeError(name)
+
+    def _group_table(self, name: str) -> Dict[Any, Dict[str, Any]]:
+        return {
+            key: {"count": count, "survived": survived, "rate": survived / count}
+            for key, (count, survived) in sorted(self._groups[name].items()) if count
+        }
+
+    def _numeric_summary(self, column: str) -> Dict[str, Any]:
+        moments = self.moments.get(column, RunningMoments())
+        sketch = self.sketches[column]
+        known = moments.count > 0
+        return {
+            "count": moments.count,
+            "missing": moments.missing,
+            "mean": moments.mean if known else float("nan"),
+            "std": moments.std,
+            "min": moments.min if known else float("nan"),
+            "max": moments.max if known else float("nan"),
+            "median": sketch.quantile(0.5),
+            "quantiles": {float(q): sketch.quantile(q) for q in QUANTILES},
+        }
+
+    def dataset_info(self) -> Dict[str, Any]:
+        """The /info payload (column stats limited to what the aggregates know)"""
+        column_stats = {}
+        for col in self.columns:
+            stats = {"dtype": self.dtypes[col], "null_count": self.missing_values[col]}
+            if col in self._value_counts:
+                counts = _by_frequency(self._value_counts[col])
+                stats["cardinality"] = len(counts)
+            moments = self.moments.get(col)
+            if moments is not None and moments.count:
+                stats.update(min=_py(moments.min), max=_py(moments.max), mean=moments.mean)
+            elif col in self._value_counts and counts:
+                top = next(iter(counts))
+                stats.update(top=top, top_count=counts[top])
+            column_stats[col] = stats
+        return {
+            "shape": [self.total, len(self.columns)],
+            "columns": list(self.columns),
+            "dtypes": dict(self.dtypes),
+            "missing_values": dict(self.missing_values),
+            "column_stats": column_stats,
+        }
+
+
+def _merge_dtype(current: Optional[str], new: str) -> str:
+    if current is None or current == new:
+        return new
+    try:
+        a, b = np.dtype(current), np.dtype(new)
+    except TypeError:
+        return "object"
+    if a.kind in "biuf" and b.kind in "biuf":
+        return str(np.result_type(a, b))
+    return "object"
+
+
+def _add_counts(target: Dict[Any, int], counts):
+    for value, count in counts.items():
+        value = _py(value)
+        target[value] = target.get(value, 0) + int(count)
+
+
+def _by_frequency(counts: Dict[Any, int]) -> Dict[Any, int]:
+    return dict(sorted(counts.items(), key=lambda item: -item[1]))
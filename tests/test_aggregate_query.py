@@ -0,0 +1,66 @@
+import pandas as pd
+import pytest
+
+from data_loader import DATA_PATH
+from query_engine import AggregateQueryEngine, QueryEngine, parse_query
+from streaming_stats import StreamingStatsIndex
+
+
+@pytest.fixture(scope="module")
+def engines():
+    df = pd.read_csv(DATA_PATH)
+    stats = StreamingStatsIndex()
+    for start in range(0, len(df), 200):
+        stats.update(df.iloc[start:start + 200])
+    return QueryEngine(df), AggregateQueryEngine(stats)
+
+
+@pytest.mark.parametrize("query", [
+    "survival rate of women in class 3 by port",
+    "How many passengers were in first class?",
+    "survival by port",
+    "how many men embarked from Cherbourg by class",
+    "survival rate of passengers from Queenstown by gender",
+])
+def test_group_tables_answer_like_the_rows(engines, query):
+    rows, aggregates = engines
+    spec = parse_query(query)
+    assert AggregateQueryEngine.answerable(spec)
+    assert aggregates.execute(spec) == rows.execute(spec)
+
+
+@pytest.mark.parametrize("query", [
+    "average fare by class",
+    "How many passengers were older than 60?",
+    "survival rate of children in class 2",
+])
+def test_age_and_fare_are_not_answerable(engines, query):
+    spec = parse_query(query)
+    assert not AggregateQueryEngine.answerable(spec)
+    with pytest.raises(ValueError):
+        engines[1].execute(spec)
+
+
+@pytest.fixture(scope="module")
+def out_of_core_agent():
+    from agent import TitanicAgent, TitanicAnalyzer
+    agent = TitanicAgent()
+    agent.analyzer = TitanicAnalyzer(out_of_core=True, activate=False)
+    return agent
+
+
+def test_out_of_core_answers_filtered_survival(out_of_core_agent):
+    assert out_of_core_agent.route("survival rate of women in class 3 by port").intent == "query"
+
+
+def test_out_of_core_says_age_filters_are_unavailable(out_of_core_agent):
+    response = out_of_core_agent.process_query("How many passengers were older than 60?", inline_images=False)
+    assert "not kept in out-of-core mode" in response["answer"]
+
+
+def test_routing_follows_the_request_analyzer(out_of_core_agent):
+    from agent import TitanicAnalyzer
+    query = "How many passengers were older than 60?"
+    in_memory = TitanicAnalyzer(activate=False)
+    assert out_of_core_agent.route(query).intent == "query_unavailable"
+    assert out_of_core_agent.route(query, in_memory).intent == "query"
@@ -0,0 +1,57 @@
+import re
+
+import pytest
+
+from benchmarks.intent_accuracy import LABELLED_QUERIES
+from intent_router import IntentRouter, default_router, tokenize
+
+
+@pytest.fixture(scope="module")
+def router():
+    return default_router()
+
+
+@pytest.mark.parametrize("query,expected", LABELLED_QUERIES)
+def test_labelled_queries(router, query, expected):
+    assert router.route(query).intent == expected
+
+
+@pytest.mark.parametrize("query", ["Where are you from?", "Tell me something from the data"])
+def test_from_alone_is_not_embarkation(router, query):
+    assert router.route(query).intent is None
+
+
+@pytest.mark.parametrize("query", ["How many came from Southampton?", "Which port did they board from?"])
+def test_from_supports_a_port(router, query):
+    result = router.route(query)
+    assert result.intent == "embarkation"
+    assert result.score == router.route(query.replace("from", "")).score + 0.5
+
+
+def test_slots(router):
+    result = router.route("How many survived? Show a bar chart by class")
+    assert (result.intent, result.chart, result.wants_stats, result.group_by) == ("survival", "bar", True, "Pclass")
+    # Grouping by the intent's own column is not a breakdown
+    assert router.route("pie chart of passengers by sex").group_by is None
+
+
+def test_specific_chart_beats_generic(router):
+    assert router.route("show a histogram of ages").chart == "histogram"
+
+
+def test_bigram_keyword(router):
+    assert router.route("how many women").wants_stats
+    assert not router.route("many women, how").wants_stats
+
+
+def test_registering_after_routing():
+    router = IntentRouter()
+    router.register_intent("lifeboat", {"lifeboat": 1})
+    assert router.route("lifeboat count").intent == "lifeboat"
+    router.register_intent("crew", {"crew": 2, "lifeboat crew": 1})
+    assert router.route("lifeboat crew").intent == "crew"
+
+
+@pytest.mark.parametrize("text", ["What's the SURVIVAL-rate (3rd class)?", "Café menü über 10", "", "  \t"])
+def test_tokenize_matches_regex(text):
+    assert tokenize(text) == re.findall(r"[a-z0-9]+", text.lower())
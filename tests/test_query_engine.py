@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from query_engine import Filter, QueryEngine, parse_query, popcount
+
+
+@pytest.mark.parametrize("query, filters", [
+    ("How many passengers were in first class?", (Filter("Pclass", "in", (1,)),)),
+    ("How many passengers were older than 60?", (Filter("Age", ">", 60.0),)),
+    ("How many passengers paid more than $100?", (Filter("Fare", ">", 100.0),)),
+])
+def test_lone_count_filter_outside_fixed_handlers_is_ad_hoc(query, filters):
+    spec = parse_query(query)
+    assert spec.filters == filters
+    assert spec.metric == "count"
+    assert spec.ad_hoc
+
+
+@pytest.mark.parametrize("query", [
+    "What percentage of passengers were male?",
+    "How many passengers embarked from Southampton?",
+])
+def test_lone_count_filter_on_sex_or_port_goes_to_fixed_handlers(query):
+    assert not parse_query(query).ad_hoc
+
+
+@pytest.mark.parametrize("query, metric, group_by", [
+    ("average fare by class", "fare", "Pclass"),
+    ("survival by port", "survival", "Embarked"),
+    ("average age per gender", "age", "Sex"),
+])
+def test_group_by_without_filters_is_ad_hoc(query, metric, group_by):
+    spec = parse_query(query)
+    assert (spec.filters, spec.metric, spec.group_by) == ((), metric, group_by)
+    assert spec.ad_hoc
+
+
+@pytest.mark.parametrize("query", ["Show me survival rates by class", "survival rate by gender"])
+def test_groupings_the_survival_handler_answers_are_not_ad_hoc(query):
+    assert not parse_query(query).ad_hoc
+
+
+def test_filters_on_one_column_are_still_ad_hoc():
+    spec = parse_query("How many passengers were in their 20s?")
+    assert spec.filters == (Filter("Age", ">=", 20.0), Filter("Age", "<", 30.0))
+    assert spec.ad_hoc
+
+
+def test_combined_filters():
+    spec = parse_query("survival rate of women in class 3 by port")
+    assert spec.filters == (Filter("Pclass", "in", (3,)), Filter("Sex", "in", ("female",)))
+    assert (spec.metric, spec.group_by) == ("survival", "Embarked")
+
+
+def test_survival_words_become_a_filter_for_fare_questions():
+    spec = parse_query("average fare of survivors over 60")
+    assert spec.metric == "fare"
+    assert Filter("Survived", "in", (1,)) in spec.filters
+    assert Filter("Age", ">", 60.0) in spec.filters
+
+
+def test_popcount_matches_unpacked_bits():
+    bits = np.random.default_rng(0).random(1001) < 0.4
+    assert popcount(np.packbits(bits)) == int(bits.sum())
+
+
+@pytest.fixture
+def engine():
+    df = pd.DataFrame({
+        "Sex": ["male", "female", "female", "male", "female"],
+        "Pclass": [1, 1, 3, 3, 2],
+        "Embarked": ["S", "C", "S", None, "Q"],
+        "Survived": [0, 1, 1, 0, 1],
+        "Age": [70.0, 30.0, np.nan, 8.0, 61.5],
+        "Fare": [150.0, 80.0, 7.25, 20.0, 10.0],
+    })
+    return QueryEngine(df)
+
+
+def test_engine_counts_a_range_filter(engine):
+    result = engine.execute(parse_query("How many passengers were older than 60?"))
+    assert result["matched"] == 2
+
+
+def test_engine_groups_without_filters(engine):
+    result = engine.execute(parse_query("average fare by class"))
+    groups = {group["group"]: group for group in result["groups"]}
+    assert groups[1]["matched"] == 2
+    assert groups[1]["value"]["mean"] == pytest.approx(115.0)
+    assert set(groups) == {1, 2, 3}
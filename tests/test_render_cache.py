@@ -0,0 +1,55 @@
+import threading
+
+from render_cache import RenderCache
+
+
+def test_concurrent_misses_render_once():
+    cache = RenderCache(cache_dir=None)
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def render():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return b"image"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_render("k", "v1", render)))
+               for _ in range(8)]
+    threads[0].start()
+    started.wait(5)
+    for thread in threads[1:]:
+        thread.start()
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert calls == [1]
+    assert results == [b"image"] * 8
+    assert cache._rendering == {}
+
+
+def test_caller_leaves_a_newer_key_lock_in_place():
+    cache = RenderCache(cache_dir=None)
+    newer = threading.Lock()
+
+    def render():
+        # A later caller registered its own lock after ours was released
+        cache._rendering["k"] = newer
+        return b"image"
+
+    cache.get_or_render("k", "v1", render)
+    assert cache._rendering["k"] is newer
+
+
+def test_retain_version_only_removes_version_directories(tmp_path):
+    cache = RenderCache(cache_dir=str(tmp_path))
+    cache.put("k", "0123456789abcdef", b"old")
+    cache.put("k", "fedcba9876543210", b"new")
+    (tmp_path / "projects").mkdir()
+    (tmp_path / "projects" / "notes.txt").write_text("keep me")
+    (tmp_path / "report.txt").write_text("keep me too")
+
+    cache.retain_version("fedcba9876543210")
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["fedcba9876543210", "projects", "report.txt"]
+    assert (tmp_path / "projects" / "notes.txt").read_text() == "keep me"
@@ -0,0 +1,43 @@
+import pytest
+
+from render_options import (
+    CHART_FIGSIZES, MAX_PIXELS, PROFILES, RenderOptions, RenderTooLarge, resolve_options,
+)
+
+
+def test_every_profile_fits_every_chart():
+    for options in PROFILES.values():
+        for figsize in CHART_FIGSIZES.values():
+            options.check_raster(figsize)
+
+
+def test_raster_size_is_figsize_times_dpi():
+    assert RenderOptions(dpi=200).raster_size((10, 6)) == (2000, 1200)
+    assert RenderOptions(width=800, dpi=50).raster_size((10, 6)) == (800, 480)
+
+
+@pytest.mark.parametrize("overrides", [
+    {"dpi": 600},                                  # 6000x3600 from the default size
+    {"width": 4000, "height": 4000, "dpi": 600},   # each side at the limit, area over it
+    {"width": MAX_PIXELS, "dpi": 10},              # 4000x2400 fits, but the pie is square
+])
+def test_oversized_rasters_are_rejected(overrides):
+    options = resolve_options(**overrides)
+    with pytest.raises(RenderTooLarge):
+        options.check_raster(CHART_FIGSIZES["gender_pie"])
+
+
+def test_width_alone_keeps_the_aspect_ratio_within_limits():
+    resolve_options(width=MAX_PIXELS).check_raster(CHART_FIGSIZES["age_histogram"])
+
+
+@pytest.mark.parametrize("field, value", [("width", 8), ("width", MAX_PIXELS + 1), ("dpi", 5),
+                                          ("compression", 10), ("quality", 0), ("layout", "loose")])
+def test_out_of_range_values_are_rejected(field, value):
+    with pytest.raises(ValueError):
+        RenderOptions(**{field: value})
+
+
+def test_unknown_profile():
+    with pytest.raises(ValueError):
+        resolve_options("poster")
@@ -0,0 +1,38 @@
+import shutil
+
+import pytest
+
+import data_loader
+import render_pool
+from agent import TitanicAgent, TitanicAnalyzer
+from render_pool import VersionUnavailable, _worker_analyzer
+
+
+@pytest.fixture
+def worker(tmp_path, monkeypatch):
+    """A process-pool worker's state, over a copy of the dataset we can edit"""
+    csv_path = tmp_path / "titanic.csv"
+    shutil.copy(data_loader._resolve_data_path(), csv_path)
+    monkeypatch.setattr(data_loader, "DATA_PATH", str(csv_path))
+    monkeypatch.setattr(data_loader, "SNAPSHOT_DIR", str(tmp_path / "snapshot"))
+    monkeypatch.setattr(render_pool, "_worker_agent", TitanicAgent())
+    monkeypatch.setattr(render_pool, "_worker_previous", None)
+    return csv_path
+
+
+def test_jobs_on_the_old_version_finish_after_a_reload(worker):
+    old = render_pool._worker_agent.analyzer.data_version
+    lines = worker.read_text().splitlines(keepends=True)
+    worker.write_text("".join(lines[:-1]))
+    new = TitanicAnalyzer(activate=False).data_version
+
+    assert _worker_analyzer(new).data_version == new
+    assert _worker_analyzer(old).data_version == old
+    assert _worker_analyzer(new) is render_pool._worker_agent.analyzer
+
+
+def test_unknown_version_is_retryable(worker):
+    with pytest.raises(VersionUnavailable):
+        _worker_analyzer("0000000000000000")
+    # The worker still serves what it had
+    assert _worker_analyzer(None) is render_pool._worker_agent.analyzer
@@ -0,0 +1,65 @@
+import mmap
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import snapshot
+from snapshot import build_snapshot, read_snapshot
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    monkeypatch.setattr(snapshot, "CHUNK_ROWS", 2)
+
+
+def write_csv(tmp_path, frame):
+    path = tmp_path / "titanic.csv"
+    frame.to_csv(path, index=False)
+    return str(path)
+
+
+def build(tmp_path, csv_path):
+    return read_snapshot(build_snapshot(csv_path, str(tmp_path / "snap")))
+
+
+def maps_file(array):
+    """Whether the array's memory is an mmap of the file rather than a copy"""
+    while isinstance(array, np.ndarray):
+        array = array.base
+    return isinstance(array, mmap.mmap)
+
+
+def test_later_chunks_widen_columns(tmp_path, small_chunks):
+    csv_path = write_csv(tmp_path, pd.DataFrame({
+        "Survived": [1, 0, 1, None, 0],
+        "SibSp": [0, 1, 2, 40_000, 3],
+        "Extra": ["1", "2", "3", "x", "4"],
+        "Ticket": ["A/5 21171", "PC 17599", "113803", "373450", "B 42"],
+    }))
+    df = build(tmp_path, csv_path)
+    assert df["Survived"].dtype == np.float64
+    assert df["Survived"].isna().tolist() == [False, False, False, True, False]
+    assert df["SibSp"].dtype == np.int32 and df["SibSp"].tolist() == [0, 1, 2, 40_000, 3]
+    assert df["Extra"].astype(str).tolist() == ["1", "2", "3", "x", "4"]
+    assert list(df["Ticket"].cat.categories) == sorted(["A/5 21171", "PC 17599", "113803", "373450", "B 42"])
+
+
+def test_known_numeric_column_with_text_is_rejected(tmp_path, small_chunks):
+    csv_path = write_csv(tmp_path, pd.DataFrame({"Age": ["22", "38", "unknown"]}))
+    with pytest.raises(ValueError, match="Age"):
+        build(tmp_path, csv_path)
+
+
+def test_category_codes_stay_memory_mapped(tmp_path, small_chunks):
+    names = [f"Passenger {i}" for i in range(300)]
+    csv_path = write_csv(tmp_path, pd.DataFrame({
+        "Name": names,
+        "Sex": ["male", "female"] * 150,
+        "Embarked": ["S", None, "C"] * 100,
+    }))
+    df = build(tmp_path, csv_path)
+    assert df["Name"].tolist() == names
+    assert df["Embarked"].isna().sum() == 100
+    for column in ("Name", "Sex", "Embarked"):
+        assert maps_file(df[column].array.codes), column
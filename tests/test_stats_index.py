@@ -0,0 +1,53 @@
+import pandas as pd
+
+from stats_index import SECTION_COLUMNS, TitanicStatsIndex
+
+
+def frame():
+    return pd.DataFrame({
+        "Survived": [1, 0, 1, 0],
+        "Sex": ["female", "male", "female", "male"],
+        "Pclass": [1, 3, 2, 3],
+        "Embarked": ["S", "C", None, "S"],
+        "Age": [29.0, None, 40.0, 22.0],
+        "Fare": [80.0, 7.25, 13.0, 8.05],
+    })
+
+
+def test_updated_rebuilds_only_changed_sections():
+    old = TitanicStatsIndex(frame())
+    df = frame()
+    df.loc[1, "Fare"] = 9.5
+    new = old.updated(df)
+    assert new.fare["max"] == 80.0 and new.fare["min"] == 8.05
+    assert old.fare["min"] == 7.25  # the served index is untouched
+    assert new.by_sex is old.by_sex
+    assert new.refresh(df) == []
+
+
+def test_updated_matches_a_full_build():
+    old = TitanicStatsIndex(frame())
+    df = frame()
+    df.loc[0, "Survived"] = 0
+    new = old.updated(df)
+    fresh = TitanicStatsIndex(df)
+    for name in ("survived", "by_sex", "by_pclass_embarked", "age"):
+        assert getattr(new, name) == getattr(fresh, name)
+
+
+def test_row_count_change_rebuilds_everything():
+    old = TitanicStatsIndex(frame())
+    df = frame().iloc[:3]
+    assert old.refresh(df) == list(SECTION_COLUMNS)
+
+
+def test_swapped_values_are_a_change():
+    old = TitanicStatsIndex(frame())
+    df = frame()
+    # Passengers 0 and 1 had their Sex recorded the wrong way round
+    df.loc[[0, 1], "Sex"] = ["male", "female"]
+    new = old.updated(df)
+    fresh = TitanicStatsIndex(df)
+    for name in ("by_sex", "by_sex_pclass", "by_sex_embarked"):
+        assert getattr(new, name) == getattr(fresh, name)
+    assert new.by_sex != old.by_sex